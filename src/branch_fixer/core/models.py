@@ -1,8 +1,13 @@
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Literal, Optional
 from uuid import UUID, uuid4
 
+# Recorded on a failed FixAttempt so callers can branch on the cause without
+# inspecting messages: the change could not be applied, the test still failed,
+# or an exception interrupted the attempt.
+FailureKind = Literal["apply", "verify", "error"]
+
 
 @dataclass(frozen=True)
 class ErrorDetails:
@@ -35,12 +40,15 @@ class FixAttempt:
     temperature: float
     status: str = "in_progress"  # in_progress, success, failed
     id: UUID = field(default_factory=uuid4)
+    # Why a failed attempt failed: apply, verify or error (None until it fails)
+    failure_kind: Optional[FailureKind] = None
 
     def to_dict(self) -> dict:
         return {
             "temperature": self.temperature,
             "status": self.status,
             "id": str(self.id),
+            "failure_kind": self.failure_kind,
         }
 
     @staticmethod
@@ -49,6 +57,7 @@ class FixAttempt:
             temperature=data["temperature"],
             status=data["status"],
             id=UUID(data["id"]),
+            failure_kind=data.get("failure_kind"),
         )
 
 
@@ -78,12 +87,15 @@ class TestError:
         attempt.status = "success"
         self.status = "fixed"
 
-    def mark_attempt_failed(self, attempt: FixAttempt) -> None:
+    def mark_attempt_failed(
+        self, attempt: FixAttempt, kind: Optional[FailureKind] = None
+    ) -> None:
         if attempt not in self.fix_attempts:
             raise ValueError("Attempt does not belong to this error")
         if self.status == "fixed":
             raise ValueError("Cannot fail an attempt on a fixed error")
         attempt.status = "failed"
+        attempt.failure_kind = kind
 
     def to_dict(self) -> dict:
         return {
@@ -107,7 +119,7 @@ class TestError:
         )
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CodeChanges:
     """Represents code changes suggested by AI."""
 
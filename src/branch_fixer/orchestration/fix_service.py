@@ -2,7 +2,7 @@
 import logging
 from typing import Optional
 
-from branch_fixer.core.models import FixAttempt, TestError
+from branch_fixer.core.models import FailureKind, FixAttempt, TestError
 from branch_fixer.orchestration.exceptions import FixServiceError
 
 # NEW: Imports for storing session or orchestrating
@@ -80,6 +80,13 @@ class FixService:
         self.state_manager = state_manager
         self.session = session
 
+    def close(self) -> None:
+        """Release the pools, processes and stores held by the collaborators."""
+        self.change_applier.close()
+        self.ai_manager.close()
+        self.test_runner.close()
+        self.git_repo.close()
+
     def attempt_fix(self, error: TestError, temperature: float) -> bool:
         """
         Attempt to fix failing test in a single shot (no internal loop).
@@ -126,12 +133,16 @@ class FixService:
             try:
                 # AI-based fix
                 changes = self.ai_manager.generate_fix(error, attempt.temperature)
+                # May differ from the attempt's: past failures escalate it
+                fix_temperature = self.ai_manager.fix_temperature
                 success, backup_path = self.change_applier.apply_changes_with_backup(
                     error.test_file, changes
                 )
 
                 if not success:
-                    self._handle_failed_attempt(error, attempt)
+                    self._handle_failed_attempt(
+                        error, attempt, "apply", fix_temperature
+                    )
                     return False
 
                 # Re-run functional test
@@ -139,7 +150,7 @@ class FixService:
 
             except Exception as e:
                 logger.warning("Error occurred after changes might have been applied.")
-                self._handle_failed_attempt(error, attempt)
+                self._handle_failed_attempt(error, attempt, "error")
                 raise FixServiceError(str(e)) from e
 
             finally:
@@ -154,10 +165,11 @@ class FixService:
                         )
 
             if not fix_succeeded:
-                self._handle_failed_attempt(error, attempt)
+                self._handle_failed_attempt(error, attempt, "verify", fix_temperature)
                 return False
 
             # If we reach here, fix is good
+            self.ai_manager.remember_successful_fix(error)
             error.mark_fixed(attempt)
             self._update_session_if_present(error)
             return True
@@ -191,10 +203,24 @@ class FixService:
             self._update_session_if_present(error)
         return success
 
-    def _handle_failed_attempt(self, error: TestError, attempt: FixAttempt) -> None:
-        """Mark attempt as failed and optionally revert code."""
+    def _handle_failed_attempt(
+        self,
+        error: TestError,
+        attempt: FixAttempt,
+        kind: Optional[FailureKind] = None,
+        fix_temperature: Optional[float] = None,
+    ) -> None:
+        """Mark attempt as failed with its failure kind and update the session.
+
+        ``fix_temperature`` is the temperature that produced the failed fix
+        (None if no model request did); for a bad fix it is recorded so a
+        rerun does not ask for the same fix again.
+        """
         try:
-            error.mark_attempt_failed(attempt)
+            if kind in ("apply", "verify") and fix_temperature is not None:
+                # The model's fix itself was bad, not the request
+                self.ai_manager.record_failed_fix(error, fix_temperature)
+            error.mark_attempt_failed(attempt, kind)
             self._update_session_if_present(error)
         except Exception as e:
             raise FixServiceError(f"Failed to handle failed attempt: {str(e)}") from e
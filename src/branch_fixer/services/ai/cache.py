@@ -0,0 +1,183 @@
+# branch_fixer/services/ai/cache.py
+import hashlib
+import json
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+class LLMCache:
+    """
+    In-process LRU cache of completion responses with a time-to-live.
+
+    Keys are a SHA-256 of the request payload (model, messages, temperature),
+    so an identical request returns the stored response without a provider
+    round trip. Entries expire after ``ttl`` seconds; the least recently used
+    entry is evicted once ``max_entries`` is reached.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, Any]], temperature: float) -> str:
+        """Build a stable key for a completion request."""
+        payload = json.dumps(
+            {"model": model, "messages": messages, "temperature": temperature},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value, evicting the least recently used entry if full."""
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache of verified fixes keyed by error embeddings.
+
+    A lookup only considers entries stored under the same ``context`` (the
+    test file and its content hash), so a near-identical message from an
+    unrelated file can never return another file's fix. Within a context the
+    most similar entry wins if its cosine similarity reaches ``threshold``.
+
+    Sessions hold at most a few hundred errors, so a linear scan is used
+    instead of an ANN index.
+    """
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 512):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries: List[Tuple[str, List[float], Any]] = []
+
+    def lookup(self, vector: List[float], context: str) -> Optional[Any]:
+        """Return the best match for ``vector`` within ``context``, if close enough."""
+        best_score, best_value = self.threshold, None
+        for entry_context, entry_vector, value in self._entries:
+            if entry_context != context:
+                continue
+            score = _cosine(vector, entry_vector)
+            if score >= best_score:
+                best_score, best_value = score, value
+        return best_value
+
+    def add(self, vector: List[float], context: str, value: Any) -> None:
+        """Store a value, dropping the oldest entry once full."""
+        self._entries.append((context, list(vector), value))
+        if len(self._entries) > self.max_entries:
+            del self._entries[0]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class FixStore:
+    """
+    On-disk store of verified fix replies keyed by an exact error signature.
+
+    Backed by a single SQLite file, so fixes survive the process and a rerun
+    (e.g. the next CI job) that hits the same failure in the same file
+    content skips the model entirely. Keys are built by the caller; values
+    are the raw model replies that passed verification.
+
+    Fixes that failed are recorded per temperature as well, so a rerun can
+    skip temperatures already known not to work for the same failure.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS fixes ("
+                "key TEXT PRIMARY KEY, reply TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS failures ("
+                "key TEXT NOT NULL, temperature REAL NOT NULL, failed_at REAL NOT NULL, "
+                "PRIMARY KEY (key, temperature))"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the stored reply for ``key``, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT reply FROM fixes WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, reply: str) -> None:
+        """Store (or replace) the reply for ``key``."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fixes (key, reply, stored_at) VALUES (?, ?, ?)",
+                (key, reply, time.time()),
+            )
+
+    def record_failure(self, key: str, temperature: float) -> None:
+        """Record that a fix for ``key`` at ``temperature`` did not work."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO failures (key, temperature, failed_at) "
+                "VALUES (?, ?, ?)",
+                (key, round(temperature, 2), time.time()),
+            )
+
+    def failed_temperatures(self, key: str, max_age: float) -> Set[float]:
+        """Temperatures that failed for ``key`` within the last ``max_age`` seconds."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT temperature FROM failures WHERE key = ? AND failed_at >= ?",
+                (key, time.time() - max_age),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "FixStore":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM fixes").fetchone()[0]
@@ -1,11 +1,22 @@
 # branch_fixer/services/ai/manager.py
+import ast
+import asyncio
+import functools
+import hashlib
+import importlib.util
+import itertools
+import json
 import logging
+import random
 import re
-from typing import Optional, Dict, List
+import time
+from typing import Any, AsyncGenerator, Callable, Optional, Dict, List, Sequence, Tuple
 
-from litellm import completion
+import httpx
 
 from branch_fixer.core.models import TestError, CodeChanges
+from branch_fixer.services.ai.cache import FixStore, LLMCache, SemanticCache
+from branch_fixer.services.ai.rules import RuleFixer
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +55,266 @@ Modified code:
 ```"""
 
 
+_SYSTEM_MESSAGE = {"role": "system", "content": _SYSTEM_PROMPT}
+
+# Static instructions live in the system messages and each template leads with
+# whatever changes least (the file, then the failure), so consecutive requests
+# share the longest possible byte-identical prefix for provider prompt caching.
+_ANALYSIS_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": (
+        "You are a Python testing expert. Analyze failing test errors concisely: "
+        "in 2-3 sentences, state the root cause and what type of fix is needed."
+    ),
+}
+
+# Prompt templates — filled with str.format_map so only the variable fields
+# are interpolated per call.
+_ANALYSIS_TEMPLATE = (
+    "Test: {test_function} in {test_file}\n"
+    "Error type: {error_type}\n"
+    "Error message: {message}\n"
+    "Stack trace: {stack_trace}"
+)
+
+_INITIAL_PROMPT_TEMPLATE = (
+    "Fix a failing test in {test_file}.\n\n"
+    "Current file content:\n```python\n{current_code}\n```\n\n"
+    "Test function: {test_function}\n"
+    "Error type: {error_type}\n"
+    "Error message: {message}\n"
+    "Stack trace:\n{stack_trace}\n\n"
+    "Root cause analysis: {analysis}\n\n"
+    "Provide the complete fixed file."
+)
+
+_RETRY_PROMPT_TEMPLATE = (
+    "That fix did not pass the tests. "
+    "Here is the original failure that still needs to be resolved:\n\n"
+    "Error type: {error_type}\n"
+    "Error message: {message}\n"
+    "Stack trace:\n{stack_trace}\n\n"
+    "Current file content (restored to broken state):\n```python\n{current_code}\n```\n\n"
+    "Try a completely different approach. "
+    "Return the complete fixed file content."
+)
+
+
+# Batch mode: several independent errors in one request. Only worth it when
+# per-request overhead dominates, i.e. files are short.
+_BATCH_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": _SYSTEM_PROMPT
+    + "\n\nYou may be given several numbered failures at once. Fix each one "
+    "independently and answer with one block per failure, in order, each "
+    "starting with a line of the form '--- FIX <n> ---'.",
+}
+
+_BATCH_ITEM_TEMPLATE = (
+    "{index}) Test function: {test_function}\n"
+    "Test file: {test_file}\n"
+    "Error type: {error_type}\n"
+    "Error message: {message}\n"
+    "Stack trace:\n{stack_trace}\n\n"
+    "Current file content:\n```python\n{current_code}\n```"
+)
+
+# Offline bulk fixing through the provider Batch API (OpenAI only)
+_BATCH_API_PROVIDER = "openai"
+_BATCH_API_ENDPOINT = "/v1/chat/completions"
+_BATCH_API_FAILED_STATES = {"failed", "expired", "cancelled"}
+_BATCH_API_ANALYSIS = "Not available in batch mode; infer it from the failure below."
+
+# A failed fix recorded in the fix store is skipped for this long, moving the
+# request up one temperature rung per recorded failure
+_FAILURE_MEMORY_SECONDS = 24 * 60 * 60
+_TEMPERATURE_RUNG = 0.1
+
+# Response / stack-trace patterns, compiled once rather than on every call
+_EXPLANATION_RE = re.compile(r"Explanation:\s*(.+)")
+_CONFIDENCE_RE = re.compile(r"Confidence:\s*([0-9.]+)")
+_MODIFIED_HEADER_RE = re.compile(r"Modified code\s*:", re.IGNORECASE)
+_TRACE_SEPARATOR_RE = re.compile(r"\n[_ ]{10,}\n")
+_BATCH_SPLIT_RE = re.compile(r"^--- FIX \d+ ---[ \t]*$", re.MULTILINE)
+# Details that differ between otherwise identical failures: pytest temp
+# directories, object addresses and line numbers
+_VOLATILE_TRACE_PATTERNS = (
+    (re.compile(r"/[^\s:]*/pytest-of-[^/\s]+/pytest-\d+/"), "<tmp>/"),
+    (re.compile(r"0x[0-9a-fA-F]+"), "0xADDR"),
+    (re.compile(r":\d+"), ":N"),
+)
+
+
+# Stack-trace lines of the failing frame included in an error's embedding
+_EMBEDDING_TRACE_LINES = 20
+
+
+def _normalize_trace(text: Optional[str]) -> str:
+    """Mask volatile details so structurally identical failures compare equal."""
+    if not text:
+        return ""
+    for pattern, replacement in _VOLATILE_TRACE_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def _extract_fenced_code(response: str) -> Optional[str]:
+    """
+    Return the body of the first ```` ``` ```` or ```` ```python ```` block.
+
+    Plain ``str.find`` scanning; the fence is the hot path of every parsed
+    response and needs no regex engine.
+    """
+    start = response.find("```")
+    while start != -1:
+        body = response.find("\n", start + 3)
+        if body == -1:
+            return None
+        end = response.find("```", body + 1)
+        if end == -1:
+            return None
+        if response[start + 3 : body] in ("", "python"):
+            return response[body + 1 : end]
+        # Other-language block: skip past its closing fence
+        start = response.find("```", end + 3)
+    return None
+
+
+# Connection pool shared by every AIManager in the process that opts in with
+# share_http_pool. Handed to LiteLLM via ``litellm.client_session`` so the
+# analysis call, the fix call and every retry reuse one keep-alive connection
+# instead of paying a TLS handshake each.
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=4, max_connections=16)
+_HTTP_TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+
+
+# The async path fans out, so its pool is wider than the sync one
+_ASYNC_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+
+
+def _build_http_client() -> httpx.Client:
+    """Create the pooled client; HTTP/2 is only enabled when ``h2`` is installed."""
+    http2 = importlib.util.find_spec("h2") is not None
+    return httpx.Client(http2=http2, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+
+
+def _build_async_http_client() -> httpx.AsyncClient:
+    """Async counterpart of _build_http_client, installed as ``litellm.aclient_session``."""
+    http2 = importlib.util.find_spec("h2") is not None
+    return httpx.AsyncClient(
+        http2=http2, limits=_ASYNC_HTTP_LIMITS, timeout=_HTTP_TIMEOUT
+    )
+
+
+def _install_http_pool() -> None:
+    """Install the shared sync pool in LiteLLM; never replace a caller's session."""
+    litellm = _litellm()
+    if litellm.client_session is None:
+        litellm.client_session = _build_http_client()
+
+
+# An httpx.AsyncClient is bound to the event loop that first uses it, so the
+# async pool is per loop: loop -> (client, generator that closes it)
+_ASYNC_HTTP_POOLS: Dict[
+    asyncio.AbstractEventLoop, Tuple[httpx.AsyncClient, AsyncGenerator[None, None]]
+] = {}
+
+
+async def _close_at_loop_shutdown(
+    client: httpx.AsyncClient,
+) -> AsyncGenerator[None, None]:
+    """Close ``client`` when the loop finalizes its async generators.
+
+    ``asyncio.run`` calls ``loop.shutdown_asyncgens()`` once the main
+    coroutine is done, which runs the ``finally`` here.
+    """
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+async def _install_async_http_pool() -> None:
+    """Install the running loop's async pool in LiteLLM; never replace a caller's session.
+
+    Pools of loops that closed without finalizing them are dropped, so a
+    later ``asyncio.run`` never reuses a client tied to a dead loop.
+    """
+    litellm = _litellm()
+    current = litellm.aclient_session
+    if current is not None and all(
+        current is not client for client, _ in _ASYNC_HTTP_POOLS.values()
+    ):
+        return
+    for closed in [loop for loop in _ASYNC_HTTP_POOLS if loop.is_closed()]:
+        del _ASYNC_HTTP_POOLS[closed]
+    loop = asyncio.get_running_loop()
+    if loop not in _ASYNC_HTTP_POOLS:
+        client = _build_async_http_client()
+        closer = _close_at_loop_shutdown(client)
+        await anext(closer)  # started, so the loop tracks it
+        _ASYNC_HTTP_POOLS[loop] = (client, closer)
+    litellm.aclient_session = _ASYNC_HTTP_POOLS[loop][0]
+
+
+@functools.cache
+def _litellm():
+    """
+    Import LiteLLM on first use.
+
+    LiteLLM pulls in tokenizers and many provider shims at import time;
+    deferring it keeps ``import branch_fixer`` (and the CLI's --help) fast
+    for code paths that never talk to a model.
+    """
+    import litellm
+
+    return litellm
+
+
+def completion(**kwargs):
+    """``litellm.completion``, imported on first call."""
+    return _litellm().completion(**kwargs)
+
+
+async def acompletion(**kwargs):
+    """``litellm.acompletion``, imported on first call."""
+    return await _litellm().acompletion(**kwargs)
+
+
+# Tokens kept free for the reply when fitting a prompt into the context window
+_OUTPUT_TOKEN_RESERVE = 1024
+# Input window assumed for models LiteLLM has no metadata for, which includes
+# the default OpenRouter model; kept conservative so truncation still happens
+_FALLBACK_MAX_INPUT_TOKENS = 16_384
+# Tokens a chat format adds per message (role, separators) on top of its
+# content, rounded up; token_counter counts them, content lengths do not
+_MESSAGE_TOKEN_OVERHEAD = 8
+_TRUNCATED_MARKER = "[... earlier frames truncated ...]\n"
+
+# Rate-limit (429) handling shared by the sync and async completion paths
+_RATE_LIMIT_ATTEMPTS = 6
+_BACKOFF_INITIAL = 1.0
+_BACKOFF_MAX = 30.0
+
+
+def _rate_limit_delay(exc: Exception, attempt: int) -> float:
+    """Seconds to wait before retrying a rate-limited call.
+
+    Honours the provider's ``Retry-After`` header when present, otherwise
+    uses jittered exponential backoff. Either way the wait is capped at
+    ``_BACKOFF_MAX`` so a huge or bogus header cannot stall the run.
+    """
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return min(_BACKOFF_MAX, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    backoff = min(_BACKOFF_MAX, _BACKOFF_INITIAL * 2**attempt)
+    return random.uniform(backoff / 2, backoff)
+
+
 class AIManager:
     """
     Manages interactions with AI services for generating test fixes.
@@ -80,11 +351,25 @@ class AIManager:
     # -------------------------------------------------------------------------
     """
 
+    # Retry exchanges kept after the initial one; older retries are dropped
+    # because every retry prompt restates the current code and failure.
+    RETRY_EXCHANGES_KEPT = 1
+
     def __init__(
         self,
         api_key: Optional[str],
         model: str = "openrouter/openai/gpt-5.4-mini",
         base_temperature: float = 0.4,
+        max_concurrency: int = 8,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        cache: Optional[LLMCache] = None,
+        cache_nondeterministic: bool = False,
+        semantic_cache: Optional[SemanticCache] = None,
+        embedding_model: str = "text-embedding-3-small",
+        api_keys: Optional[List[str]] = None,
+        rule_fixer: Optional[RuleFixer] = None,
+        fix_store: Optional[FixStore] = None,
+        share_http_pool: bool = False,
     ):
         """
         Initialize AI manager.
@@ -96,14 +381,67 @@ class AIManager:
                         "openrouter/anthropic/claude-3-5-sonnet",
                         "ollama/codellama"
             base_temperature: Default temperature for generations
+            max_concurrency: Cap on in-flight async completions
+            semaphore: Shared semaphore to cap completions across several
+                       managers; overrides max_concurrency
+            cache: Response cache to use; pass one to share it across managers
+            cache_nondeterministic: Also cache calls with temperature > 0
+            semantic_cache: Reuse verified fixes for near-duplicate errors in
+                            the same file (costs one embedding call per error)
+            embedding_model: Model used to embed errors for semantic_cache
+            api_keys: Pool of keys rotated per request to spread rate limits;
+                      api_key is used when omitted
+            rule_fixer: Deterministic fixes tried once per error before any
+                        model call
+            fix_store: Persistent store of verified fixes, looked up by an
+                       exact (normalized) error signature before any model
+                       or embedding call; failed fixes recorded in it move
+                       later requests past temperatures that already failed
+            share_http_pool: On the first model call, install pooled
+                             keep-alive HTTP clients as LiteLLM's
+                             process-wide sessions (unless some are set).
+                             Off by default, since it changes LiteLLM for
+                             every other user in the process
         """
         self.api_key = api_key
+        # Keys are passed per call, never written to os.environ
+        self._api_keys = itertools.cycle(api_keys) if api_keys else None
         self.model = model
+        # Parsed once: "openrouter/openai/gpt-4o-mini" -> ("openrouter", "openai/gpt-4o-mini")
+        provider, _, self._model_name = model.partition("/")
+        self._provider = provider.lower()
         self.base_temperature = base_temperature
+        self._semaphore = semaphore or asyncio.Semaphore(max_concurrency)
+        self._cache = cache if cache is not None else LLMCache()
+        self.cache_nondeterministic = cache_nondeterministic
+        self._semantic_cache = semantic_cache
+        self.embedding_model = embedding_model
+        self._rule_fixer = rule_fixer
+        self._fix_store = fix_store
+        # Errors whose rule-based fix has been tried; their retries use the LLM
+        self._rule_tried: set[str] = set()
+        # Anthropic (direct or via OpenRouter) only caches prompt prefixes that
+        # are explicitly marked; OpenAI caches stable prefixes automatically.
+        model_name = self._model_name.lower()
+        self._mark_cache_breakpoints = (
+            self._provider == "anthropic"
+            or "anthropic" in model_name
+            or "claude" in model_name
+        )
+
+        self.share_http_pool = share_http_pool
 
         # Persistent conversation thread — grows across retries for the same error
         self._messages: List[Dict[str, str]] = []
         self._current_error_id: Optional[str] = None
+        # (embedding, context) of the current error, kept until the fix verifies
+        self._semantic_entry: Optional[Tuple[List[float], str]] = None
+        # Exact-match key of the current error, kept until the fix verifies
+        self._fix_store_key: Optional[str] = None
+        # Test file as sent with the latest fix prompt, for template learning
+        self._fix_source: Optional[str] = None
+        # Temperature actually used for the latest fix request
+        self._fix_temperature: Optional[float] = None
 
     # ------------------------------------------------------------------
     # Public API
@@ -129,77 +467,876 @@ class AIManager:
             CompletionError: If AI request fails
             ValueError: If temperature is out of range
         """
-        if not 0 <= temperature <= 1:
-            raise ValueError("Temperature must be between 0 and 1")
+        self._validate_temperature(temperature)
+        quick = self._try_rule_fix(error)
+        if quick is not None:
+            return quick
 
         try:
-            is_new_error = str(error.id) != self._current_error_id
+            analysis = None
+            if self._start_error(error):
+                if self._reuse_stored_fix(error):
+                    return self._parse_response(self._messages[-1]["content"])
+                vector = self._embed(error)
+                if self._reuse_semantic_fix(error, vector):
+                    return self._parse_response(self._messages[-1]["content"])
+                # Analyze error separately at low temperature — factual, not creative
+                analysis = self._analyze_error(error, vector)
+            self._append_fix_prompt(error, analysis)
+            temperature = self._skip_failed_temperatures(temperature)
+
+            response = self._completion(
+                messages=self._messages, temperature=temperature
+            )
+            return self._record_reply(response.choices[0].message.content)
+
+        except Exception as e:
+            raise CompletionError(f"AI request failed: {str(e)}") from e
+
+    async def agenerate_fix(
+        self, error: TestError, temperature: float, stream: bool = False
+    ) -> CodeChanges:
+        """
+        Async variant of generate_fix built on ``litellm.acompletion``.
 
-            if is_new_error:
-                self._current_error_id = str(error.id)
-                self._reset_thread()
+        The conversation thread lives on the instance, so concurrent fixes
+        (e.g. via ``asyncio.gather``) need one AIManager per error.
 
-                # Read the current test file for context
+        With ``stream=True`` the fix reply is streamed and generation is cut
+        off as soon as the fenced code block is complete, so trailing text
+        after the code is never generated. Streamed replies bypass the
+        response cache.
+
+        Raises:
+            CompletionError: If AI request fails
+            ValueError: If temperature is out of range
+        """
+        self._validate_temperature(temperature)
+        quick = self._try_rule_fix(error)
+        if quick is not None:
+            return quick
+
+        try:
+            reused = await self._aprepare_fix_prompt(error)
+            if reused is not None:
+                return reused
+            temperature = self._skip_failed_temperatures(temperature)
+
+            if stream:
+                reply = await self._astream_reply(self._messages, temperature)
+            else:
+                response = await self._acompletion(
+                    messages=self._messages, temperature=temperature
+                )
+                reply = response.choices[0].message.content
+            return self._record_reply(reply)
+
+        except Exception as e:
+            raise CompletionError(f"AI request failed: {str(e)}") from e
+
+    async def agenerate_first_valid_fix(
+        self, error: TestError, temperatures: Sequence[float]
+    ) -> CodeChanges:
+        """
+        Sample several temperatures concurrently and keep the first usable fix.
+
+        Every candidate completes the same thread, so none of them sees
+        another's reply. The first reply whose code parses wins, the other
+        requests are cancelled, and only the winner is added to the thread
+        so a later retry continues from it. Costs one request per temperature
+        but a failed sample no longer costs a whole retry round trip.
+        Temperatures that recently failed for this error are escalated as in
+        generate_fix, and the winner's temperature is the one a later
+        record_failed_fix stores.
+
+        Raises:
+            CompletionError: If no candidate produced parseable code
+            ValueError: If no temperatures are given or one is out of range
+        """
+        if not temperatures:
+            raise ValueError("At least one temperature is required")
+        for temperature in temperatures:
+            self._validate_temperature(temperature)
+        quick = self._try_rule_fix(error)
+        if quick is not None:
+            return quick
+
+        try:
+            reused = await self._aprepare_fix_prompt(error)
+        except Exception as e:
+            raise CompletionError(f"AI request failed: {str(e)}") from e
+        if reused is not None:
+            return reused
+
+        messages = list(self._messages)
+        # Several requested temperatures may escalate to the same rung
+        schedule = dict.fromkeys(self._escalate_temperature(t) for t in temperatures)
+        tasks: Dict[asyncio.Future[Any], float] = {
+            asyncio.create_task(self._acompletion(messages=messages, temperature=t)): t
+            for t in schedule
+        }
+        failures: List[str] = []
+        try:
+            async for done in asyncio.as_completed(tasks):
+                try:
+                    reply = done.result().choices[0].message.content
+                    changes = self._parse_response(reply)
+                    ast.parse(changes.modified_code)
+                except Exception as e:
+                    failures.append(str(e))
+                    continue
+                self._fix_temperature = tasks[done]
+                return self._record_reply(reply)
+        finally:
+            for task in tasks:
+                task.cancel()
+        raise CompletionError(
+            f"No valid fix among {len(tasks)} candidates: {'; '.join(failures)}"
+        )
+
+    def generate_fixes(
+        self, errors: List[TestError], temperature: float
+    ) -> List[CodeChanges]:
+        """
+        Generate fixes for several independent errors in a single request.
+
+        Amortizes the round trip and shared system prompt across the batch.
+        Prefer generate_fix when files are long: output tokens then dominate
+        and one large reply is slower than parallel small ones. Batch calls do
+        not touch the per-error conversation thread.
+
+        Args:
+            errors: Errors to fix, one fix returned per error in the same order
+            temperature: Sampling temperature (0.0-1.0)
+
+        Raises:
+            CompletionError: If the request fails or the reply has the wrong
+                             number of fix blocks
+            ValueError: If temperature is out of range
+        """
+        self._validate_temperature(temperature)
+        if not errors:
+            return []
+
+        try:
+            items = []
+            for index, error in enumerate(errors, start=1):
                 try:
                     current_code = error.test_file.read_text(encoding="utf-8")
                 except Exception as e:
                     logger.warning(f"Could not read test file: {e}")
                     current_code = "[file unreadable]"
+                items.append(
+                    _BATCH_ITEM_TEMPLATE.format_map(
+                        self._prompt_fields(
+                            error, index=str(index), current_code=current_code
+                        )
+                    )
+                )
+            user_prompt = f"Fix these {len(errors)} failing tests:\n\n" + "\n\n".join(
+                items
+            )
 
-                # Analyze error separately at low temperature — factual, not creative
-                analysis = self._analyze_error(error)
-                logger.info(f"Error analysis for {error.test_function}: {analysis}")
-
-                user_prompt = self._build_initial_prompt(error, analysis, current_code)
-            else:
-                # Retry: the thread already has the previous attempt — inject specific
-                # failure context so the AI knows exactly what still went wrong.
-                logger.info(
-                    f"Retry for {error.test_function} — injecting failure feedback into thread"
+            response = self._completion(
+                messages=[
+                    _BATCH_SYSTEM_MESSAGE,
+                    {"role": "user", "content": user_prompt},
+                ],
+                temperature=temperature,
+            )
+            blocks = _BATCH_SPLIT_RE.split(response.choices[0].message.content)[1:]
+            if len(blocks) != len(errors):
+                raise ValueError(
+                    f"Expected {len(errors)} fix blocks, got {len(blocks)}"
                 )
-                # Re-read the test file; it will be in its original broken state because
-                # FixService restores the backup before calling generate_fix again.
+            return [self._parse_response(block) for block in blocks]
+
+        except Exception as e:
+            raise CompletionError(f"AI batch request failed: {str(e)}") from e
+
+    def submit_batch(self, errors: List[TestError], temperature: float) -> str:
+        """
+        Queue fix requests on the provider's Batch API.
+
+        For CI-time bulk repair where latency does not matter: batch requests
+        are billed at a discount and have separate throughput limits. Each
+        request uses the initial fix prompt without the analysis step and is
+        keyed by the error id. Collect the results with poll_batch.
+
+        Returns:
+            The provider batch id
+
+        Raises:
+            CompletionError: If the model is not an ``openai/`` model or the
+                             upload fails
+            ValueError: If temperature is out of range
+        """
+        self._validate_temperature(temperature)
+        if self._provider != _BATCH_API_PROVIDER:
+            raise CompletionError(
+                f"Batch API requires an openai/ model, got {self.model}"
+            )
+
+        try:
+            lines = []
+            for error in errors:
                 try:
                     current_code = error.test_file.read_text(encoding="utf-8")
-                except Exception:
+                except Exception as e:
+                    logger.warning(f"Could not read test file: {e}")
                     current_code = "[file unreadable]"
-
-                stack_trace = self._clean_stack_trace(error.error_details.stack_trace)
-                user_prompt = (
-                    "That fix did not pass the tests. "
-                    "Here is the original failure that still needs to be resolved:\n\n"
-                    f"Error type: {error.error_details.error_type}\n"
-                    f"Error message: {error.error_details.message}\n"
-                    f"Stack trace:\n{stack_trace}\n\n"
-                    f"Current file content (restored to broken state):\n```python\n{current_code}\n```\n\n"
-                    "Try a completely different approach. "
-                    "Return the complete fixed file content."
+                prompt = self._build_initial_prompt(
+                    error, _BATCH_API_ANALYSIS, current_code
+                )
+                lines.append(
+                    json.dumps(
+                        {
+                            "custom_id": str(error.id),
+                            "method": "POST",
+                            "url": _BATCH_API_ENDPOINT,
+                            "body": {
+                                "model": self._model_name,
+                                "temperature": temperature,
+                                "messages": [
+                                    _SYSTEM_MESSAGE,
+                                    {"role": "user", "content": prompt},
+                                ],
+                            },
+                        }
+                    )
                 )
 
-            self._messages.append({"role": "user", "content": user_prompt})
-
-            response = completion(
-                model=self.model,
-                messages=self._messages,
-                temperature=temperature,
+            batch_file = _litellm().create_file(
+                file=("fixes.jsonl", "\n".join(lines).encode("utf-8")),
+                purpose="batch",
+                custom_llm_provider=_BATCH_API_PROVIDER,
                 api_key=self.api_key,
             )
+            batch = _litellm().create_batch(
+                completion_window="24h",
+                endpoint=_BATCH_API_ENDPOINT,
+                input_file_id=batch_file.id,
+                custom_llm_provider=_BATCH_API_PROVIDER,
+                api_key=self.api_key,
+            )
+            logger.info(f"Submitted batch {batch.id} with {len(lines)} fix requests")
+            return batch.id
 
-            reply = response.choices[0].message.content
-            # Add to thread so next retry sees the full conversation
-            self._messages.append({"role": "assistant", "content": reply})
+        except Exception as e:
+            raise CompletionError(f"Batch submission failed: {str(e)}") from e
 
-            return self._parse_response(reply)
+    def poll_batch(self, batch_id: str) -> Optional[Dict[str, CodeChanges]]:
+        """
+        Fetch the results of a batch created by submit_batch.
+
+        Returns:
+            None while the batch is still running, otherwise a mapping of
+            error id to CodeChanges. Requests the provider failed, and
+            records that cannot be read or parsed, are logged and left out.
 
+        Raises:
+            CompletionError: If the batch failed, expired or was cancelled, or
+                             its output cannot be fetched
+        """
+        try:
+            batch = _litellm().retrieve_batch(
+                batch_id=batch_id,
+                custom_llm_provider=_BATCH_API_PROVIDER,
+                api_key=self.api_key,
+            )
         except Exception as e:
-            raise CompletionError(f"AI request failed: {str(e)}") from e
+            raise CompletionError(f"Batch lookup failed: {str(e)}") from e
+
+        if batch.status in _BATCH_API_FAILED_STATES:
+            raise CompletionError(f"Batch {batch_id} ended with status {batch.status}")
+        if batch.status != "completed":
+            return None
+
+        try:
+            output = _litellm().file_content(
+                file_id=batch.output_file_id,
+                custom_llm_provider=_BATCH_API_PROVIDER,
+                api_key=self.api_key,
+            )
+        except Exception as e:
+            raise CompletionError(f"Batch output download failed: {str(e)}") from e
+
+        results: Dict[str, CodeChanges] = {}
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                custom_id, changes = self._parse_batch_record(line)
+            except CompletionError as e:
+                logger.warning(str(e))
+                continue
+            results[custom_id] = changes
+        return results
+
+    def _parse_batch_record(self, line: str) -> Tuple[str, CodeChanges]:
+        """
+        Parse one line of batch output into (custom_id, CodeChanges).
+
+        Raises:
+            CompletionError: If the request failed or the record is malformed
+        """
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise CompletionError(f"Unreadable batch record: {str(e)}") from e
+        custom_id = record.get("custom_id") if isinstance(record, dict) else None
+        if not custom_id:
+            raise CompletionError(f"Batch record without a custom_id: {line[:200]}")
+
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            raise CompletionError(
+                f"Batch request {custom_id} failed: "
+                f"{record.get('error') or response.get('status_code')}"
+            )
+        try:
+            reply = response["body"]["choices"][0]["message"]["content"]
+            return custom_id, self._parse_response(reply)
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            raise CompletionError(
+                f"Batch request {custom_id} has an unusable reply: {str(e)}"
+            ) from e
+
+    async def aclose(self) -> None:
+        """
+        Close the running event loop's shared async connection pool, if any.
+
+        Under ``asyncio.run`` this happens on its own when the run ends; call
+        it to release the connections earlier, or when driving a loop by
+        hand. The next async call on the loop installs a fresh pool.
+        """
+        pool = _ASYNC_HTTP_POOLS.pop(asyncio.get_running_loop(), None)
+        if pool is None:
+            return
+        client, closer = pool
+        litellm = _litellm()
+        if litellm.aclient_session is client:
+            litellm.aclient_session = None
+        await closer.aclose()
+
+    def close(self) -> None:
+        """Close the persistent fix store, if one was given."""
+        if self._fix_store is not None:
+            self._fix_store.close()
+
+    def remember_successful_fix(self, error: TestError) -> None:
+        """
+        Store the last fix for ``error`` in the semantic cache and fix store.
+
+        Called once the fix has passed verification, so only fixes known to
+        work are offered for the same or near-duplicate errors later on.
+        """
+        if (
+            str(error.id) != self._current_error_id
+            or not self._messages
+            or self._messages[-1]["role"] != "assistant"
+        ):
+            return
+        reply = self._messages[-1]["content"]
+        if self._semantic_cache is not None:
+            if self._fix_store_key is not None:
+                self._cache.set(f"fix:{self._fix_store_key}", reply)
+            if self._semantic_entry is not None:
+                vector, context = self._semantic_entry
+                self._semantic_cache.add(vector, context, reply)
+        if self._fix_store is not None and self._fix_store_key is not None:
+            self._fix_store.set(self._fix_store_key, reply)
+        if self._rule_fixer is not None and self._fix_source is not None:
+            try:
+                modified = self._parse_response(reply).modified_code
+                self._rule_fixer.learn(error, self._fix_source, modified)
+            except Exception as e:
+                logger.debug(f"No fix template learned: {e}")
+
+    @property
+    def fix_temperature(self) -> Optional[float]:
+        """
+        Temperature that produced the latest fix, after any escalation.
+
+        None when that fix did not come from a model request (a rule-based
+        fix or a reused verified/cached fix).
+        """
+        return self._fix_temperature
+
+    def record_failed_fix(self, error: TestError, temperature: float) -> None:
+        """
+        Record in the fix store that a fix for ``error`` at ``temperature`` failed.
+
+        ``temperature`` should be the fix_temperature of the failed fix. Kept
+        for a day under the same exact signature as verified fixes, so a
+        rerun that meets the same failure starts above the temperatures that
+        already failed instead of asking for the same dead fix again.
+        """
+        if (
+            self._fix_store is None
+            or self._fix_store_key is None
+            or str(error.id) != self._current_error_id
+        ):
+            return
+        self._fix_store.record_failure(self._fix_store_key, temperature)
 
     # ------------------------------------------------------------------
     # Private helpers
     # ------------------------------------------------------------------
 
+    def _cache_key(
+        self, messages: List[Dict[str, str]], temperature: float
+    ) -> Optional[str]:
+        """Key for the response cache, or None if this call must not be cached.
+
+        Only temperature 0 is deterministic; sampled calls are cached only when
+        ``cache_nondeterministic`` is set.
+        """
+        if temperature > 0.0 and not self.cache_nondeterministic:
+            return None
+        return LLMCache.make_key(self.model, messages, temperature)
+
+    def _completion(self, messages: List[Dict[str, str]], temperature: float):
+        """Call ``completion`` through the response cache."""
+        key = self._cache_key(messages, temperature)
+        if key is not None:
+            cached = self._cache.get(key)
+            if cached is not None:
+                logger.debug("Completion served from cache")
+                return cached
+        response = self._completion_with_retry(messages, temperature)
+        if key is not None:
+            self._cache.set(key, response)
+        return response
+
+    async def _acompletion(self, messages: List[Dict[str, str]], temperature: float):
+        """Await ``acompletion`` through the response cache."""
+        key = self._cache_key(messages, temperature)
+        if key is not None:
+            cached = self._cache.get(key)
+            if cached is not None:
+                logger.debug("Completion served from cache")
+                return cached
+        response = await self._acompletion_with_retry(messages, temperature)
+        if key is not None:
+            self._cache.set(key, response)
+        return response
+
+    def _completion_with_retry(
+        self, messages: List[Dict[str, str]], temperature: float
+    ):
+        """Call ``completion``, retrying rate-limit errors with backoff."""
+        if self.share_http_pool:
+            _install_http_pool()
+        for attempt in range(_RATE_LIMIT_ATTEMPTS):
+            try:
+                return completion(
+                    model=self.model,
+                    messages=self._provider_messages(messages),
+                    temperature=temperature,
+                    api_key=self._next_api_key(),
+                )
+            except _litellm().RateLimitError as e:
+                if attempt == _RATE_LIMIT_ATTEMPTS - 1:
+                    raise
+                delay = _rate_limit_delay(e, attempt)
+                logger.warning(f"Rate limited by provider; retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    async def _acompletion_with_retry(
+        self, messages: List[Dict[str, str]], temperature: float
+    ):
+        """Await ``acompletion`` under the concurrency cap, retrying rate limits.
+
+        The backoff sleep happens outside the semaphore so a throttled call
+        does not hold a slot other requests could use.
+        """
+        if self.share_http_pool:
+            await _install_async_http_pool()
+        for attempt in range(_RATE_LIMIT_ATTEMPTS):
+            try:
+                async with self._semaphore:
+                    return await acompletion(
+                        model=self.model,
+                        messages=self._provider_messages(messages),
+                        temperature=temperature,
+                        api_key=self._next_api_key(),
+                    )
+            except _litellm().RateLimitError as e:
+                if attempt == _RATE_LIMIT_ATTEMPTS - 1:
+                    raise
+                delay = _rate_limit_delay(e, attempt)
+                logger.warning(f"Rate limited by provider; retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _astream_reply(
+        self, messages: List[Dict[str, str]], temperature: float
+    ) -> str:
+        """
+        Stream a completion and return its text.
+
+        Stops reading, and closes the stream so the provider stops generating,
+        once the buffer holds a complete fenced code block, which is all
+        _parse_response needs. Runs under the concurrency cap for the whole
+        stream and retries rate limits like _acompletion_with_retry.
+        """
+        if self.share_http_pool:
+            await _install_async_http_pool()
+        for attempt in range(_RATE_LIMIT_ATTEMPTS):
+            try:
+                async with self._semaphore:
+                    stream = await acompletion(
+                        model=self.model,
+                        messages=self._provider_messages(messages),
+                        temperature=temperature,
+                        api_key=self._next_api_key(),
+                        stream=True,
+                    )
+                    chunks: List[str] = []
+                    try:
+                        async for chunk in stream:
+                            text = chunk.choices[0].delta.content or ""
+                            chunks.append(text)
+                            # Only a backtick can complete the closing fence
+                            if (
+                                "`" in text
+                                and _extract_fenced_code("".join(chunks)) is not None
+                            ):
+                                break
+                    finally:
+                        close = getattr(stream, "aclose", None)
+                        if close is not None:
+                            await close()
+                    return "".join(chunks)
+            except _litellm().RateLimitError as e:
+                if attempt == _RATE_LIMIT_ATTEMPTS - 1:
+                    raise
+                delay = _rate_limit_delay(e, attempt)
+                logger.warning(f"Rate limited by provider; retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+        # Unreachable: the last attempt re-raises its rate-limit error
+        raise CompletionError("Streaming completion retries exhausted")
+
+    def _provider_messages(
+        self, messages: List[Dict[str, str]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Add prompt-cache breakpoints for providers that need them.
+
+        Marks the system prompt and the latest user turn as ``ephemeral``
+        cache breakpoints, so a retry re-reads the whole previous exchange
+        (including the file content) from the provider's prefix cache instead
+        of paying prefill for it again. The thread itself keeps plain strings.
+        """
+        if not self._mark_cache_breakpoints:
+            return messages
+        last_user = max(
+            (i for i, m in enumerate(messages) if m["role"] == "user"), default=None
+        )
+        marked: List[Dict[str, Any]] = []
+        for i, message in enumerate(messages):
+            if message["role"] == "system" or i == last_user:
+                marked.append(
+                    {
+                        "role": message["role"],
+                        "content": [
+                            {
+                                "type": "text",
+                                "text": message["content"],
+                                "cache_control": {"type": "ephemeral"},
+                            }
+                        ],
+                    }
+                )
+            else:
+                marked.append(message)
+        return marked
+
+    def _next_api_key(self) -> Optional[str]:
+        """Key for the next request: round-robin over api_keys, else api_key."""
+        if self._api_keys is None:
+            return self.api_key
+        return next(self._api_keys)
+
     def _reset_thread(self) -> None:
-        self._messages = [{"role": "system", "content": _SYSTEM_PROMPT}]
+        self._messages = [_SYSTEM_MESSAGE]
+
+    @staticmethod
+    def _validate_temperature(temperature: float) -> None:
+        if not 0 <= temperature <= 1:
+            raise ValueError("Temperature must be between 0 and 1")
+
+    def _try_rule_fix(self, error: TestError) -> Optional[CodeChanges]:
+        """
+        Rule-based fix for the first attempt at ``error``, skipping the LLM.
+
+        Only tried once per error: if the rule's fix fails verification, the
+        retry goes through the normal analysis and fix prompts.
+        """
+        if self._rule_fixer is None or str(error.id) in self._rule_tried:
+            return None
+        self._rule_tried.add(str(error.id))
+        try:
+            changes = self._rule_fixer.try_fix(error)
+        except Exception as e:
+            logger.warning(f"Rule-based fix failed; falling back to the LLM: {e}")
+            return None
+        if changes is not None:
+            self._fix_temperature = None  # no model request produced it
+        return changes
+
+    def _skip_failed_temperatures(self, temperature: float) -> float:
+        """Escalate ``temperature`` and remember it as the fix's temperature."""
+        self._fix_temperature = self._escalate_temperature(temperature)
+        return self._fix_temperature
+
+    def _escalate_temperature(self, temperature: float) -> float:
+        """Move ``temperature`` up past rungs that recently failed for this error."""
+        if self._fix_store is None or self._fix_store_key is None:
+            return temperature
+        failed = self._fix_store.failed_temperatures(
+            self._fix_store_key, _FAILURE_MEMORY_SECONDS
+        )
+        escalated = temperature
+        while round(escalated, 2) in failed and escalated < 1.0:
+            escalated = min(1.0, escalated + _TEMPERATURE_RUNG)
+        if escalated != temperature:
+            logger.info(
+                f"Temperature {temperature} failed for this error recently; "
+                f"using {escalated:.2f}"
+            )
+        return escalated
+
+    def _start_error(self, error: TestError) -> bool:
+        """Reset the thread when ``error`` differs from the previous call.
+
+        Returns True for a new error (the caller should run the analysis step),
+        False for a retry of the current one.
+        """
+        if str(error.id) == self._current_error_id:
+            return False
+        self._current_error_id = str(error.id)
+        self._semantic_entry = None
+        self._fix_store_key = None
+        self._fix_source = None
+        self._fix_temperature = None
+        self._reset_thread()
+        return True
+
+    async def _aprepare_fix_prompt(self, error: TestError) -> Optional[CodeChanges]:
+        """
+        Add the next user turn for ``error`` to the thread.
+
+        For a new error this runs the cache lookups and the analysis first;
+        if a cached fix is reused it is returned and no prompt is needed.
+        """
+        analysis = None
+        if self._start_error(error):
+            if self._reuse_stored_fix(error):
+                return self._parse_response(self._messages[-1]["content"])
+            vector = await self._aembed(error)
+            if self._reuse_semantic_fix(error, vector):
+                return self._parse_response(self._messages[-1]["content"])
+            analysis = await self._aanalyze_error(error, vector)
+        self._append_fix_prompt(error, analysis)
+        return None
+
+    def _embedding_input(self, error: TestError) -> str:
+        # The head of the failing frame carries the signal; the rest (long
+        # assertion diffs) only dilutes the embedding and costs tokens
+        stack_trace = "\n".join(
+            self._clean_stack_trace(error.error_details.stack_trace).splitlines()[
+                :_EMBEDDING_TRACE_LINES
+            ]
+        )
+        return (
+            f"{error.error_details.error_type}\n"
+            f"{_normalize_trace(error.error_details.message)}\n"
+            f"{_normalize_trace(stack_trace)}"
+        )
+
+    def _embed(self, error: TestError) -> Optional[List[float]]:
+        """Embed the error for the semantic cache; None if disabled or failed."""
+        if self._semantic_cache is None:
+            return None
+        if self.share_http_pool:
+            _install_http_pool()
+        try:
+            response = _litellm().embedding(
+                model=self.embedding_model,
+                input=[self._embedding_input(error)],
+                api_key=self._next_api_key(),
+            )
+            return list(response.data[0]["embedding"])
+        except Exception as e:
+            logger.warning(f"Embedding failed; skipping semantic cache: {e}")
+            return None
+
+    async def _aembed(self, error: TestError) -> Optional[List[float]]:
+        """Async variant of _embed."""
+        if self._semantic_cache is None:
+            return None
+        if self.share_http_pool:
+            await _install_async_http_pool()
+        try:
+            response = await _litellm().aembedding(
+                model=self.embedding_model,
+                input=[self._embedding_input(error)],
+                api_key=self._next_api_key(),
+            )
+            return list(response.data[0]["embedding"])
+        except Exception as e:
+            logger.warning(f"Embedding failed; skipping semantic cache: {e}")
+            return None
+
+    def _reuse_semantic_fix(
+        self, error: TestError, vector: Optional[List[float]]
+    ) -> bool:
+        """
+        Seed the thread with a cached fix for a near-duplicate error.
+
+        The lookup is scoped to the test file path and a hash of its current
+        content, so a hit is always a fix written against this exact file. On
+        a hit the thread gets the initial prompt plus the cached reply, so a
+        retry continues the conversation as if the model had produced it.
+        """
+        cache = self._semantic_cache
+        if cache is None or vector is None:
+            return False
+        content_hash = self._file_content_hash(error)
+        if content_hash is None:
+            return False
+        context = f"{error.test_file}:{content_hash}"
+        self._semantic_entry = (vector, context)
+
+        reply = cache.lookup(vector, context)
+        if reply is None:
+            return False
+        logger.info(f"Reusing cached fix for near-duplicate error in {error.test_file}")
+        self._seed_cached_reply(
+            error, "Matches a previously fixed failure in this file.", reply
+        )
+        return True
+
+    def _reuse_stored_fix(self, error: TestError) -> bool:
+        """
+        Seed the thread with a verified fix for this exact failure.
+
+        The key covers the normalized failure and a hash of the file's current
+        content, so only a fix for this exact failure in this exact file is
+        reused. It is looked up in the in-memory response cache when the
+        semantic cache is on (an exact hit needs no embedding call), then in
+        the persistent fix store. The key is kept so a newly verified fix can
+        be stored under it.
+        """
+        if self._fix_store is None and self._semantic_cache is None:
+            return False
+        content_hash = self._file_content_hash(error)
+        if content_hash is None:
+            return False
+        details = error.error_details
+        payload = json.dumps(
+            [
+                str(error.test_file),
+                error.test_function,
+                details.error_type,
+                _normalize_trace(details.message),
+                _normalize_trace(details.stack_trace),
+                content_hash,
+            ]
+        )
+        self._fix_store_key = hashlib.blake2b(
+            payload.encode("utf-8"), digest_size=16
+        ).hexdigest()
+
+        reply = None
+        if self._semantic_cache is not None:
+            reply = self._cache.get(f"fix:{self._fix_store_key}")
+        if reply is None and self._fix_store is not None:
+            reply = self._fix_store.get(self._fix_store_key)
+        if reply is None:
+            return False
+        logger.info(
+            f"Reusing verified fix for {error.test_file}::{error.test_function}"
+        )
+        self._seed_cached_reply(error, "Matches a previously verified fix.", reply)
+        return True
+
+    @staticmethod
+    def _file_content_hash(error: TestError) -> Optional[str]:
+        try:
+            return hashlib.sha256(error.test_file.read_bytes()).hexdigest()
+        except Exception:
+            return None
+
+    def _seed_cached_reply(self, error: TestError, note: str, reply: str) -> None:
+        """Thread as if the model had answered: initial prompt plus ``reply``."""
+        self._append_fix_prompt(error, note)
+        self._messages.append({"role": "assistant", "content": reply})
+
+    def _append_fix_prompt(self, error: TestError, analysis: Optional[str]) -> None:
+        """Add the next user turn: the initial prompt, or retry feedback."""
+        if analysis is not None:
+            # Read the current test file for context
+            try:
+                current_code = error.test_file.read_text(encoding="utf-8")
+                self._fix_source = current_code
+            except Exception as e:
+                logger.warning(f"Could not read test file: {e}")
+                current_code = "[file unreadable]"
+
+            logger.info(f"Error analysis for {error.test_function}: {analysis}")
+            user_prompt = self._fit_to_context(
+                error,
+                lambda trace: self._build_initial_prompt(
+                    error, analysis, current_code, stack_trace=trace
+                ),
+            )
+        else:
+            # Retry: the thread already has the previous attempt — inject specific
+            # failure context so the AI knows exactly what still went wrong.
+            logger.info(
+                f"Retry for {error.test_function} — injecting failure feedback into thread"
+            )
+            # Re-read the test file; it will be in its original broken state because
+            # FixService restores the backup before calling generate_fix again.
+            try:
+                current_code = error.test_file.read_text(encoding="utf-8")
+                self._fix_source = current_code
+            except Exception:
+                current_code = "[file unreadable]"
+
+            self._trim_retry_history()
+            user_prompt = self._fit_to_context(
+                error,
+                lambda trace: _RETRY_PROMPT_TEMPLATE.format_map(
+                    self._prompt_fields(
+                        error, current_code=current_code, stack_trace=trace
+                    )
+                ),
+            )
+
+        self._messages.append({"role": "user", "content": user_prompt})
+
+    def _trim_retry_history(self) -> None:
+        """
+        Bound the thread before another retry prompt is added.
+
+        The system prompt and the initial exchange stay as a stable prefix the
+        provider's prompt cache can reuse; of the retry exchanges after it
+        only the latest RETRY_EXCHANGES_KEPT survive, so prompt size and
+        latency stop growing with the number of attempts.
+        """
+        head = 3  # system prompt, initial prompt, first reply
+        keep = 2 * self.RETRY_EXCHANGES_KEPT
+        excess = len(self._messages) - head - keep
+        if excess > 0:
+            del self._messages[head : head + excess]
+
+    def _record_reply(self, reply: str) -> CodeChanges:
+        # Add to thread so next retry sees the full conversation
+        self._messages.append({"role": "assistant", "content": reply})
+        return self._parse_response(reply)
 
     @staticmethod
     def _clean_stack_trace(stack_trace: Optional[str]) -> str:
@@ -214,65 +1351,193 @@ class AIManager:
         if not stack_trace:
             return "None"
         # Split on the separator line (underscores with spaces, e.g. "_ _ _ _ _")
-        import re
-
-        parts = re.split(r"\n[_ ]{10,}\n", stack_trace, maxsplit=1)
+        parts = _TRACE_SEPARATOR_RE.split(stack_trace, maxsplit=1)
         cleaned = parts[0].strip()
         # Also strip lines that reference .venv internals as a fallback
         lines = [line for line in cleaned.splitlines() if ".venv/" not in line]
         return "\n".join(lines).strip() or stack_trace[:300]
 
-    def _analyze_error(self, error: TestError) -> str:
+    def _analyze_error(
+        self, error: TestError, vector: Optional[List[float]] = None
+    ) -> str:
         """
         Quick analysis call — NOT added to the main fix thread.
         Returns a short description of root cause and fix strategy.
         Uses temperature=0.1 for factual, deterministic output.
+
+        ``vector`` is the error's embedding, if the semantic cache is on; it
+        lets a near-duplicate error reuse an earlier analysis.
         """
-        stack_trace = self._clean_stack_trace(error.error_details.stack_trace)
-        messages = [
-            {
-                "role": "system",
-                "content": "You are a Python testing expert. Analyze failing test errors concisely.",
-            },
-            {
-                "role": "user",
-                "content": (
-                    f"Analyze this test failure in 2-3 sentences: "
-                    f"what is the root cause and what type of fix is needed?\n\n"
-                    f"Test: {error.test_function} in {error.test_file}\n"
-                    f"Error type: {error.error_details.error_type}\n"
-                    f"Error message: {error.error_details.message}\n"
-                    f"Stack trace: {stack_trace}"
-                ),
-            },
-        ]
+        cached = self._cached_analysis(error, vector)
+        if cached is not None:
+            return cached
         try:
-            response = completion(
-                model=self.model,
-                messages=messages,
-                temperature=0.1,
-                api_key=self.api_key,
+            response = self._completion(
+                messages=self._analysis_messages(error), temperature=0.1
+            )
+            analysis = response.choices[0].message.content.strip()
+        except Exception as e:
+            logger.warning(f"Analysis step failed (non-fatal): {e}")
+            return f"{error.error_details.error_type}: {error.error_details.message}"
+        self._store_analysis(error, vector, analysis)
+        return analysis
+
+    async def _aanalyze_error(
+        self, error: TestError, vector: Optional[List[float]] = None
+    ) -> str:
+        """Async variant of _analyze_error."""
+        cached = self._cached_analysis(error, vector)
+        if cached is not None:
+            return cached
+        try:
+            response = await self._acompletion(
+                messages=self._analysis_messages(error), temperature=0.1
             )
-            return response.choices[0].message.content.strip()
+            analysis = response.choices[0].message.content.strip()
         except Exception as e:
             logger.warning(f"Analysis step failed (non-fatal): {e}")
             return f"{error.error_details.error_type}: {error.error_details.message}"
+        self._store_analysis(error, vector, analysis)
+        return analysis
+
+    def _analysis_key(self, error: TestError) -> str:
+        """
+        Response-cache key for an error's analysis.
+
+        The analysis runs at a fixed low temperature and is factual, so it is
+        memoized on a hash of the error content the prompt is built from,
+        even though sampled completions are otherwise not cached. Line
+        numbers, addresses and temp paths are normalized away first, so the
+        same failure at a shifted line still hits.
+        """
+        details = error.error_details
+        payload = json.dumps(
+            [
+                self.model,
+                str(error.test_file),
+                error.test_function,
+                details.error_type,
+                _normalize_trace(details.message),
+                _normalize_trace(details.stack_trace),
+            ]
+        )
+        digest = hashlib.blake2b(payload.encode("utf-8"), digest_size=16)
+        return f"analysis:{digest.hexdigest()}"
+
+    @staticmethod
+    def _analysis_context(error: TestError) -> str:
+        """Semantic-cache context for analyses: same file, same error type."""
+        return f"analysis:{error.test_file}:{error.error_details.error_type}"
+
+    def _cached_analysis(
+        self, error: TestError, vector: Optional[List[float]]
+    ) -> Optional[str]:
+        """Exact (normalized) hit first, then a near-duplicate by embedding."""
+        analysis = self._cache.get(self._analysis_key(error))
+        if analysis is None and vector is not None and self._semantic_cache is not None:
+            analysis = self._semantic_cache.lookup(
+                vector, self._analysis_context(error)
+            )
+            if analysis is not None:
+                logger.info(
+                    f"Reusing analysis of a near-duplicate error in {error.test_file}"
+                )
+        return analysis
+
+    def _store_analysis(
+        self, error: TestError, vector: Optional[List[float]], analysis: str
+    ) -> None:
+        self._cache.set(self._analysis_key(error), analysis)
+        if vector is not None and self._semantic_cache is not None:
+            self._semantic_cache.add(vector, self._analysis_context(error), analysis)
+
+    def _analysis_messages(self, error: TestError) -> List[Dict[str, str]]:
+        return [
+            _ANALYSIS_SYSTEM_MESSAGE,
+            {
+                "role": "user",
+                "content": _ANALYSIS_TEMPLATE.format_map(self._prompt_fields(error)),
+            },
+        ]
 
     def _build_initial_prompt(
-        self, error: TestError, analysis: str, current_code: str
+        self,
+        error: TestError,
+        analysis: str,
+        current_code: str,
+        stack_trace: Optional[str] = None,
     ) -> str:
+        fields = self._prompt_fields(
+            error, analysis=analysis, current_code=current_code
+        )
+        if stack_trace is not None:
+            fields["stack_trace"] = stack_trace
+        return _INITIAL_PROMPT_TEMPLATE.format_map(fields)
+
+    @functools.cached_property
+    def _prompt_token_budget(self) -> int:
+        """Prompt tokens the model accepts; a conservative guess if unknown."""
+        try:
+            max_input = _litellm().get_model_info(self.model).get("max_input_tokens")
+        except Exception:
+            max_input = None
+        return (max_input or _FALLBACK_MAX_INPUT_TOKENS) - _OUTPUT_TOKEN_RESERVE
+
+    def _fit_to_context(self, error: TestError, build: Callable[[str], str]) -> str:
+        """
+        Build the next user prompt, truncating the stack trace to fit.
+
+        ``build`` renders the prompt for a given stack trace. If the thread
+        plus that prompt exceeds the model's input window, the oldest frames
+        are dropped (the tail holds the actual error) by binary search on the
+        number of trailing characters kept, instead of letting the provider
+        reject or silently truncate the request after a full round trip.
+        """
         stack_trace = self._clean_stack_trace(error.error_details.stack_trace)
-        return (
-            f"Fix this failing test.\n\n"
-            f"Root cause analysis: {analysis}\n\n"
-            f"Test function: {error.test_function}\n"
-            f"Test file: {error.test_file}\n"
-            f"Error type: {error.error_details.error_type}\n"
-            f"Error message: {error.error_details.message}\n"
-            f"Stack trace:\n{stack_trace}\n\n"
-            f"Current file content:\n```python\n{current_code}\n```\n\n"
-            f"Provide the complete fixed file."
+        prompt = build(stack_trace)
+        budget = self._prompt_token_budget
+
+        # Tokenizers never emit more content tokens than UTF-8 bytes, and the
+        # overhead covers the message framing, so this cannot be over budget
+        upper_bound = sum(
+            len(m["content"].encode()) + _MESSAGE_TOKEN_OVERHEAD
+            for m in self._messages + [{"role": "user", "content": prompt}]
+        )
+        if upper_bound <= budget:
+            return prompt
+
+        def fits(candidate: str) -> bool:
+            messages = self._messages + [{"role": "user", "content": candidate}]
+            return (
+                _litellm().token_counter(model=self.model, messages=messages) <= budget
+            )
+
+        if fits(prompt):
+            return prompt
+
+        low, high = 0, len(stack_trace)
+        while low < high:
+            keep = (low + high + 1) // 2
+            if fits(build(_TRUNCATED_MARKER + stack_trace[-keep:])):
+                low = keep
+            else:
+                high = keep - 1
+        logger.warning(
+            f"Prompt for {error.test_function} exceeds the context window; "
+            f"kept the last {low} of {len(stack_trace)} stack trace characters"
         )
+        return build(_TRUNCATED_MARKER + stack_trace[len(stack_trace) - low :])
+
+    def _prompt_fields(self, error: TestError, **extra: str) -> Dict[str, object]:
+        """Variable fields shared by the prompt templates."""
+        return {
+            "test_function": error.test_function,
+            "test_file": error.test_file,
+            "error_type": error.error_details.error_type,
+            "message": error.error_details.message,
+            "stack_trace": self._clean_stack_trace(error.error_details.stack_trace),
+            **extra,
+        }
 
     def _parse_response(self, response: str) -> CodeChanges:
         """
@@ -286,11 +1551,11 @@ class AIManager:
         """
         try:
             # Log explanation and confidence for observability
-            m = re.search(r"Explanation:\s*(.+)", response)
+            m = _EXPLANATION_RE.search(response)
             if m:
                 logger.info(f"AI explanation: {m.group(1).strip()}")
 
-            m = re.search(r"Confidence:\s*([0-9.]+)", response)
+            m = _CONFIDENCE_RE.search(response)
             if m:
                 try:
                     confidence = float(m.group(1))
@@ -304,13 +1569,14 @@ class AIManager:
 
             # Prefer fenced code blocks; fall back to "Modified code:" header;
             # last resort: treat entire response as code.
-            fence_match = re.search(r"```(?:python)?\n(.*?)```", response, re.DOTALL)
-            if fence_match:
-                modified_code = fence_match.group(1).strip()
-            elif re.search(r"Modified code\s*:", response, re.IGNORECASE):
-                modified_code = re.split(
-                    r"Modified code\s*:", response, flags=re.IGNORECASE, maxsplit=1
-                )[1].strip()
+            fenced = _extract_fenced_code(response)
+            header_match = (
+                None if fenced is not None else _MODIFIED_HEADER_RE.search(response)
+            )
+            if fenced is not None:
+                modified_code = fenced.strip()
+            elif header_match:
+                modified_code = response[header_match.end() :].strip()
             else:
                 modified_code = response.strip()
 
@@ -0,0 +1,165 @@
+# branch_fixer/services/ai/rules.py
+import ast
+import difflib
+import logging
+import re
+import sys
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from branch_fixer.core.models import CodeChanges, TestError
+
+logger = logging.getLogger(__name__)
+
+_UNDEFINED_NAME_RE = re.compile(r"name '(\w+)' is not defined")
+_MISSING_ATTRIBUTE_RE = re.compile(r"module '([\w.]+)' has no attribute '(\w+)'")
+# Whitespace is ignored, so reformatting alone never blocks a template
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+class RuleFixer:
+    """
+    Deterministic fixes for errors that do not need a model.
+
+    Each rule looks at the error message and the current test file and either
+    returns the rewritten file or None. Rules only touch the standard
+    library, so applying them never imports project code:
+
+    - ``NameError`` for a stdlib module name the file uses as ``<name>.attr``:
+      add ``import <module>``. A bare name such as ``code`` or ``time`` is
+      as likely a variable, so it is left to the LLM.
+    - ``AttributeError`` on an already imported stdlib module: replace the
+      misspelt attribute with its closest match from ``dir(module)``.
+      Modules are never imported here, so none of their import side
+      effects run.
+    - Any error whose type and message match a verified fix passed to
+      :meth:`learn` that renamed a single identifier: apply the same rename.
+
+    Anything else falls through to the LLM.
+    """
+
+    def __init__(self) -> None:
+        self._rules: List[Callable[[TestError, str], Optional[str]]] = [
+            self._add_missing_import,
+            self._fix_attribute_typo,
+            self._apply_learned_rename,
+        ]
+        # (error type, message) -> (old identifier, new identifier)
+        self._renames: Dict[Tuple[str, str], Tuple[str, str]] = {}
+
+    def learn(self, error: TestError, original: str, modified: str) -> bool:
+        """
+        Remember a verified fix as a reusable template, if it has a simple shape.
+
+        Only fixes that replace one identifier named in the error message with
+        another (every changed token being the same rename) are kept; the
+        same error in another file is then fixed without the LLM. Returns
+        True if a template was stored.
+        """
+        old_tokens = _TOKEN_RE.findall(original)
+        new_tokens = _TOKEN_RE.findall(modified)
+        renames: Set[Tuple[str, str]] = set()
+        matcher = difflib.SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                continue
+            if tag != "replace" or i2 - i1 != j2 - j1:
+                return False
+            renames.update(zip(old_tokens[i1:i2], new_tokens[j1:j2]))
+        if len(renames) != 1:
+            return False
+        old, new = renames.pop()
+        if not (old.isidentifier() and new.isidentifier()):
+            return False
+        if not re.search(rf"\b{re.escape(old)}\b", error.error_details.message):
+            return False
+        key = (error.error_details.error_type, error.error_details.message)
+        self._renames[key] = (old, new)
+        return True
+
+    def try_fix(self, error: TestError) -> Optional[CodeChanges]:
+        """Return a rule-based fix for ``error``, or None if no rule applies."""
+        try:
+            source = error.test_file.read_text(encoding="utf-8")
+        except Exception:
+            return None
+        for rule in self._rules:
+            modified = rule(error, source)
+            if modified is not None and modified != source:
+                logger.info(
+                    f"Rule {rule.__name__} fixed {error.test_function} without the LLM"
+                )
+                return CodeChanges(original_code=source, modified_code=modified)
+        return None
+
+    @staticmethod
+    def _add_missing_import(error: TestError, source: str) -> Optional[str]:
+        if error.error_details.error_type != "NameError":
+            return None
+        match = _UNDEFINED_NAME_RE.search(error.error_details.message)
+        if not match or match.group(1) not in sys.stdlib_module_names:
+            return None
+        name = match.group(1)
+        try:
+            tree = ast.parse(source)
+        except SyntaxError:
+            return None
+        if not any(
+            isinstance(node, ast.Attribute)
+            and isinstance(node.value, ast.Name)
+            and node.value.id == name
+            for node in ast.walk(tree)
+        ):
+            return None
+        body = tree.body
+
+        # Insert after the module docstring and any __future__ imports
+        insert_at = 0
+        for node in body:
+            is_docstring = (
+                isinstance(node, ast.Expr)
+                and isinstance(node.value, ast.Constant)
+                and isinstance(node.value.value, str)
+                and node is body[0]
+            )
+            is_future = isinstance(node, ast.ImportFrom) and node.module == "__future__"
+            if not (is_docstring or is_future):
+                break
+            insert_at = node.end_lineno or insert_at
+
+        lines = source.splitlines(keepends=True)
+        if insert_at and not lines[insert_at - 1].endswith("\n"):
+            # Last line of the file, without a trailing newline
+            lines[insert_at - 1] += "\n"
+        lines.insert(insert_at, f"import {name}\n")
+        return "".join(lines)
+
+    @staticmethod
+    def _fix_attribute_typo(error: TestError, source: str) -> Optional[str]:
+        if error.error_details.error_type != "AttributeError":
+            return None
+        match = _MISSING_ATTRIBUTE_RE.search(error.error_details.message)
+        if not match:
+            return None
+        module_name, attribute = match.groups()
+        if module_name.partition(".")[0] not in sys.stdlib_module_names:
+            return None
+        # Importing could run side effects (antigravity, this), so only
+        # modules that are loaded already are inspected
+        module = sys.modules.get(module_name)
+        if module is None:
+            return None
+
+        candidates = difflib.get_close_matches(attribute, dir(module), n=1, cutoff=0.8)
+        if not candidates:
+            return None
+        local_name = module_name.rpartition(".")[2]
+        pattern = re.compile(rf"\b{re.escape(local_name)}\.{re.escape(attribute)}\b")
+        return pattern.sub(f"{local_name}.{candidates[0]}", source)
+
+    def _apply_learned_rename(self, error: TestError, source: str) -> Optional[str]:
+        key = (error.error_details.error_type, error.error_details.message)
+        rename = self._renames.get(key)
+        if rename is None:
+            return None
+        old, new = rename
+        return re.sub(rf"\b{re.escape(old)}\b", new, source)
@@ -1,16 +1,74 @@
 # branch_fixer/services/code/change_applier.py
 import ast
+import asyncio
+import functools
+import hashlib
+import heapq
+import itertools
+import os
+import re
+import sys
+import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Set, Tuple
 import shutil
 from logging import getLogger
-from datetime import datetime
-from uuid import uuid4
 
 from branch_fixer.core.models import CodeChanges
 
 logger = getLogger(__name__)
 
+if sys.platform != "win32":
+    import fcntl
+
+# linux/fs.h: _IOW(0x94, 9, int) — clone a whole file as a copy-on-write reflink
+_FICLONE = 0x40049409
+_CAN_REFLINK = sys.platform.startswith("linux")
+# Below this size a plain copy is cheaper than the extra open/ioctl round trip
+_REFLINK_MIN_BYTES = 64 * 1024
+# A whole reply wrapped in a code fence; group 1 is the body. The closing
+# fence is optional so a truncated reply still loses its opening marker.
+_FENCED_CODE_RE = re.compile(r"\A\s*```[\w+-]*(.*?)(?:```)?\s*\Z", re.DOTALL)
+# PAX header recording the directory a batch archive's member names are
+# relative to
+_ARCHIVE_ROOT_HEADER = "branch_fixer.root"
+
+
+def _fast_copy(src: Path, dst: Path) -> None:
+    """
+    Copy *src* to *dst* with metadata, as a reflink where possible.
+
+    On Linux filesystems with reflink support (Btrfs, XFS, bcachefs) large
+    files are cloned copy-on-write, so the copy takes no data I/O or extra
+    space until one side is modified. Everything else goes through
+    ``shutil.copy2``. Hard links are not an option: files are rewritten in
+    place, which would change the backup too.
+    """
+    if _CAN_REFLINK and src.stat().st_size >= _REFLINK_MIN_BYTES:
+        try:
+            with open(src, "rb") as s, open(dst, "wb") as d:
+                fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            pass  # filesystem cannot reflink; fall back to a real copy
+    shutil.copy2(src, dst)
+
+
+@functools.lru_cache(maxsize=32)
+def _count_asserts(source: str) -> int:
+    """Number of assert statements in *source*."""
+    return sum(1 for n in ast.walk(ast.parse(source)) if isinstance(n, ast.Assert))
+
+
+def user_backup_dir() -> Path:
+    """Per-user cache location for backups kept outside the source tree."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "branch_fixer" / "backups"
+
 
 class ChangeApplicationError(Exception):
     """Base exception for change application errors"""
@@ -34,6 +92,60 @@ class ChangeApplier:
     BACKUP_DIRNAME = ".backups"
     # Keep at most this many backups per source file; oldest are pruned first.
     MAX_BACKUPS_PER_FILE = 5
+    # Backups under backup_dir older than this are swept on start-up.
+    MAX_BACKUP_AGE_DAYS = 7
+
+    def __init__(self, max_io_workers: int = 8, backup_dir: Optional[Path] = None):
+        """
+        Args:
+            max_io_workers: Size of the thread pool used by
+                aapply_many_with_backup to write several files concurrently.
+            backup_dir: Keep backups here (e.g. ``user_backup_dir()``), in one
+                subdirectory per source directory, instead of a .backups
+                directory inside the source tree where pytest collection,
+                file watchers and ``git status`` would scan them. Stale
+                backups there are swept in the background.
+        """
+        self._max_io_workers = max_io_workers
+        # Only the async batch path needs a pool; it is created on first use
+        self._io_pool: Optional[ThreadPoolExecutor] = None
+        self._prune_thread: Optional[threading.Thread] = None
+        self._backup_counter = itertools.count()
+        self._backup_dirs: Set[Path] = set()
+        # Latest single-file backup per source file, with its content digest
+        self._latest_backups: Dict[Path, Tuple[str, Path]] = {}
+        self.backup_dir = backup_dir
+        if backup_dir is not None:
+            self._prune_thread = threading.Thread(
+                target=self._prune_stale_backups,
+                args=(backup_dir,),
+                name="change-applier-prune",
+                daemon=True,
+            )
+            self._prune_thread.start()
+
+    def close(self) -> None:
+        """Wait for the start-up sweep and shut down the I/O pool, if any."""
+        if self._prune_thread is not None:
+            self._prune_thread.join()
+            self._prune_thread = None
+        if self._io_pool is not None:
+            self._io_pool.shutdown(wait=True)
+            self._io_pool = None
+
+    def __enter__(self) -> "ChangeApplier":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        """The shared I/O pool, created on first use."""
+        if self._io_pool is None:
+            self._io_pool = ThreadPoolExecutor(
+                max_workers=self._max_io_workers, thread_name_prefix="change-applier"
+            )
+        return self._io_pool
 
     def apply_changes_with_backup(
         self, test_file: Path, changes: CodeChanges
@@ -61,20 +173,81 @@ class ChangeApplier:
             logger.error(f"Failed to apply changes with backup: {e}")
             return (False, backup_path)
 
+    async def aapply_changes_with_backup(
+        self, test_file: Path, changes: CodeChanges
+    ) -> tuple[bool, Optional[Path]]:
+        """
+        Async variant of apply_changes_with_backup.
+
+        The whole backup/write/verify sequence runs as one job on a worker
+        thread, so the event loop is never blocked on disk I/O and pays a
+        single thread hop per file rather than one per read or write.
+        """
+        return await asyncio.to_thread(
+            self.apply_changes_with_backup, test_file, changes
+        )
+
+    async def aapply_many_with_backup(
+        self, changes: Dict[Path, CodeChanges]
+    ) -> tuple[bool, Optional[Path]]:
+        """
+        Apply changes to several files concurrently, all or nothing.
+
+        Every file is first snapshotted into a single tar archive, then the
+        files are written and verified in parallel on the shared I/O pool,
+        which also bounds how many are in flight. If any file fails, all of
+        them are restored from the archive in one extraction.
+
+        Returns:
+            (success, backup_path) where backup_path is the batch archive, or
+            None if the snapshot could not be taken.
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._pool()
+        paths = list(changes)
+        try:
+            backup_path = await loop.run_in_executor(pool, self._backup_files, paths)
+        except Exception as e:
+            logger.error(f"Failed to back up batch: {e}")
+            return False, None
+
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    pool, self._apply_changes_core, path, change, backup_path
+                )
+                for path, change in changes.items()
+            )
+        )
+        if all(results):
+            return True, backup_path
+
+        try:
+            await loop.run_in_executor(
+                pool, self._extract_from_archive, backup_path, paths
+            )
+        except Exception as e:
+            logger.warning(f"Failed to roll back batch from {backup_path}: {e}")
+        return False, backup_path
+
     def restore_backup(self, file_path: Path, backup_path: Path) -> bool:
         """
         Public method to restore a file from a known backup path.
         """
         return self._restore_backup(file_path, backup_path)
 
+    async def arestore_backup(self, file_path: Path, backup_path: Path) -> bool:
+        """Async variant of restore_backup, run on a worker thread."""
+        return await asyncio.to_thread(self._restore_backup, file_path, backup_path)
+
     def _apply_changes_core(
         self, test_file: Path, changes: CodeChanges, backup_path: Path
     ) -> bool:
         """
         Internal helper that:
-          - writes changes
-          - checks syntax
-          - reverts if syntax fails
+          - checks the new code's syntax in memory
+          - writes it only if the check passes
+          - reverts if the write fails
         """
         try:
             # Read original before overwriting (needed for AST guard)
@@ -83,27 +256,21 @@ class ChangeApplier:
             )
 
             # Clean up code markers from AI response
-            modified_code = changes.modified_code
-            if modified_code.startswith("```python"):
-                modified_code = modified_code[9:]  # Remove ```python (9 chars)
-            elif modified_code.startswith("```"):
-                modified_code = modified_code[3:]  # Remove ``` (3 chars)
-            if modified_code.endswith("```"):
-                modified_code = modified_code[:-3]  # Remove trailing ```
-            modified_code = modified_code.strip()
-
-            # Overwrite the file
-            test_file.write_text(modified_code, encoding="utf-8")
-            logger.debug(f"Wrote changes to {test_file}")
-
-            # Syntax + AST scope verification
-            if not self._verify_changes(test_file, original_source):
+            modified_code = self._strip_code_fences(changes.modified_code)
+
+            # Syntax + AST scope verification before anything touches the disk,
+            # so rejected code never needs to be restored
+            if not self._verify_changes(test_file, original_source, modified_code):
                 logger.warning(
-                    f"Changes to {test_file} did not pass local syntax verification. Restoring backup..."
+                    f"Changes to {test_file} did not pass local syntax verification; not writing them."
                 )
-                self._restore_backup(test_file, backup_path)
                 return False
 
+            # Overwrite the file, unless the fix leaves it byte-for-byte unchanged
+            if modified_code != original_source:
+                self._write_atomically(test_file, modified_code)
+                logger.debug(f"Wrote changes to {test_file}")
+
             return True
 
         except Exception as e:
@@ -115,6 +282,35 @@ class ChangeApplier:
                 logger.warning(f"Failed to revert after error: {revert_err}")
             return False
 
+    def _write_atomically(self, file_path: Path, content: str) -> None:
+        """
+        Replace *file_path* with *content* in one atomic rename.
+
+        The content goes to a temporary sibling first (same directory, so the
+        same filesystem), then ``os.replace`` swaps it in. A crash or a failed
+        write leaves either the old file or the new one, never a truncated mix.
+        """
+        tmp_path = file_path.with_name(f".{file_path.name}.{self._backup_suffix()}.tmp")
+        try:
+            tmp_path.write_text(content, encoding="utf-8")
+            if file_path.exists():
+                shutil.copymode(file_path, tmp_path)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    @staticmethod
+    def _strip_code_fences(code: str) -> str:
+        """
+        Remove a leading ```<language> fence and a trailing ``` fence.
+
+        One precompiled match finds the body, tolerating whitespace around
+        the fences and any language tag (```python, ```py, ...).
+        """
+        match = _FENCED_CODE_RE.match(code)
+        return (match.group(1) if match else code).strip()
+
     def _backup_file(self, file_path: Path) -> Path:
         """Create backup copy of file.
 
@@ -127,28 +323,140 @@ class ChangeApplier:
         if not file_path.exists():
             raise FileNotFoundError(f"Cannot backup non-existent file: {file_path}")
 
-        backups_root = file_path.parent / self.BACKUP_DIRNAME
-        backups_root.mkdir(exist_ok=True)
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        short_uuid = str(uuid4())[:8]
-        backup_name = f"{file_path.name}-{timestamp}-{short_uuid}.bak"
-        backup_path = backups_root / backup_name
+        backups_root = self._backups_root(file_path.parent)
+        backup_path = backups_root / f"{file_path.name}-{self._backup_suffix()}.bak"
 
         try:
-            shutil.copy2(file_path, backup_path)
+            with open(file_path, "rb") as f:
+                digest = hashlib.file_digest(f, "sha256").hexdigest()
+            if not self._link_identical_backup(file_path, digest, backup_path):
+                _fast_copy(file_path, backup_path)
+            self._latest_backups[file_path] = (digest, backup_path)
             logger.info(f"Created backup: {backup_path}")
-            self._prune_backups(backups_root, file_path.name)
+            self._prune_backups(backups_root, f"{file_path.name}-*.bak")
             return backup_path
         except Exception as e:
             raise BackupError(f"Failed to create backup for {file_path}: {e}") from e
 
-    def _prune_backups(self, backups_root: Path, source_name: str) -> None:
-        """Delete oldest backups for *source_name* beyond MAX_BACKUPS_PER_FILE."""
-        pattern = f"{source_name}-*.bak"
-        existing = sorted(backups_root.glob(pattern), key=lambda p: p.stat().st_mtime)
+    def _link_identical_backup(
+        self, file_path: Path, digest: str, backup_path: Path
+    ) -> bool:
+        """
+        Hard-link *backup_path* to the previous backup of *file_path* if unchanged.
+
+        Retries back up the same restored content again and again; linking
+        keeps one copy of it on disk however many backups name it. Backups
+        are never modified in place (the source is replaced by rename, and
+        restores copy out of the backup), so sharing an inode is safe.
+
+        Returns:
+            True if a link was made; False means a real copy is needed.
+        """
+        entry = self._latest_backups.get(file_path)
+        if entry is None or entry[0] != digest:
+            return False
+        try:
+            os.link(entry[1], backup_path)
+        except OSError:
+            return False  # pruned meanwhile, or no hard links on this filesystem
+        return True
+
+    def _backup_files(self, file_paths: List[Path]) -> Path:
+        """Snapshot several files into one uncompressed tar archive.
+
+        The archive is written to the backup directory of the files' common
+        parent, with members named relative to that parent (which is recorded
+        in the archive's header), so it can restore any file of the batch.
+
+        Returns:
+            Path to the archive, or raises an exception if anything fails.
+        """
+        for file_path in file_paths:
+            if not file_path.exists():
+                raise FileNotFoundError(f"Cannot backup non-existent file: {file_path}")
+
+        root = Path(os.path.commonpath([p.resolve().parent for p in file_paths]))
+        backups_root = self._backups_root(root)
+        backup_path = backups_root / f"batch-{self._backup_suffix()}.tar"
+
+        try:
+            with tarfile.open(
+                backup_path,
+                "w|",
+                format=tarfile.PAX_FORMAT,
+                pax_headers={_ARCHIVE_ROOT_HEADER: str(root)},
+            ) as tar:
+                for file_path in file_paths:
+                    tar.add(file_path, arcname=self._archive_name(root, file_path))
+            logger.info(
+                f"Created batch backup of {len(file_paths)} files: {backup_path}"
+            )
+            self._prune_backups(backups_root, "batch-*.tar")
+            return backup_path
+        except Exception as e:
+            raise BackupError(f"Failed to create batch backup: {e}") from e
+
+    def _backups_root(self, parent: Path) -> Path:
+        """Backup directory for files in *parent*, created on first use.
+
+        The .backups directory under *parent*, or with backup_dir set, a
+        subdirectory of it named by a hash of *parent*'s resolved path.
+        """
+        if self.backup_dir is None:
+            backups_root = parent / self.BACKUP_DIRNAME
+        else:
+            digest = hashlib.sha256(str(parent.resolve()).encode("utf-8"))
+            backups_root = self.backup_dir / digest.hexdigest()[:16]
+        if backups_root not in self._backup_dirs:
+            backups_root.mkdir(parents=True, exist_ok=True)
+            self._backup_dirs.add(backups_root)
+        return backups_root
+
+    def _prune_stale_backups(self, backup_dir: Path) -> None:
+        """Delete backups under *backup_dir* older than MAX_BACKUP_AGE_DAYS."""
+        cutoff = time.time() - self.MAX_BACKUP_AGE_DAYS * 86400
+        try:
+            for backup in backup_dir.glob("*/*"):
+                try:
+                    if backup.stat().st_mtime < cutoff:
+                        backup.unlink()
+                except OSError as exc:
+                    logger.warning(f"Could not prune backup {backup}: {exc}")
+        except OSError as exc:
+            logger.warning(f"Could not sweep {backup_dir}: {exc}")
+
+    def _backup_suffix(self) -> str:
+        """Unique backup name suffix: a nanosecond timestamp plus a counter."""
+        return f"{time.time_ns()}-{next(self._backup_counter)}"
+
+    @staticmethod
+    def _archive_name(root: Path, file_path: Path) -> str:
+        return file_path.resolve().relative_to(root).as_posix()
+
+    def _extract_from_archive(self, backup_path: Path, file_paths: List[Path]) -> None:
+        """Restore *file_paths* from a batch archive in a single extraction."""
+        with tarfile.open(backup_path) as tar:
+            # Archives without the header sit in <root>/.backups
+            root = Path(
+                tar.pax_headers.get(_ARCHIVE_ROOT_HEADER, backup_path.parent.parent)
+            )
+            wanted = {self._archive_name(root, p) for p in file_paths}
+            members = [m for m in tar.getmembers() if m.name in wanted]
+            if len(members) != len(wanted):
+                raise BackupError(f"{backup_path} does not contain all of {file_paths}")
+            tar.extractall(root, members=members, filter="data")
+
+    def _prune_backups(self, backups_root: Path, pattern: str) -> None:
+        """Delete oldest backups matching *pattern* beyond MAX_BACKUPS_PER_FILE."""
+        existing = list(backups_root.glob(pattern))
         excess = len(existing) - self.MAX_BACKUPS_PER_FILE
-        for old in existing[:excess]:
+        if excess <= 0:
+            return
+        # Only the excess needs ordering, and each file is stat'ed just once.
+        # Hard-linked backups share an mtime; their names (timestamp suffix)
+        # break the tie so the newest is never the one pruned.
+        keys = {p: (p.stat().st_mtime, p.name) for p in existing}
+        for old in heapq.nsmallest(excess, existing, key=keys.__getitem__):
             try:
                 old.unlink()
                 logger.debug(f"Pruned old backup: {old.name}")
@@ -164,7 +472,10 @@ class ChangeApplier:
                 f"No backup found at {backup_path} to restore {file_path}"
             )
         try:
-            shutil.copy2(backup_path, file_path)
+            if backup_path.suffix == ".tar":
+                self._extract_from_archive(backup_path, [file_path])
+            else:
+                _fast_copy(backup_path, file_path)
             logger.info(f"Restored {file_path} from backup {backup_path}")
             return True
         except Exception as e:
@@ -172,27 +483,34 @@ class ChangeApplier:
                 f"Failed to restore {file_path} from {backup_path}: {e}"
             ) from e
 
-    def _verify_changes(self, file_path: Path, original_source: str = "") -> bool:
+    def _verify_changes(
+        self,
+        file_path: Path,
+        original_source: str = "",
+        updated_source: Optional[str] = None,
+    ) -> bool:
         """
         Verify file is valid after changes.
 
+        ``updated_source`` is the content just written; when given, the file
+        is not read back from disk.
+
         Checks:
-        1. Syntax must compile.
+        1. Syntax must parse. ``ast.parse`` stops before bytecode generation,
+           and its tree is reused for the assert count below.
         2. If original_source is provided and was a test file (contained
            assert statements), the modified version must not reduce assert
            count to zero — guards against AI deleting all assertions.
         """
         try:
-            updated_source = file_path.read_text(encoding="utf-8")
-            compile(updated_source, file_path.name, "exec")
+            if updated_source is None:
+                updated_source = file_path.read_text(encoding="utf-8")
+            new_tree = ast.parse(updated_source, filename=file_path.name)
 
             if original_source:
                 try:
-                    orig_tree = ast.parse(original_source)
-                    new_tree = ast.parse(updated_source)
-                    orig_asserts = sum(
-                        1 for n in ast.walk(orig_tree) if isinstance(n, ast.Assert)
-                    )
+                    # Retries verify against the same original, hence the cache
+                    orig_asserts = _count_asserts(original_source)
                     new_asserts = sum(
                         1 for n in ast.walk(new_tree) if isinstance(n, ast.Assert)
                     )
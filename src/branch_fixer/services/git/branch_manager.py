@@ -1,20 +1,98 @@
 # branch_fixer/services/git/branch_manager.py
-import re
-from typing import Optional, Set
+from __future__ import annotations
 
-# Add the missing GitRepository import (adjust the path if needed)
-from typing import TYPE_CHECKING
+import string
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Optional, Tuple
 
+# repository.py imports this module, so GitRepository is only needed (and
+# only importable) for type checkers
 if TYPE_CHECKING:
     from .repository import GitRepository
 
 from branch_fixer.services.git.exceptions import (
     BranchCreationError,
     BranchNameError,
+    BranchNotFoundError,
     GitError,
 )
 from branch_fixer.services.git.models import BranchMetadata, BranchStatus
 
+# Characters allowed by BranchManager.name_pattern; a set test needs no
+# regex engine or Match object
+_BRANCH_NAME_CHARS = frozenset(string.ascii_letters + string.digits + "-_/")
+
+# Names a fix branch may not take (compared case-insensitively)
+_FORBIDDEN_BRANCH_NAMES: FrozenSet[str] = frozenset({"master", "main", "develop"})
+
+
+# Branch name (without refs/heads/), commit sha, upstream and a "*" on the
+# checked-out branch, NUL-separated
+_BRANCH_METADATA_FORMAT = (
+    "--format=%(refname:lstrip=2)%00%(objectname)%00%(upstream:short)%00%(HEAD)"
+)
+
+# Per-invocation config, so the user's repository config is never written.
+# The untracked cache lets status skip directories unchanged since the last
+# run instead of re-reading them; git stores it in the index on first use.
+# --branch reports the current branch in the same pass; --no-ahead-behind
+# keeps it from walking history to count commits against the upstream.
+_STATUS_ARGS = (
+    "-c",
+    "core.untrackedCache=true",
+    "status",
+    "--porcelain=v2",
+    "-z",
+    "--no-renames",
+    "--branch",
+    "--no-ahead-behind",
+)
+
+_BRANCH_HEAD_HEADER = "# branch.head "
+
+
+def _split_status(entries: List[str]) -> Tuple[str, List[str]]:
+    """
+    Separate the current branch from the file records of a status run.
+
+    *entries* are ``git status --porcelain=v2 -z --branch`` records; header
+    lines start with ``#``. A detached HEAD is reported as ``(detached)``
+    and returned as "", matching ``git branch --show-current``.
+    """
+    current_branch = ""
+    records = []
+    for entry in entries:
+        if entry.startswith(_BRANCH_HEAD_HEADER):
+            head = entry[len(_BRANCH_HEAD_HEADER) :]
+            current_branch = "" if head == "(detached)" else head
+        elif not entry.startswith("#"):
+            records.append(entry)
+    return current_branch, records
+
+
+def _worktree_changes(entries: List[str]) -> List[str]:
+    """
+    Paths of tracked files whose working copy differs from the index.
+
+    *entries* are ``git status --porcelain=v2 -z --no-renames`` records.
+    Ordinary ("1") and unmerged ("u") records carry the worktree status as
+    the second character of their XY field ("." when unchanged) and the path
+    as the final field, after 8 and 10 fields respectively. Untracked ("?")
+    and ignored ("!") files have no index entry to differ from.
+    """
+    changes = []
+    for entry in entries:
+        kind = entry[0]
+        if kind == "1":
+            fields = entry.split(" ", 8)
+        elif kind == "u":
+            fields = entry.split(" ", 10)
+        else:
+            continue
+        if fields[1][1] != ".":
+            changes.append(fields[-1])
+    return changes
+
 
 class BranchManager:
     """
@@ -24,7 +102,7 @@ class BranchManager:
     validation and error recovery.
     """
 
-    def __init__(self, repository: "GitRepository"):
+    def __init__(self, repository: GitRepository):
         """
         Initialize with repository reference.
 
@@ -37,7 +115,7 @@ class BranchManager:
         self.repository = repository
         # Branch name validation patterns
         self.name_pattern = r"^[a-zA-Z0-9\-_\/]+$"
-        self.forbidden_names: Set[str] = {"master", "main", "develop"}
+        self.forbidden_names: FrozenSet[str] = _FORBIDDEN_BRANCH_NAMES
 
     def get_status(self) -> BranchStatus:
         """
@@ -46,11 +124,16 @@ class BranchManager:
         Returns:
             BranchStatus: The current branch status.
         """
-        current_branch = self.repository.get_current_branch()
-        has_changes = self.repository.is_clean()
-        changes = [item.a_path for item in self.repository.repo.index.diff(None)]
+        # One git status answers "which branch?", "anything uncommitted?"
+        # and "which tracked files differ from the index?"
+        result = self.repository.run_command(list(_STATUS_ARGS))
+        current_branch, records = _split_status(
+            [entry for entry in result.stdout.split("\0") if entry]
+        )
         return BranchStatus(
-            current_branch=current_branch, has_changes=not has_changes, changes=changes
+            current_branch=current_branch,
+            has_changes=bool(records),
+            changes=_worktree_changes(records),
         )
 
     def create_fix_branch(
@@ -71,7 +154,7 @@ class BranchManager:
             GitError: For other Git errors
         """
         try:
-            # Validate that the branch name is valid and does not already exist
+            # Validate the name; existence is left to ``checkout -b`` itself
             self._check_valid_new_branch_name(branch_name)
 
             # Determine the base branch
@@ -84,39 +167,56 @@ class BranchManager:
             # Convert to appropriate error type
             if isinstance(e, (BranchNameError, BranchCreationError)):
                 raise e
-            raise GitError(f"Failed to create branch {branch_name}: {str(e)}")
+            raise GitError(f"Failed to create branch {branch_name}: {str(e)}") from e
 
     def _check_valid_new_branch_name(self, branch_name: str) -> None:
         """
-        Check that the new branch name is valid, non-empty, matches pattern,
-        and does not already exist in the repository.
+        Check that the new branch name is valid, non-empty and matches pattern.
+
+        Whether the branch already exists is not checked here:
+        ``checkout -b`` refuses an existing name on its own, so the lookup
+        only runs once that command has failed.
 
         Raises:
             BranchNameError: If branch name is invalid
-            BranchCreationError: If branch already exists
         """
         if not self.validate_branch_name(branch_name):
             raise BranchNameError(f"Invalid branch name: {branch_name}")
 
-        if self.repository.branch_exists(branch_name):
-            raise BranchCreationError(f"Branch {branch_name} already exists")
-
     def _create_and_checkout_branch(self, branch_name: str, base_branch: str) -> bool:
         """
         Create a new branch from the specified base branch and switch to it.
 
         Raises:
-            BranchCreationError: If Git command fails
+            BranchCreationError: If the branch already exists or Git fails
         """
-        result = self.repository.run_command(
-            ["checkout", "-b", branch_name, base_branch]
-        )
+        try:
+            result = self.repository.run_command(
+                ["checkout", "-b", branch_name, base_branch]
+            )
+        except GitError as e:
+            self._raise_if_branch_exists(branch_name, e)
+            raise BranchCreationError(
+                f"Failed to create branch {branch_name}: {e}"
+            ) from e
         if result.returncode != 0:
+            self._raise_if_branch_exists(branch_name)
             raise BranchCreationError(
                 f"Failed to create branch {branch_name}: {result.stderr}"
             )
         return True
 
+    def _raise_if_branch_exists(
+        self, branch_name: str, cause: Optional[Exception] = None
+    ) -> None:
+        """Explain a failed ``checkout -b`` caused by an existing branch.
+
+        Asking the repository keeps this independent of git's (possibly
+        localised) error text.
+        """
+        if self.repository.branch_exists(branch_name):
+            raise BranchCreationError(f"Branch {branch_name} already exists") from cause
+
     def cleanup_fix_branch(self, branch_name: str, force: bool = False) -> bool:
         """Clean up a fix branch after merging.
 
@@ -131,27 +231,26 @@ class BranchManager:
             GitError: If cleanup fails with unexpected error
         """
         try:
-            # Check if branch exists
-            if not self.repository.branch_exists(branch_name):
+            # Existence and "is it checked out" come from one git call
+            exists, is_current = self.repository.branch_state(branch_name)
+            if not exists:
                 # Branch doesn't exist - consider cleanup successful
                 return True
 
             # Switch back to main branch if needed
-            current_branch = self.repository.get_current_branch()
-            if current_branch == branch_name:
+            if is_current:
                 self.repository.run_command(["checkout", self.repository.main_branch])
 
-            # Delete the branch
-            delete_args = ["branch", "-D" if force else "-d", branch_name]
-            result = self.repository.run_command(delete_args)
-
+            # Delete the branch; BranchNotFoundError if someone else deleted
+            # it since branch_state looked
+            result = self.repository.delete_branch(branch_name, force)
             return result.returncode == 0
 
-        except Exception as e:
-            # Only raise if it's not just a "branch not found" error
-            if "not found" not in str(e).lower():
-                raise GitError(f"Failed to clean up branch {branch_name}: {str(e)}")
+        except BranchNotFoundError:
+            # Branch is already gone - consider cleanup successful
             return True
+        except Exception as e:
+            raise GitError(f"Failed to clean up branch {branch_name}: {str(e)}") from e
 
     def get_branch_metadata(self, branch_name: str) -> BranchMetadata:
         """
@@ -164,9 +263,57 @@ class BranchManager:
             BranchMetadata for the branch
 
         Raises:
+            BranchNotFoundError: If the branch does not exist
             GitError: If status check fails
         """
-        raise NotImplementedError()
+        metadata = self.get_branch_metadata_batch([branch_name])
+        if branch_name not in metadata:
+            raise BranchNotFoundError(f"Branch {branch_name} not found")
+        return metadata[branch_name]
+
+    def get_branch_metadata_batch(
+        self, branch_names: List[str]
+    ) -> Dict[str, BranchMetadata]:
+        """
+        Get metadata for several branches with a single ``git for-each-ref``.
+
+        Only the checked-out branch can have uncommitted changes, so
+        ``modified_files`` comes from get_status for that branch and is
+        empty for the others.
+
+        Args:
+            branch_names: Branches to check
+
+        Returns:
+            BranchMetadata per existing branch; missing branches are left out
+
+        Raises:
+            GitError: If status check fails
+        """
+        if not branch_names:
+            return {}
+        wanted = set(branch_names)
+        result = self.repository.run_command(
+            ["for-each-ref", _BRANCH_METADATA_FORMAT]
+            + [f"refs/heads/{name}" for name in wanted]
+        )
+        metadata: Dict[str, BranchMetadata] = {}
+        for line in result.stdout.splitlines():
+            name, last_commit, upstream, head = line.split("\0")
+            # Patterns also match branches nested below a requested name
+            if name not in wanted:
+                continue
+            current = head == "*"
+            metadata[name] = BranchMetadata(
+                name=name,
+                current=current,
+                upstream=upstream or None,
+                last_commit=last_commit,
+                modified_files=(
+                    [Path(p) for p in self.get_status().changes] if current else []
+                ),
+            )
+        return metadata
 
     def validate_branch_name(self, branch_name: str) -> bool:
         """Validate branch name follows conventions.
@@ -195,7 +342,7 @@ class BranchManager:
             raise BranchNameError("Branch name cannot be empty")
 
     def _check_branch_name_pattern(self, branch_name: str) -> None:
-        if not re.match(self.name_pattern, branch_name):
+        if not _BRANCH_NAME_CHARS.issuperset(branch_name):
             raise BranchNameError(
                 f"Branch name '{branch_name}' contains invalid characters"
             )
@@ -92,5 +92,11 @@ class BranchNameError(GitError):
     pass
 
 
+class BranchNotFoundError(GitError):
+    """Raised when a branch does not exist."""
+
+    pass
+
+
 if TYPE_CHECKING:
     pass
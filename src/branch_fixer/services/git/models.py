@@ -2,11 +2,11 @@
 from enum import Enum
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
 
 
-@dataclass
+@dataclass(slots=True)
 class ErrorDetails:
     """Class to store detailed error information."""
 
@@ -14,7 +14,7 @@ class ErrorDetails:
     message: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class GitErrorDetails:
     """
     Class to store details of a Git-related error or metadata.
@@ -28,14 +28,14 @@ class GitErrorDetails:
     error_details: ErrorDetails
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CommandResult:
     """Represents the result of a Git command execution"""
 
     returncode: int
     stdout: str
     stderr: str
-    command: List[str]  # Changed from str to List[str]
+    command: Tuple[str, ...]  # argv, so results are hashable value objects
 
     @property
     def failed(self) -> bool:
@@ -64,7 +64,7 @@ class PRStatus(Enum):
     CLOSED = "closed"
 
 
-@dataclass
+@dataclass(slots=True)
 class PRChange:
     """Record of a change made to a pull request"""
 
@@ -75,7 +75,7 @@ class PRChange:
     reason: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class PRDetails:
     """Comprehensive pull request details"""
 
@@ -92,7 +92,7 @@ class PRDetails:
     url: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class BackupMetadata:
     """Metadata for repository backups"""
 
@@ -104,7 +104,7 @@ class BackupMetadata:
     metadata: Dict[str, Any]
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class BranchStatus:
     """
     Represents the status of a Git branch.
@@ -120,7 +120,7 @@ class BranchStatus:
     changes: List[str]
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class BranchMetadata:
     """
     Metadata about a Git branch.
@@ -1,4 +1,5 @@
 # branch_fixer/services/git/pr_manager.py
+import itertools
 import shutil
 import subprocess
 from typing import Dict, List, Optional, Any
@@ -37,6 +38,8 @@ class PRManager:
         self.max_files = max_files
         self.required_checks = required_checks or []
         self.prs: dict[int, PRDetails] = {}
+        # Ids are never reused, even if a PR is later dropped from self.prs
+        self._pr_ids = itertools.count(1)
 
     def create_pr(
         self,
@@ -63,7 +66,7 @@ class PRManager:
             PRCreationError: If creation fails or validation fails
             PRValidationError: If branch doesn't exist or has conflicts
         """
-        pr_id = len(self.prs) + 1
+        pr_id = next(self._pr_ids)
         url: Optional[str] = None
 
         if shutil.which("gh"):
@@ -111,7 +114,7 @@ class PRManager:
         self.prs[pr_id] = details
         return details
 
-    async def update_pr(
+    def update_pr(
         self,
         pr_id: int,
         status: Optional[PRStatus] = None,
@@ -137,7 +140,7 @@ class PRManager:
             raise PRUpdateError("PR not found")
         return self.prs[pr_id]
 
-    async def validate_pr(self, pr_id: int) -> bool:
+    def validate_pr(self, pr_id: int) -> bool:
         """Validate PR is in consistent state
 
         Args:
@@ -152,7 +155,7 @@ class PRManager:
         """
         return pr_id in self.prs
 
-    async def get_pr_history(self, pr_id: int) -> List[PRChange]:
+    def get_pr_history(self, pr_id: int) -> List[PRChange]:
         """Get complete change history for PR
 
         Args:
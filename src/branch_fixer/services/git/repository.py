@@ -1,8 +1,10 @@
 # branch_fixer/services/git/repository.py
 import logging
 import subprocess
+import threading
+import weakref
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import List, Optional, Tuple, Union
 
 from git import GitCommandError, Repo
 
@@ -10,6 +12,7 @@ from branch_fixer.services.git.branch_manager import BranchManager
 from branch_fixer.services.git.exceptions import (
     BranchCreationError,
     BranchNameError,
+    BranchNotFoundError,
     GitError,
     InvalidGitRepositoryError,
     NoSuchPathError,
@@ -22,6 +25,22 @@ from branch_fixer.services.git.pr_manager import PRManager
 logger = logging.getLogger(__name__)
 
 
+_HEAD_BRANCH_PREFIX = b"ref: refs/heads/"
+
+
+def _stop_ref_reader(reader: subprocess.Popen[str]) -> None:
+    """Close the cat-file process's input (which ends it) and reap it."""
+    try:
+        if reader.stdin is not None:
+            reader.stdin.close()
+        reader.wait(timeout=5)
+    except (OSError, subprocess.TimeoutExpired):
+        reader.kill()
+        reader.wait()
+    if reader.stdout is not None:
+        reader.stdout.close()
+
+
 class GitRepository:
     """
     Represents a Git repository and provides methods to interact with it.
@@ -52,6 +71,10 @@ class GitRepository:
             self.root: Path = self._find_git_root(root or Path.cwd())
             self.repo: Repo = Repo(self.root)
             self.main_branch: str = self._get_main_branch()
+            # Long-lived `git cat-file --batch-check`, started on the first
+            # ref lookup and shared by later ones
+            self._ref_reader: Optional[subprocess.Popen[str]] = None
+            self._ref_lock = threading.Lock()
 
             # Initialize managers for PRs, branches, and safety (backup/restore)
             self.pr_manager: PRManager = PRManager(self)
@@ -185,7 +208,7 @@ class GitRepository:
             returncode=process.returncode,
             stdout=process.stdout,
             stderr=process.stderr,
-            command=full_cmd,
+            command=tuple(full_cmd),
         )
         logger.debug(f"Command result: {result}")
         return result
@@ -225,7 +248,9 @@ class GitRepository:
         """
         Check if a branch with the specified name exists in the repository.
 
-        Uses `git branch --list <branch_name>` to check for existence.
+        Resolves ``refs/heads/<branch_name>`` directly (through resolve_ref,
+        or `git rev-parse --verify --quiet` if that is unavailable) rather
+        than listing branches and matching the name as a pattern.
 
         Args:
             branch_name (str): The name of the branch to check.
@@ -237,18 +262,151 @@ class GitRepository:
             GitError: If unable to determine branch existence (e.g., command failure).
         """
         try:
-            result = self.run_command(["branch", "--list", branch_name])
-            exists = bool(result.stdout.strip())
+            return self.resolve_ref(f"refs/heads/{branch_name}") is not None
+        except Exception as e:
+            logger.debug(f"Persistent ref lookup unavailable, using rev-parse: {e}")
+        try:
+            # A missing ref is exit code 1, which run_command would raise on
+            result = self._execute_subprocess(
+                self._prepare_git_command(
+                    ["rev-parse", "--verify", "--quiet", f"refs/heads/{branch_name}"]
+                )
+            )
+            if result.returncode not in (0, 1):
+                self._check_command_error(result)
+            exists = result.returncode == 0
             logger.debug(f"Branch '{branch_name}' exists: {exists}")
             return exists
         except Exception as e:
             raise GitError(f"Unable to check branch existence: {str(e)}") from e
 
+    def delete_branch(self, branch_name: str, force: bool = False) -> CommandResult:
+        """
+        Delete a local branch with ``git branch -d`` (``-D`` when forced).
+
+        Args:
+            branch_name (str): The branch to delete.
+            force (bool): Whether to delete it even if it is not merged.
+
+        Returns:
+            CommandResult: The result of the delete command.
+
+        Raises:
+            BranchNotFoundError: If the branch does not exist.
+            GitError: If the delete fails for any other reason.
+        """
+        try:
+            return self.run_command(["branch", "-D" if force else "-d", branch_name])
+        except GitError as e:
+            # Asked directly rather than read from git's (localised) stderr
+            if not self.branch_exists(branch_name):
+                raise BranchNotFoundError(f"Branch {branch_name} not found") from e
+            raise
+
+    def resolve_ref(self, ref: str) -> Optional[str]:
+        """
+        Resolve a ref to its object name through a persistent git process.
+
+        The first call starts ``git cat-file --batch-check``; every later
+        lookup is one line written to it and one line read back, with no
+        process start-up.
+
+        Args:
+            ref (str): A full ref name, e.g. ``refs/heads/main``.
+
+        Returns:
+            Optional[str]: The object name, or None if the ref does not exist.
+
+        Raises:
+            GitError: If the lookup process cannot be started or has exited.
+        """
+        if "\n" in ref:
+            return None  # would split into two queries; no ref contains one
+        with self._ref_lock:
+            reader = self._ref_reader
+            if reader is None or reader.poll() is not None:
+                reader = self._start_ref_reader()
+            stdin, stdout = reader.stdin, reader.stdout
+            if stdin is None or stdout is None:
+                raise GitError("git cat-file was started without pipes")
+            stdin.write(f"{ref}\n")
+            stdin.flush()
+            line = stdout.readline()
+        if not line:
+            raise GitError("git cat-file exited unexpectedly")
+        # "<sha> <type> <size>", or "<ref> missing"
+        if line.rstrip("\n").endswith(" missing"):
+            return None
+        return line.split(" ", 1)[0]
+
+    def _start_ref_reader(self) -> subprocess.Popen[str]:
+        """Start the cat-file process behind resolve_ref (caller holds the lock)."""
+        try:
+            reader = subprocess.Popen(
+                ["git", "cat-file", "--batch-check"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                cwd=str(self.root),
+                text=True,
+            )
+        except OSError as e:
+            raise GitError(f"Unable to start git cat-file: {e}") from e
+        self._ref_reader = reader
+        weakref.finalize(self, _stop_ref_reader, reader)
+        return reader
+
+    def close(self) -> None:
+        """Stop the persistent ref-lookup process, if one was started."""
+        with self._ref_lock:
+            if self._ref_reader is not None:
+                _stop_ref_reader(self._ref_reader)
+                self._ref_reader = None
+
+    def branch_state(self, branch_name: str) -> Tuple[bool, bool]:
+        """
+        Check whether a branch exists and whether it is checked out, in one call.
+
+        Normally answered without a new git process: the ref is resolved
+        through resolve_ref and the current branch is read from the HEAD
+        file. If either is unavailable, ``git branch --list <branch_name>``
+        is used instead, which marks the current branch with ``*``.
+
+        Args:
+            branch_name (str): The name of the branch to check.
+
+        Returns:
+            Tuple[bool, bool]: (exists, is current branch).
+
+        Raises:
+            GitError: If unable to list branches.
+        """
+        try:
+            exists = self.resolve_ref(f"refs/heads/{branch_name}") is not None
+        except Exception as e:
+            logger.debug(f"Persistent ref lookup unavailable, listing branches: {e}")
+        else:
+            if not exists:
+                return False, False
+            head = self._read_head_branch()
+            if head is not None:
+                return True, head == branch_name
+        try:
+            result = self.run_command(["branch", "--list", branch_name])
+            for line in result.stdout.splitlines():
+                if line[2:].strip() == branch_name:
+                    return True, line.startswith("*")
+            return False, False
+        except Exception as e:
+            raise GitError(f"Unable to check branch existence: {str(e)}") from e
+
     def get_current_branch(self) -> str:
         """
         Retrieve the name of the currently checked-out branch.
 
-        Uses `git branch --show-current` to determine which branch is currently active.
+        Reads the branch straight from the HEAD file when it holds a symbolic
+        ref; otherwise (detached HEAD, unreadable file) uses
+        `git branch --show-current`.
 
         Returns:
             str: The name of the current branch.
@@ -257,6 +415,9 @@ class GitRepository:
             GitError: If unable to determine the current branch (e.g., if in detached HEAD state
                       without handling or command failure).
         """
+        branch = self._read_head_branch()
+        if branch is not None:
+            return branch
         try:
             result = self.run_command(["branch", "--show-current"])
             current_branch = result.stdout.strip()
@@ -265,6 +426,19 @@ class GitRepository:
         except Exception as e:
             raise GitError(f"Unable to determine current branch: {str(e)}") from e
 
+    def _read_head_branch(self) -> Optional[str]:
+        """Branch named by the HEAD file, or None if it is not a plain branch ref."""
+        try:
+            with open(Path(self.repo.git_dir) / "HEAD", "rb") as head_file:
+                head = head_file.read(256)
+        except (AttributeError, OSError):
+            return None
+        if not head.startswith(_HEAD_BRANCH_PREFIX):
+            return None  # detached: HEAD holds a commit sha
+        branch = head[len(_HEAD_BRANCH_PREFIX) :].strip().decode("utf-8")
+        # Reftable repositories keep a placeholder HEAD file
+        return None if branch == ".invalid" else branch
+
     def clone(self, url: str, destination: Optional[Path] = None) -> bool:
         """
         Clone a Git repository from the specified URL to the destination path.
@@ -1,9 +1,10 @@
 # branch_fixer/services/pytest/error_info.py
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional, Tuple
 
 
-@dataclass
+@dataclass(slots=True)
 class ErrorInfo:
     test_file: str
     function: str
@@ -12,6 +13,13 @@ class ErrorInfo:
     line_number: str = "0"
     code_snippet: str = ""
 
+    @staticmethod
+    def split_nodeid(nodeid: str) -> Tuple[str, Optional[str], str]:
+        """Splits a pytest nodeid into (file, class or None, function)"""
+        test_file, _, tail = nodeid.partition("::")
+        head, _, function = tail.rpartition("::")
+        return test_file, head or None, function
+
     @property
     def file_path(self) -> Path:
         """Returns Path object for test file"""
@@ -7,7 +7,7 @@ from pathlib import Path
 from _pytest.main import ExitCode
 
 
-@dataclass
+@dataclass(slots=True)
 class TestResult:
     """Detailed test execution result."""
 
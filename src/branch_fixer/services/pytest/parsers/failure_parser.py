@@ -9,6 +9,10 @@ PATTERNS = [
     r"([\w\/\._-]+):(\d+):\s+([\w\.]+Error)",
 ]
 
+# Classifies a stripped line by its leading marker in one anchored match:
+# "=" section rule, "E" error detail, ">" failing line, "_" header/separator.
+_LINE_KIND_RE = re.compile(r"===|E |>|_")
+
 
 class FailureParser:
     """Parses pytest test failures and extracts error information."""
@@ -35,6 +39,9 @@ class FailureParser:
         lines = output.splitlines()
 
         capture_traceback = False
+        # Set once the block's ``file:line: Error`` line is recorded; the rest of
+        # the block is skipped until the next underscore header or "===" footer.
+        block_done = False
         current_function: Optional[str] = None
         traceback_lines: list[str] = []
         error_details_lines: list[str] = []
@@ -42,6 +49,12 @@ class FailureParser:
         for line in lines:
             stripped = line.strip()
 
+            kind_match = _LINE_KIND_RE.match(stripped)
+            kind = kind_match.group()[0] if kind_match else ""
+            is_header = kind == "_" and stripped.endswith("_")
+            if block_done and kind != "=" and not is_header:
+                continue
+
             if self._should_start_capturing(stripped):
                 capture_traceback = True
                 continue
@@ -49,19 +62,24 @@ class FailureParser:
             if not capture_traceback:
                 continue
 
-            if self._is_test_header(stripped):
+            if kind == "=" and self._is_section_terminator(stripped):
+                # Nothing after the summary footer belongs to a failure block
+                break
+
+            if is_header:
+                block_done = False
                 current_function, traceback_lines, error_details_lines = (
                     self._handle_test_header(line, stripped, current_function)
                 )
                 continue
 
-            if self._is_error_detail(stripped):
+            if kind == "E":
                 self._handle_error_detail(
                     line, stripped, traceback_lines, error_details_lines
                 )
                 continue
 
-            if self._is_failing_line_indicator(stripped):
+            if kind == ">":
                 traceback_lines.append(line)
                 continue
 
@@ -70,6 +88,7 @@ class FailureParser:
             )
             if error_info:
                 errors.append(error_info)
+                block_done = True
 
         return errors
 
@@ -77,6 +96,14 @@ class FailureParser:
         """Determine if traceback capturing should start."""
         return "FAILURES" in stripped_line
 
+    def _is_section_terminator(self, stripped_line: str) -> bool:
+        """Check if the line is the short-summary or final results footer."""
+        return stripped_line.startswith("===") and (
+            "short test summary" in stripped_line
+            or " failed" in stripped_line
+            or " passed" in stripped_line
+        )
+
     def _handle_test_header(
         self, line: str, stripped_line: str, current_function: Optional[str]
     ) -> Tuple[Optional[str], List[str], List[str]]:
@@ -113,18 +140,6 @@ class FailureParser:
         traceback_lines.append(line)
         error_details_lines.append(error_line)
 
-    def _is_test_header(self, stripped_line: str) -> bool:
-        """Check if the line is a test header."""
-        return stripped_line.startswith("_") and stripped_line.endswith("_")
-
-    def _is_error_detail(self, stripped_line: str) -> bool:
-        """Check if the line contains error details."""
-        return stripped_line.startswith("E ")
-
-    def _is_failing_line_indicator(self, stripped_line: str) -> bool:
-        """Check if the line indicates a failing line."""
-        return stripped_line.startswith(">")
-
     def _process_line_for_error(
         self,
         line: str,
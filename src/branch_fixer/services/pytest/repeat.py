@@ -0,0 +1,76 @@
+# branch_fixer/services/pytest/repeat.py
+"""
+Pytest plugin that runs every collected test several times in one session.
+
+Loaded with ``-p branch_fixer.services.pytest.repeat --repeat-count N``. Each
+test is parametrized over an extra repetition index, so all repetitions share
+a single interpreter start-up and collection. With ``--repeat-log PATH`` every
+test report is also appended to PATH as a JSON line (``path``, ``nodeid``,
+``when``, ``outcome``) for the parent process to aggregate; the log works with
+the default repeat count of 1 as well.
+"""
+
+import json
+import re
+
+import pytest
+
+REPEAT_ARGNAME = "__repeat_index"
+
+# The repetition id is the whole parameter id, or the last "-"-joined part of
+# it when the test is already parametrized
+_REPEAT_ID_RE = re.compile(r"\[run\d+\]$|-run\d+(?=\]$)")
+
+
+def base_nodeid(nodeid: str) -> str:
+    """Strip the repetition id from a node id produced under this plugin."""
+    return _REPEAT_ID_RE.sub("", nodeid)
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--repeat-count",
+        type=int,
+        default=1,
+        help="Run each collected test this many times.",
+    )
+    parser.addoption(
+        "--repeat-log",
+        default=None,
+        help="Append one JSON line per test report to this file.",
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    path = config.getoption("repeat_log")
+    if path:
+        config.pluginmanager.register(_OutcomeLog(path), "repeat-outcome-log")
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
+    count = metafunc.config.getoption("repeat_count")
+    if count > 1:
+        metafunc.fixturenames.append(REPEAT_ARGNAME)
+        metafunc.parametrize(REPEAT_ARGNAME, range(count), ids=lambda i: f"run{i + 1}")
+
+
+class _OutcomeLog:
+    """Writes each test report's outcome as a JSON line."""
+
+    def __init__(self, path: str):
+        self._path = path
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_makereport(self, item: pytest.Item, call: pytest.CallInfo):
+        report = yield
+        record = {
+            "path": str(item.path),
+            "nodeid": report.nodeid,
+            "when": report.when,
+            "outcome": report.outcome,
+        }
+        # Appended one record at a time so a run killed on timeout keeps
+        # every outcome reported before it
+        with open(self._path, "a", encoding="utf-8") as log:
+            log.write(json.dumps(record) + "\n")
+        return report
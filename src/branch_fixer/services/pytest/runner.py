@@ -1,23 +1,50 @@
 # branch_fixer/services/pytest/runner.py
 
+import asyncio
+import contextlib
+import importlib.util
+import json
 import logging
+import multiprocessing
+import os
 import shutil
+import signal
 import subprocess
 import sys
+import tempfile
 import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from threading import RLock
-from typing import List, Optional
+from typing import Deque, Dict, List, Optional, Sequence, Set, Tuple
 
 import pytest
 from _pytest.main import ExitCode
 from _pytest.reports import CollectReport, TestReport
 
+from branch_fixer.services.pytest.error_info import ErrorInfo
 from branch_fixer.services.pytest.models import SessionResult, TestResult
+from branch_fixer.services.pytest.repeat import base_nodeid
 
 logger = logging.getLogger(__name__)
 
+# How much of a failed verification run's output is decoded for debug logging
+_VERIFY_OUTPUT_TAIL_BYTES = 64 * 1024
+# Size of each read while an async verification run streams its output
+_VERIFY_READ_CHUNK_BYTES = 64 * 1024
+# How long to keep reading after the test exits; a background process it
+# started can hold the pipe open indefinitely
+_VERIFY_DRAIN_GRACE_SECONDS = 2.0
+# How often the exit of a verification run is checked while its pipe is open
+_VERIFY_EXIT_POLL_SECONDS = 0.1
+
+_POSIX = os.name == "posix"
+# With pytest-timeout available, a timed verification also gets --timeout so
+# a hanging test is stopped from inside before the outer deadline kills it
+_HAS_PYTEST_TIMEOUT = importlib.util.find_spec("pytest_timeout") is not None
+
 
 def force_remove(path: Path, retries: int = 5, delay: int = 2) -> None:
     """
@@ -47,6 +74,69 @@ def force_remove(path: Path, retries: int = 5, delay: int = 2) -> None:
                 raise e
 
 
+def _available_cpus() -> int:
+    """Number of CPUs this process may run on (affinity-aware where supported)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+async def _drain(stream: asyncio.StreamReader, tail: Deque[bytes]) -> None:
+    """Read a subprocess stream to EOF in fixed-size chunks, keeping the last ones.
+
+    Chunks rather than lines, so a single huge line is no different from
+    many short ones.
+    """
+    while chunk := await stream.read(_VERIFY_READ_CHUNK_BYTES):
+        tail.append(chunk)
+
+
+async def _wait_for_exit(proc: asyncio.subprocess.Process) -> None:
+    """Wait until a subprocess exits, even while its output pipe stays open.
+
+    ``Process.wait()`` also waits for the pipes to close, which a background
+    process the test started can put off indefinitely.
+    """
+    while proc.returncode is None:
+        await asyncio.sleep(_VERIFY_EXIT_POLL_SECONDS)
+
+
+async def _kill_process_tree(proc: asyncio.subprocess.Process) -> None:
+    """Kill a subprocess (and its process group on POSIX) and reap it."""
+    with contextlib.suppress(ProcessLookupError):
+        if _POSIX:
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    with contextlib.suppress(asyncio.TimeoutError):
+        await asyncio.wait_for(proc.wait(), 2)
+
+
+def _inner_timeout_args(
+    loop: asyncio.AbstractEventLoop, deadline: Optional[float]
+) -> Tuple[str, ...]:
+    """pytest-timeout arguments for the time left until ``deadline``, if any."""
+    if deadline is None or not _HAS_PYTEST_TIMEOUT:
+        return ()
+    remaining = int(deadline - loop.time())
+    # pytest-timeout reads 0 as "no timeout"; under a second the outer
+    # deadline is left to do the job
+    return (f"--timeout={remaining}",) if remaining >= 1 else ()
+
+
+def _preload_pytest(env_vars: Dict[str, str]) -> None:
+    """Warm-pool initializer: import pytest and its core plugins up front."""
+    os.environ.update(env_vars)
+    # pytest itself is already imported with this module
+    for name in ("_pytest.assertion.rewrite", "_pytest.python"):
+        importlib.import_module(name)
+
+
+def _run_pytest_in_worker(args: List[str]) -> int:
+    """Run one pytest session inside a warm-pool worker."""
+    return int(pytest.main(args))
+
+
 class PytestPlugin:
     """Plugin to capture pytest execution information."""
 
@@ -84,14 +174,54 @@ class PytestPlugin:
 class PytestRunner:
     """Pytest execution manager with comprehensive result capture."""
 
-    def __init__(self, working_dir: Optional[Path] = None) -> None:
+    def __init__(
+        self,
+        working_dir: Optional[Path] = None,
+        warm_workers: int = 0,
+        env_vars: Optional[Dict[str, str]] = None,
+    ) -> None:
         """
         Initialize the PytestRunner.
 
         Args:
             working_dir (Optional[Path]): The working directory for pytest runs.
+            warm_workers (int): If positive, verify_fix runs ``pytest.main`` in
+                a pool of this many worker processes with pytest pre-imported,
+                instead of starting ``python -m pytest`` each time. Each
+                worker serves a single run and is then replaced, so every
+                verification still imports the test code fresh.
+            env_vars (Optional[Dict[str, str]]): Extra environment variables
+                for verification runs, layered over the current environment.
         """
         self.working_dir: Path = working_dir or Path.cwd()
+        # Fixed per runner, so the argv prefixes are built once
+        self._base_args: Tuple[str, ...] = (
+            "--override-ini=addopts=",
+            "-p",
+            "no:terminal",
+            "--rootdir",
+            str(self.working_dir),
+        )
+        self._subprocess_prefix: Tuple[str, ...] = (
+            sys.executable,
+            "-m",
+            "pytest",
+            *self._base_args,
+        )
+        # Merged once here rather than per spawn; without env_vars (None) the
+        # subprocesses simply inherit the environment
+        self._env: Optional[Dict[str, str]] = (
+            {**os.environ, **env_vars} if env_vars else None
+        )
+        self._warm_pool: Optional[ProcessPoolExecutor] = None
+        if warm_workers > 0:
+            self._warm_pool = ProcessPoolExecutor(
+                max_workers=warm_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_preload_pytest,
+                initargs=(env_vars or {},),
+                max_tasks_per_child=1,
+            )
         self._current_session: Optional[SessionResult] = None
         self.temp_dirs: List[Path] = []  # Track temporary directories for cleanup
         # Added a lock to guard operations where concurrency could be an issue:
@@ -120,9 +250,7 @@ class PytestRunner:
         Returns:
             List[str]: The list of arguments to pass to pytest.
         """
-        args = ["--override-ini=addopts=", "-p", "no:terminal"]
-        if self.working_dir:
-            args.extend(["--rootdir", str(self.working_dir)])
+        args = list(self._base_args)
         if test_path:
             if test_function:
                 args.append(f"{str(test_path)}::{test_function}")
@@ -130,19 +258,30 @@ class PytestRunner:
                 args.append(str(test_path))
         return args
 
-    def finalize_session(self, start_time: datetime, exit_code_val: int) -> None:
+    def finalize_session(
+        self,
+        start_time: datetime,
+        exit_code_val: int,
+        start_ns: Optional[int] = None,
+    ) -> None:
         """
         Finalize the session with end time and exit code.
 
         Args:
             start_time (datetime): When the test run began.
             exit_code_val (int): The integer exit code from pytest.
+            start_ns (Optional[int]): ``time.perf_counter_ns()`` taken at the
+                start of the run. When given, the duration is measured on the
+                performance counter instead of wall-clock datetimes.
         """
         if not self._current_session:
             return
         end_time = datetime.now()
         self._current_session.end_time = end_time
-        self._current_session.duration = (end_time - start_time).total_seconds()
+        if start_ns is not None:
+            self._current_session.duration = (time.perf_counter_ns() - start_ns) / 1e9
+        else:
+            self._current_session.duration = (end_time - start_time).total_seconds()
         self._current_session.exit_code = ExitCode(exit_code_val)
 
         logger.info(f"Test run completed at {end_time} with exit code {exit_code_val}")
@@ -188,6 +327,14 @@ class PytestRunner:
         """
         return result.passed and not result.xfailed and not result.xpassed
 
+    def _pytest_cli_args(self, *extra: str) -> List[str]:
+        """pytest command-line arguments for an isolated verification run."""
+        return [*self._base_args, *extra]
+
+    def _subprocess_args(self, *extra: str) -> List[str]:
+        """Command line for a fresh ``python -m pytest`` subprocess."""
+        return [*self._subprocess_prefix, *extra]
+
     def format_collection_errors(self) -> List[str]:
         """
         Format collection errors into lines suitable for display.
@@ -251,6 +398,7 @@ class PytestRunner:
         """
         with self._lock:
             start_time = datetime.now()
+            start_ns = time.perf_counter_ns()
             logger.info(f"Starting test run at {start_time}")
 
             # Initialize session
@@ -273,7 +421,7 @@ class PytestRunner:
                 exit_code_val = pytest.main(args, plugins=[plugin])
 
                 # Finalize session
-                self.finalize_session(start_time, exit_code_val)
+                self.finalize_session(start_time, exit_code_val, start_ns)
 
                 # Update session counts
                 self.update_session_counts()
@@ -307,7 +455,7 @@ class PytestRunner:
                 if hasattr(report, "function") and report.function is not None:
                     test_function = report.function.__name__
                 elif "::" in report.nodeid:
-                    test_function = report.nodeid.split("::")[-1]
+                    test_function = ErrorInfo.split_nodeid(report.nodeid)[2]
                 else:
                     test_function = "unknown"
 
@@ -445,33 +593,37 @@ class PytestRunner:
         logger.info(f"Verifying fix for {test_file}::{test_function}")
 
         try:
-            # Create subprocess command
-            args = [
-                sys.executable,
-                "-m",
-                "pytest",
-                "--override-ini=addopts=",
-                "-p",
-                "no:terminal",
-            ]
-            if self.working_dir:
-                args.extend(["--rootdir", str(self.working_dir)])
-            args.append(f"{str(test_file)}::{test_function}")
-
-            # Run pytest synchronously
-            result = subprocess.run(
-                args, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-            )
+            nodeid = f"{str(test_file)}::{test_function}"
+            started = time.perf_counter()
+            if self._warm_pool is not None:
+                # Output stays in the worker; only the exit code comes back
+                returncode = self._warm_pool.submit(
+                    _run_pytest_in_worker, self._pytest_cli_args(nodeid)
+                ).result()
+                output = b""
+            else:
+                # Run pytest synchronously; stderr is folded into stdout so a
+                # single buffer holds the output
+                result = subprocess.run(
+                    self._subprocess_args(nodeid),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    env=self._env,
+                    check=False,
+                )
+                returncode, output = result.returncode, result.stdout
 
             # The test is considered fixed if pytest exits with code 0 (no failures)
-            is_fixed = result.returncode == 0
+            is_fixed = returncode == 0
 
             logger.info(
-                f"Verification result for {test_file}::{test_function}: {is_fixed}"
+                f"Verification result for {test_file}::{test_function}: {is_fixed} "
+                f"({time.perf_counter() - started:.2f}s)"
             )
-            if not is_fixed:
-                logger.debug(f"Verification stdout:\n{result.stdout.decode()}")
-                logger.debug(f"Verification stderr:\n{result.stderr.decode()}")
+            if not is_fixed and output and logger.isEnabledFor(logging.DEBUG):
+                # Only the tail is decoded; it holds the failure summary
+                tail = output[-_VERIFY_OUTPUT_TAIL_BYTES:]
+                logger.debug(f"Verification output:\n{tail.decode(errors='replace')}")
 
             return is_fixed
 
@@ -479,6 +631,287 @@ class PytestRunner:
             logger.error(f"Verification failed: {str(e)}")
             return False
 
+    def detect_flaky(self, test_file: Path, test_function: str, runs: int = 5) -> bool:
+        """
+        Check whether a test is flaky by running it ``runs`` times.
+
+        Args:
+            test_file (Path): The path to the test file.
+            test_function (str): The name of the test function.
+            runs (int): How many times to run the test.
+
+        Returns:
+            bool: True if the test both passed and failed across the runs.
+        """
+        return bool(self.detect_flaky_tests([(test_file, test_function)], runs))
+
+    def detect_flaky_tests(
+        self, targets: Sequence[Tuple[Path, str]], runs: int = 5
+    ) -> Set[str]:
+        """
+        Run every target ``runs`` times and report the ones with mixed outcomes.
+
+        All targets and repetitions share one pytest subprocess (via the
+        ``branch_fixer.services.pytest.repeat`` plugin), so interpreter
+        start-up and collection are paid once. Per-run outcomes come from the
+        plugin's JSON-lines log rather than from terminal output.
+
+        Args:
+            targets: (test_file, test_function) pairs to check.
+            runs (int): How many times to run each target.
+
+        Returns:
+            Set[str]: pytest node ids (relative to the rootdir) that both passed
+            and failed across the runs.
+        """
+        if not targets:
+            return set()
+        with tempfile.TemporaryDirectory() as tmp:
+            log_path = Path(tmp) / "outcomes.jsonl"
+            args = self._subprocess_args(
+                "-p",
+                "branch_fixer.services.pytest.repeat",
+                "--repeat-count",
+                str(runs),
+                f"--repeat-log={log_path}",
+                *(f"{str(path)}::{function}" for path, function in targets),
+            )
+            subprocess.run(
+                args,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                env=self._env,
+                check=False,
+            )
+            if not log_path.exists():
+                logger.warning(f"No outcome log produced for {len(targets)} target(s)")
+                return set()
+            with log_path.open(encoding="utf-8") as log:
+                records = [json.loads(line) for line in log]
+
+        # One outcome per repetition: a failure in any phase wins, otherwise
+        # the setup/call outcome stands
+        run_outcomes: Dict[str, str] = {}
+        for record in records:
+            if record["outcome"] == "failed" or record["when"] != "teardown":
+                if run_outcomes.get(record["nodeid"]) != "failed":
+                    run_outcomes[record["nodeid"]] = record["outcome"]
+
+        by_test: Dict[str, List[bool]] = defaultdict(list)
+        for nodeid, outcome in run_outcomes.items():
+            if outcome != "skipped":
+                by_test[base_nodeid(nodeid)].append(outcome == "passed")
+
+        flaky = {nodeid for nodeid, passes in by_test.items() if len(set(passes)) > 1}
+        for nodeid, passes in by_test.items():
+            logger.info(
+                f"{nodeid}: {sum(passes)} passed, {len(passes) - sum(passes)} failed "
+                f"out of {runs} runs"
+            )
+        return flaky
+
+    def verify_fixes(
+        self,
+        targets: Sequence[Tuple[Path, str]],
+        max_workers: Optional[int] = None,
+        isolated: bool = True,
+    ) -> List[bool]:
+        """
+        Verify several (test_file, test_function) pairs.
+
+        By default each verification is an independent pytest subprocess,
+        launched from a thread pool (default: one per CPU). With
+        ``isolated=False`` all targets run in a single pytest subprocess
+        instead, paying interpreter start-up and plugin loading once at the
+        cost of sharing module state between the tests.
+
+        Returns:
+            List[bool]: verify_fix results, in the order of ``targets``.
+        """
+        if not targets:
+            return []
+        if not isolated:
+            return self._verify_in_one_session(targets)
+        workers = max_workers or min(len(targets), os.cpu_count() or 4)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda target: self.verify_fix(*target), targets))
+
+    def _verify_in_one_session(self, targets: Sequence[Tuple[Path, str]]) -> List[bool]:
+        """Run all targets in one pytest subprocess and read per-test outcomes."""
+        with tempfile.TemporaryDirectory() as tmp:
+            log_path = Path(tmp) / "outcomes.jsonl"
+            subprocess.run(
+                self._subprocess_args(
+                    "-p",
+                    "branch_fixer.services.pytest.repeat",
+                    f"--repeat-log={log_path}",
+                    *(f"{str(path)}::{function}" for path, function in targets),
+                ),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                env=self._env,
+                check=False,
+            )
+            records = []
+            if log_path.exists():
+                with log_path.open(encoding="utf-8") as log:
+                    records = [json.loads(line) for line in log]
+
+        if not records:
+            # pytest aborts the whole session when any node id cannot be
+            # collected, so fall back to one subprocess per target
+            logger.warning("Shared verification session ran no tests; retrying each")
+            return self.verify_fixes(targets, isolated=True)
+
+        # A target passes if it reported and no phase of it failed, matching
+        # verify_fix's exit-code check
+        failed: Dict[Tuple[str, str], bool] = {}
+        for record in records:
+            key = (
+                os.path.realpath(record["path"]),
+                record["nodeid"].split("::", 1)[1],
+            )
+            failed[key] = failed.get(key, False) or record["outcome"] == "failed"
+        return [
+            failed.get((os.path.realpath(path), function)) is False
+            for path, function in targets
+        ]
+
+    async def averify_fix(
+        self, test_file: Path, test_function: str, timeout: Optional[float] = None
+    ) -> bool:
+        """
+        Async variant of verify_fix built on an asyncio subprocess.
+
+        With a warm pool the run is dispatched to it through
+        ``run_in_executor`` instead, so no interpreter is started.
+
+        Args:
+            test_file (Path): The path to the test file.
+            test_function (str): The name of the test function.
+            timeout (Optional[float]): Seconds before the run is killed and
+                counted as a failure. None waits indefinitely. With
+                pytest-timeout installed the remaining time is also passed
+                as ``--timeout``. A timed-out warm-pool run cannot be
+                killed; its worker finishes on its own.
+
+        Returns:
+            bool: True if the test passes (exit code == 0), False otherwise.
+        """
+        nodeid = f"{str(test_file)}::{test_function}"
+        loop = asyncio.get_running_loop()
+        # One absolute deadline covers the spawn and the run
+        deadline = None if timeout is None else loop.time() + timeout
+        if self._warm_pool is not None:
+            return await self._averify_in_warm_pool(nodeid, timeout, deadline)
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *self._subprocess_args(nodeid, *_inner_timeout_args(loop, deadline)),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                # Own process group, so a timeout also takes down anything
+                # the test itself spawned
+                start_new_session=_POSIX,
+                env=self._env,
+            )
+        except Exception as e:
+            logger.error(f"Verification failed: {str(e)}")
+            return False
+
+        # Output is streamed into a bounded buffer rather than collected whole,
+        # so memory stays flat however much the test prints
+        tail: Deque[bytes] = deque(
+            maxlen=_VERIFY_OUTPUT_TAIL_BYTES // _VERIFY_READ_CHUNK_BYTES + 1
+        )
+        assert proc.stdout is not None  # spawned with stdout=PIPE
+        drain = asyncio.create_task(_drain(proc.stdout, tail))
+        exited = asyncio.create_task(_wait_for_exit(proc))
+        drain_error: Optional[BaseException] = None
+        try:
+            async with asyncio.timeout_at(deadline):
+                done, _ = await asyncio.wait(
+                    {drain, exited}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if exited not in done and drain.exception() is None:
+                    # Output reached EOF, so the pipe is closed and
+                    # Process.wait() reports the exit without polling
+                    await proc.wait()
+                elif drain not in done:
+                    await asyncio.wait({drain}, timeout=_VERIFY_DRAIN_GRACE_SECONDS)
+        except TimeoutError:
+            logger.warning(f"Verification of {nodeid} timed out after {timeout}s")
+            return False
+        finally:
+            if drain.done():
+                drain_error = drain.exception()
+            if proc.returncode is None or not drain.done() or drain_error:
+                # Nothing will read the pipe any more: take down the test
+                # and anything it left running that still holds it
+                await _kill_process_tree(proc)
+            for task in (drain, exited):
+                task.cancel()
+            await asyncio.gather(drain, exited, return_exceptions=True)
+
+        if drain_error is not None:
+            logger.error(f"Verification of {nodeid} failed: {drain_error}")
+            return False
+        is_fixed = proc.returncode == 0
+        logger.info(f"Verification result for {nodeid}: {is_fixed}")
+        if not is_fixed and tail and logger.isEnabledFor(logging.DEBUG):
+            output = b"".join(tail)[-_VERIFY_OUTPUT_TAIL_BYTES:]
+            logger.debug(f"Verification output:\n{output.decode(errors='replace')}")
+        return is_fixed
+
+    async def _averify_in_warm_pool(
+        self, nodeid: str, timeout: Optional[float], deadline: Optional[float]
+    ) -> bool:
+        """Run one verification in the warm pool without blocking the loop."""
+        loop = asyncio.get_running_loop()
+        args = self._pytest_cli_args(nodeid, *_inner_timeout_args(loop, deadline))
+        try:
+            async with asyncio.timeout_at(deadline):
+                returncode = await loop.run_in_executor(
+                    self._warm_pool, _run_pytest_in_worker, args
+                )
+        except TimeoutError:
+            logger.warning(f"Verification of {nodeid} timed out after {timeout}s")
+            return False
+        except Exception as e:
+            logger.error(f"Verification failed: {str(e)}")
+            return False
+        is_fixed = returncode == 0
+        logger.info(f"Verification result for {nodeid}: {is_fixed}")
+        return is_fixed
+
+    async def averify_fixes(
+        self,
+        targets: Sequence[Tuple[Path, str]],
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> List[bool]:
+        """
+        Verify several (test_file, test_function) pairs concurrently.
+
+        Runs are gathered on the event loop, with at most ``max_concurrency``
+        (default: one per available CPU) pytest subprocesses alive at once.
+        A run that raises counts as a failure.
+
+        Returns:
+            List[bool]: averify_fix results, in the order of ``targets``.
+        """
+        if not targets:
+            return []
+        slots = asyncio.Semaphore(max_concurrency or _available_cpus())
+
+        async def run_one(target: Tuple[Path, str]) -> bool:
+            async with slots:
+                return await self.averify_fix(*target, timeout=timeout)
+
+        results = await asyncio.gather(
+            *(run_one(target) for target in targets), return_exceptions=True
+        )
+        return [result is True for result in results]
+
     def format_report(self, session: SessionResult) -> str:
         """
         Format session results into a detailed report.
@@ -575,6 +1008,12 @@ class PytestRunner:
                     f"Warning recorded during test execution: {warning_message}"
                 )
 
+    def close(self) -> None:
+        """Shut down the warm worker pool, if one was started."""
+        if self._warm_pool is not None:
+            self._warm_pool.shutdown(cancel_futures=True)
+            self._warm_pool = None
+
     def cleanup(self) -> None:
         """
         Clean up temporary directories and resources.
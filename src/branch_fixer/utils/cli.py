@@ -64,6 +64,7 @@ class CLI:
         Cleanup resources before exit:
          - Clean up fix branches
          - Checkout main branch
+         - Release the service's pools, processes and stores
          - Provide user feedback on leftover errors
         """
         if not self.service:
@@ -78,6 +79,13 @@ class CLI:
         # 2) Checkout main
         self._checkout_main(errors)
 
+        # 3) Release pools, helper processes and the fix store
+        try:
+            self.service.close()
+        except Exception as e:
+            errors.append(f"Failed to release resources: {str(e)}")
+            logger.warning(f"Unable to release resources: {e}")
+
         # Report any errors
         if errors:
             print("\nEncountered errors during cleanup:")
@@ -299,7 +307,8 @@ class CLI:
         """
         try:
             logger.info("Initializing AI Manager...")
-            ai_manager = AIManager(config.api_key)
+            # The CLI owns its process, so LiteLLM's sessions are ours to set
+            ai_manager = AIManager(config.api_key, share_http_pool=True)
 
             logger.info("Initializing Test Runner...")
             test_runner = TestRunner()
@@ -2,7 +2,7 @@
 import os
 import pytest
 from pathlib import Path
-from unittest.mock import MagicMock, patch, call
+from unittest.mock import AsyncMock, MagicMock, patch, call
 
 from branch_fixer.core.models import CodeChanges, ErrorDetails, TestError
 from branch_fixer.services.ai.manager import (
@@ -59,10 +59,26 @@ MINIMAL_RESPONSE = "Modified code:\n```python\ndef test_add():\n    assert True\
 # ---------------------------------------------------------------------------
 
 class TestInit:
+    def test_importing_module_does_not_import_litellm(self):
+        import subprocess
+        import sys
+
+        code = (
+            "import sys, branch_fixer.services.ai.manager; "
+            "sys.exit('litellm' in sys.modules)"
+        )
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+        assert subprocess.run([sys.executable, "-c", code], env=env).returncode == 0
+
     def test_stores_model(self):
         m = AIManager(api_key=None, model="ollama/codellama")
         assert m.model == "ollama/codellama"
 
+    def test_parses_provider_once(self):
+        m = AIManager(api_key=None, model="OpenRouter/openai/gpt-4o-mini")
+        assert m._provider == "openrouter"
+        assert m._model_name == "openai/gpt-4o-mini"
+
     def test_stores_base_temperature(self):
         m = AIManager(api_key=None, base_temperature=0.7)
         assert m.base_temperature == 0.7
@@ -85,6 +101,25 @@ class TestInit:
         AIManager(api_key=None, model="ollama/codellama")
         assert os.environ == before
 
+    def test_api_keys_rotate_per_request(self):
+        before = os.environ.copy()
+        m = AIManager(api_key=None, api_keys=["k1", "k2"])
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.return_value = make_mock_response(VALID_RESPONSE)
+            for _ in range(3):
+                m._completion(messages=[], temperature=0.4)
+        assert [c.kwargs["api_key"] for c in mock_c.call_args_list] == ["k1", "k2", "k1"]
+        assert os.environ == before
+
+    def test_rate_limited_retry_moves_to_next_key(self):
+        m = AIManager(api_key=None, api_keys=["k1", "k2"])
+        with patch(
+            "branch_fixer.services.ai.manager.completion",
+            side_effect=[make_rate_limit_error(), make_mock_response(VALID_RESPONSE)],
+        ) as mock_c, patch("branch_fixer.services.ai.manager.time.sleep"):
+            m._completion(messages=[], temperature=0.4)
+        assert [c.kwargs["api_key"] for c in mock_c.call_args_list] == ["k1", "k2"]
+
     def test_thread_starts_empty(self):
         m = AIManager(api_key=None)
         assert m._messages == []
@@ -93,6 +128,92 @@ class TestInit:
         m = AIManager(api_key=None)
         assert m._current_error_id is None
 
+    def test_construction_leaves_litellm_alone(self, monkeypatch):
+        import litellm
+        from branch_fixer.services.ai import manager as manager_mod
+
+        monkeypatch.setattr(litellm, "client_session", None)
+        monkeypatch.setattr(litellm, "aclient_session", None)
+        manager_mod._litellm.cache_clear()
+        AIManager(api_key=None, share_http_pool=True)
+        # Not even imported, let alone given a session
+        assert manager_mod._litellm.cache_info().misses == 0
+        assert litellm.client_session is None
+        assert litellm.aclient_session is None
+
+    def test_shared_http_client_is_opt_in(self, monkeypatch):
+        import litellm
+
+        monkeypatch.setattr(litellm, "client_session", None)
+        m = AIManager(api_key=None)
+        with patch("branch_fixer.services.ai.manager.completion"):
+            m._completion(messages=[], temperature=0.1)
+        assert litellm.client_session is None
+
+    def test_installs_shared_http_client_once_on_first_call(self, monkeypatch):
+        import httpx
+        import litellm
+
+        monkeypatch.setattr(litellm, "client_session", None)
+        with patch("branch_fixer.services.ai.manager.completion"):
+            AIManager(api_key=None, share_http_pool=True)._completion(
+                messages=[], temperature=0.1
+            )
+            first = litellm.client_session
+            AIManager(api_key=None, share_http_pool=True)._completion(
+                messages=[], temperature=0.1
+            )
+        assert isinstance(first, httpx.Client)
+        assert litellm.client_session is first
+
+    async def test_installs_shared_async_http_client_on_first_call(self, monkeypatch):
+        import httpx
+        import litellm
+
+        monkeypatch.setattr(litellm, "aclient_session", None)
+        m = AIManager(api_key=None, share_http_pool=True)
+        with patch(
+            "branch_fixer.services.ai.manager.acompletion", new_callable=AsyncMock
+        ):
+            await m._acompletion(messages=[], temperature=0.1)
+        client = litellm.aclient_session
+        assert isinstance(client, httpx.AsyncClient)
+        await m.aclose()
+        assert client.is_closed
+        assert litellm.aclient_session is None
+
+    def test_each_event_loop_gets_its_own_async_client(self, monkeypatch):
+        import asyncio
+        import litellm
+
+        monkeypatch.setattr(litellm, "aclient_session", None)
+        m = AIManager(api_key=None, share_http_pool=True)
+
+        async def one_call():
+            with patch(
+                "branch_fixer.services.ai.manager.acompletion", new_callable=AsyncMock
+            ):
+                await m._acompletion(messages=[], temperature=0.1)
+            return litellm.aclient_session
+
+        # No aclose(): the end of asyncio.run closes each loop's client
+        first = asyncio.run(one_call())
+        second = asyncio.run(one_call())
+        assert second is not first
+        assert first.is_closed
+        assert second.is_closed
+
+    def test_keeps_caller_supplied_http_client(self, monkeypatch):
+        import litellm
+
+        sentinel = object()
+        monkeypatch.setattr(litellm, "client_session", sentinel)
+        with patch("branch_fixer.services.ai.manager.completion"):
+            AIManager(api_key=None, share_http_pool=True)._completion(
+                messages=[], temperature=0.1
+            )
+        assert litellm.client_session is sentinel
+
 
 # ---------------------------------------------------------------------------
 # generate_fix — temperature validation
@@ -185,6 +306,819 @@ class TestGenerateFixIntegration:
                 m.generate_fix(error, temperature=0.4)
 
 
+# ---------------------------------------------------------------------------
+# agenerate_fix — async LiteLLM path
+# ---------------------------------------------------------------------------
+
+class TestAgenerateFix:
+    async def test_awaits_acompletion_for_analysis_and_fix(self, error, tmp_path):
+        (tmp_path / "test_math.py").write_text("def test_add(): pass")
+        error.test_file = tmp_path / "test_math.py"
+        m = AIManager(api_key=None)
+        with patch(
+            "branch_fixer.services.ai.manager.acompletion", new_callable=AsyncMock
+        ) as mock_ac:
+            mock_ac.return_value = make_mock_response(VALID_RESPONSE)
+            result = await m.agenerate_fix(error, temperature=0.6)
+        assert isinstance(result, CodeChanges)
+        assert [c.kwargs["temperature"] for c in mock_ac.await_args_list] == [0.1, 0.6]
+        assert m._messages[-1] == {"role": "assistant", "content": VALID_RESPONSE}
+
+    async def test_wraps_exception_as_completion_error(self, error, tmp_path):
+        (tmp_path / "test_math.py").write_text("def test_add(): pass")
+        error.test_file = tmp_path / "test_math.py"
+        m = AIManager(api_key=None)
+        with patch(
+            "branch_fixer.services.ai.manager.acompletion",
+            new_callable=AsyncMock,
+            side_effect=RuntimeError("timeout"),
+        ):
+            with pytest.raises(CompletionError):
+                await m.agenerate_fix(error, temperature=0.4)
+
+    async def test_rejects_out_of_range_temperature(self, error):
+        m = AIManager(api_key=None)
+        with pytest.raises(ValueError):
+            await m.agenerate_fix(error, temperature=1.5)
+
+
+class TestFirstValidFix:
+    @pytest.fixture
+    def error(self, error, tmp_path):
+        (tmp_path / "test_math.py").write_text("def test_add(): pass")
+        error.test_file = tmp_path / "test_math.py"
+        return error
+
+    async def test_first_parseable_candidate_wins(self, error):
+        import asyncio
+
+        async def fake_acompletion(**kwargs):
+            temperature = kwargs["temperature"]
+            if temperature == 0.1:
+                return make_mock_response("Root cause: typo")
+            if temperature == 0.4:
+                # Fastest, but not valid Python
+                return make_mock_response("```python\ndef test_add(:\n```")
+            await asyncio.sleep(0.05 if temperature == 0.7 else 5)
+            return make_mock_response(VALID_RESPONSE)
+
+        m = AIManager(api_key=None)
+        with patch("branch_fixer.services.ai.manager.acompletion", side_effect=fake_acompletion):
+            result = await m.agenerate_first_valid_fix(error, [0.4, 0.7, 1.0])
+        assert "assert add(2, 3) == 5" in result.modified_code
+        # Only the winner joins the thread
+        assert [msg["role"] for msg in m._messages] == ["system", "user", "assistant"]
+        assert m._messages[-1]["content"] == VALID_RESPONSE
+
+    async def test_raises_when_no_candidate_is_valid(self, error):
+        m = AIManager(api_key=None)
+        with patch(
+            "branch_fixer.services.ai.manager.acompletion",
+            new_callable=AsyncMock,
+            return_value=make_mock_response("```python\nnot valid (\n```"),
+        ):
+            with pytest.raises(CompletionError):
+                await m.agenerate_first_valid_fix(error, [0.3, 0.6])
+
+    async def test_requires_temperatures(self, error):
+        m = AIManager(api_key=None)
+        with pytest.raises(ValueError):
+            await m.agenerate_first_valid_fix(error, [])
+
+
+class FakeStream:
+    """Async iterator of streaming chunks that records how far it was read."""
+
+    def __init__(self, pieces):
+        self.pieces = list(pieces)
+        self.consumed = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.consumed == len(self.pieces):
+            raise StopAsyncIteration
+        delta = MagicMock()
+        delta.content = self.pieces[self.consumed]
+        choice = MagicMock()
+        choice.delta = delta
+        chunk = MagicMock()
+        chunk.choices = [choice]
+        self.consumed += 1
+        return chunk
+
+    async def aclose(self):
+        self.closed = True
+
+
+class TestStreaming:
+    async def test_stops_reading_once_fence_is_complete(self, error, tmp_path):
+        (tmp_path / "test_math.py").write_text("def test_add(): pass")
+        error.test_file = tmp_path / "test_math.py"
+        stream = FakeStream(
+            ["Modified code:\n``", "`python\nx = 1\n`", "``", "\nTrailing notes", " more"]
+        )
+        m = AIManager(api_key=None)
+        m._current_error_id = str(error.id)  # skip the analysis call
+        m._reset_thread()
+        with patch(
+            "branch_fixer.services.ai.manager.acompletion",
+            new_callable=AsyncMock,
+            return_value=stream,
+        ) as mock_ac:
+            result = await m.agenerate_fix(error, temperature=0.4, stream=True)
+
+        assert mock_ac.await_args.kwargs["stream"] is True
+        assert result.modified_code == "x = 1"
+        assert stream.consumed == 3
+        assert stream.closed
+        assert "Trailing" not in m._messages[-1]["content"]
+
+    async def test_reads_to_end_without_fence(self):
+        stream = FakeStream(["def test_foo():", " pass"])
+        m = AIManager(api_key=None)
+        with patch(
+            "branch_fixer.services.ai.manager.acompletion",
+            new_callable=AsyncMock,
+            return_value=stream,
+        ):
+            reply = await m._astream_reply([], temperature=0.4)
+        assert reply == "def test_foo(): pass"
+        assert stream.closed
+
+
+# ---------------------------------------------------------------------------
+# Prompt-prefix cache breakpoints
+# ---------------------------------------------------------------------------
+
+class TestPromptCacheBreakpoints:
+    MESSAGES = [
+        {"role": "system", "content": "sys"},
+        {"role": "user", "content": "first"},
+        {"role": "assistant", "content": "reply"},
+        {"role": "user", "content": "retry"},
+    ]
+
+    def test_anthropic_marks_system_and_latest_user_turn(self):
+        m = AIManager(api_key=None, model="openrouter/anthropic/claude-3-5-sonnet")
+        sent = m._provider_messages(self.MESSAGES)
+        marked = [i for i, msg in enumerate(sent) if isinstance(msg["content"], list)]
+        assert marked == [0, 3]
+        assert sent[3]["content"][0] == {
+            "type": "text",
+            "text": "retry",
+            "cache_control": {"type": "ephemeral"},
+        }
+        # The thread itself is left as plain strings
+        assert self.MESSAGES[3]["content"] == "retry"
+
+    def test_other_providers_send_messages_unchanged(self):
+        m = AIManager(api_key=None, model="openrouter/openai/gpt-4o-mini")
+        assert m._provider_messages(self.MESSAGES) is self.MESSAGES
+
+    def test_breakpoints_reach_completion_call(self):
+        m = AIManager(api_key=None, model="anthropic/claude-3-5-sonnet")
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.return_value = make_mock_response(VALID_RESPONSE)
+            m._completion(messages=self.MESSAGES, temperature=0.4)
+        assert isinstance(mock_c.call_args.kwargs["messages"][0]["content"], list)
+
+
+# ---------------------------------------------------------------------------
+# Rate limiting — concurrency cap and 429 backoff
+# ---------------------------------------------------------------------------
+
+def make_rate_limit_error(retry_after=None):
+    import httpx
+    import litellm
+
+    headers = {"retry-after": retry_after} if retry_after else {}
+    response = httpx.Response(
+        429, headers=headers, request=httpx.Request("POST", "https://example.test")
+    )
+    return litellm.RateLimitError(
+        "slow down", llm_provider="openai", model="gpt-4o-mini", response=response
+    )
+
+
+class TestRateLimiting:
+    def test_sync_retries_rate_limit_honouring_retry_after(self):
+        m = AIManager(api_key=None)
+        ok = make_mock_response(VALID_RESPONSE)
+        with patch(
+            "branch_fixer.services.ai.manager.completion",
+            side_effect=[make_rate_limit_error("2"), ok],
+        ) as mock_c, patch("branch_fixer.services.ai.manager.time.sleep") as mock_sleep:
+            assert m._completion(messages=[], temperature=0.1) is ok
+        assert mock_c.call_count == 2
+        mock_sleep.assert_called_once_with(2.0)
+
+    def test_retry_after_is_capped_at_the_backoff_ceiling(self):
+        from branch_fixer.services.ai import manager as manager_mod
+
+        m = AIManager(api_key=None)
+        ok = make_mock_response(VALID_RESPONSE)
+        with patch(
+            "branch_fixer.services.ai.manager.completion",
+            side_effect=[make_rate_limit_error("3600"), ok],
+        ), patch("branch_fixer.services.ai.manager.time.sleep") as mock_sleep:
+            assert m._completion(messages=[], temperature=0.1) is ok
+        mock_sleep.assert_called_once_with(manager_mod._BACKOFF_MAX)
+
+    def test_sync_gives_up_after_max_attempts(self):
+        from branch_fixer.services.ai import manager as manager_mod
+        import litellm
+
+        m = AIManager(api_key=None)
+        with patch(
+            "branch_fixer.services.ai.manager.completion",
+            side_effect=make_rate_limit_error(),
+        ) as mock_c, patch("branch_fixer.services.ai.manager.time.sleep"):
+            with pytest.raises(litellm.RateLimitError):
+                m._completion(messages=[], temperature=0.1)
+        assert mock_c.call_count == manager_mod._RATE_LIMIT_ATTEMPTS
+
+    async def test_async_retries_outside_semaphore(self):
+        import asyncio
+
+        m = AIManager(api_key=None, max_concurrency=1)
+        ok = make_mock_response(VALID_RESPONSE)
+
+        async def fake_sleep(delay):
+            # The throttled call must have released its slot before backing off
+            assert not m._semaphore.locked()
+
+        with patch(
+            "branch_fixer.services.ai.manager.acompletion",
+            new_callable=AsyncMock,
+            side_effect=[make_rate_limit_error(), ok],
+        ), patch.object(asyncio, "sleep", side_effect=fake_sleep):
+            assert await m._acompletion(messages=[], temperature=0.1) is ok
+
+    async def test_shared_semaphore_caps_in_flight_calls(self):
+        import asyncio
+
+        shared = asyncio.Semaphore(2)
+        managers = [AIManager(api_key=None, semaphore=shared) for _ in range(5)]
+        in_flight = 0
+        peak = 0
+
+        async def fake_acompletion(**kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+            return make_mock_response(VALID_RESPONSE)
+
+        with patch(
+            "branch_fixer.services.ai.manager.acompletion", side_effect=fake_acompletion
+        ):
+            await asyncio.gather(
+                *(mgr._acompletion(messages=[], temperature=0.1) for mgr in managers)
+            )
+        assert peak == 2
+
+
+# ---------------------------------------------------------------------------
+# Response cache
+# ---------------------------------------------------------------------------
+
+class TestResponseCache:
+    def test_deterministic_call_is_served_from_cache(self):
+        m = AIManager(api_key=None)
+        messages = [{"role": "user", "content": "fix"}]
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.return_value = make_mock_response(VALID_RESPONSE)
+            first = m._completion(messages=messages, temperature=0.0)
+            second = m._completion(messages=messages, temperature=0.0)
+        assert mock_c.call_count == 1
+        assert second is first
+
+    def test_sampled_call_is_not_cached_by_default(self):
+        m = AIManager(api_key=None)
+        messages = [{"role": "user", "content": "fix"}]
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.return_value = make_mock_response(VALID_RESPONSE)
+            m._completion(messages=messages, temperature=0.4)
+            m._completion(messages=messages, temperature=0.4)
+        assert mock_c.call_count == 2
+
+    def test_cache_nondeterministic_opt_in(self):
+        m = AIManager(api_key=None, cache_nondeterministic=True)
+        messages = [{"role": "user", "content": "fix"}]
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.return_value = make_mock_response(VALID_RESPONSE)
+            m._completion(messages=messages, temperature=0.4)
+            m._completion(messages=messages, temperature=0.4)
+        assert mock_c.call_count == 1
+
+    async def test_async_path_shares_cache(self):
+        m = AIManager(api_key=None)
+        messages = [{"role": "user", "content": "fix"}]
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.return_value = make_mock_response(VALID_RESPONSE)
+            m._completion(messages=messages, temperature=0.0)
+        with patch(
+            "branch_fixer.services.ai.manager.acompletion", new_callable=AsyncMock
+        ) as mock_ac:
+            await m._acompletion(messages=messages, temperature=0.0)
+        mock_ac.assert_not_awaited()
+
+
+    def test_analysis_is_memoized_on_error_content(self, error):
+        m = AIManager(api_key=None)
+        twin = TestError(
+            test_file=error.test_file,
+            test_function=error.test_function,
+            error_details=error.error_details,
+        )
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.return_value = make_mock_response("Root cause: wrong sign")
+            assert m._analyze_error(error) == "Root cause: wrong sign"
+            assert m._analyze_error(twin) == "Root cause: wrong sign"
+        assert mock_c.call_count == 1
+
+    def test_failed_analysis_is_not_memoized(self, error):
+        m = AIManager(api_key=None)
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.side_effect = [RuntimeError("down"), make_mock_response("ok")]
+            m._analyze_error(error)
+            assert m._analyze_error(error) == "ok"
+        assert mock_c.call_count == 2
+
+
+# ---------------------------------------------------------------------------
+# Semantic cache
+# ---------------------------------------------------------------------------
+
+def make_embedding_response(vector):
+    response = MagicMock()
+    response.data = [{"embedding": vector}]
+    return response
+
+
+class TestSemanticCache:
+    def _error(self, tmp_path, message):
+        f = tmp_path / "test_foo.py"
+        if not f.exists():
+            f.write_text("def test_foo(): pass")
+        return TestError(
+            test_file=f,
+            test_function="test_foo",
+            error_details=ErrorDetails(error_type="AssertionError", message=message),
+        )
+
+    def test_disabled_by_default(self, error, tmp_path):
+        (tmp_path / "test_math.py").write_text("def test_add(): pass")
+        error.test_file = tmp_path / "test_math.py"
+        m = AIManager(api_key=None)
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c, patch(
+            "litellm.embedding"
+        ) as mock_e:
+            mock_c.return_value = make_mock_response(VALID_RESPONSE)
+            m.generate_fix(error, temperature=0.4)
+        mock_e.assert_not_called()
+
+    def test_verified_fix_is_reused_for_near_duplicate(self, tmp_path):
+        from branch_fixer.services.ai.cache import SemanticCache
+
+        m = AIManager(api_key=None, semantic_cache=SemanticCache())
+        first = self._error(tmp_path, "assert 1 == 2")
+        second = self._error(tmp_path, "assert 1 == 3")
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c, patch(
+            "litellm.embedding",
+            return_value=make_embedding_response([1.0, 0.0, 0.0]),
+        ):
+            mock_c.return_value = make_mock_response(VALID_RESPONSE)
+            m.generate_fix(first, temperature=0.4)
+            m.remember_successful_fix(first)
+            calls_before = mock_c.call_count
+            result = m.generate_fix(second, temperature=0.4)
+
+        assert mock_c.call_count == calls_before
+        assert "def test_add" in result.modified_code
+        # Thread looks like a normal first attempt so a retry can continue it
+        assert [msg["role"] for msg in m._messages] == ["system", "user", "assistant"]
+
+    def test_exact_duplicate_skips_the_embedding_call(self, tmp_path):
+        from branch_fixer.services.ai.cache import SemanticCache
+
+        m = AIManager(api_key=None, semantic_cache=SemanticCache())
+        first = self._error(tmp_path, "assert 1 == 2")
+        second = self._error(tmp_path, "assert 1 == 2")
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c, patch(
+            "litellm.embedding",
+            return_value=make_embedding_response([1.0, 0.0, 0.0]),
+        ) as mock_e:
+            mock_c.return_value = make_mock_response(VALID_RESPONSE)
+            m.generate_fix(first, temperature=0.4)
+            m.remember_successful_fix(first)
+            calls_before = mock_c.call_count
+            m.generate_fix(second, temperature=0.4)
+
+        assert mock_c.call_count == calls_before
+        assert mock_e.call_count == 1
+
+    def test_unverified_fix_is_not_reused(self, tmp_path):
+        from branch_fixer.services.ai.cache import SemanticCache
+
+        m = AIManager(api_key=None, semantic_cache=SemanticCache())
+        first = self._error(tmp_path, "assert 1 == 2")
+        second = self._error(tmp_path, "assert 1 == 3")
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c, patch(
+            "litellm.embedding",
+            return_value=make_embedding_response([1.0, 0.0, 0.0]),
+        ):
+            mock_c.return_value = make_mock_response(VALID_RESPONSE)
+            m.generate_fix(first, temperature=0.4)
+            calls_before = mock_c.call_count
+            m.generate_fix(second, temperature=0.4)
+
+        assert mock_c.call_count > calls_before
+
+    def test_embedding_failure_is_non_fatal(self, tmp_path):
+        from branch_fixer.services.ai.cache import SemanticCache
+
+        m = AIManager(api_key=None, semantic_cache=SemanticCache())
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c, patch(
+            "litellm.embedding",
+            side_effect=RuntimeError("no embeddings"),
+        ):
+            mock_c.return_value = make_mock_response(VALID_RESPONSE)
+            result = m.generate_fix(self._error(tmp_path, "boom"), temperature=0.4)
+        assert isinstance(result, CodeChanges)
+
+
+    def test_analysis_is_reused_for_near_duplicate(self, tmp_path):
+        from branch_fixer.services.ai.cache import SemanticCache
+
+        m = AIManager(api_key=None, semantic_cache=SemanticCache())
+        first = self._error(tmp_path, "assert 1 == 2")
+        second = self._error(tmp_path, "assert 1 == 3")
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.return_value = make_mock_response("Root cause: off by one")
+            assert m._analyze_error(first, [1.0, 0.0]) == "Root cause: off by one"
+            assert m._analyze_error(second, [1.0, 0.0]) == "Root cause: off by one"
+        assert mock_c.call_count == 1
+
+    def test_embedding_input_masks_volatile_details(self, tmp_path):
+        m = AIManager(api_key=None)
+        error = TestError(
+            test_file=tmp_path / "test_foo.py",
+            test_function="test_foo",
+            error_details=ErrorDetails(
+                error_type="AssertionError",
+                message="<Foo object at 0x7f3a2b>",
+                stack_trace="/tmp/pytest-of-root/pytest-12/test_a0/test_foo.py:42: AssertionError",
+            ),
+        )
+        text = m._embedding_input(error)
+        assert "0xADDR" in text
+        assert "<tmp>/test_a0/test_foo.py:N: AssertionError" in text
+
+    def test_embedding_input_keeps_only_the_head_of_the_trace(self, tmp_path):
+        from branch_fixer.services.ai.manager import _EMBEDDING_TRACE_LINES
+
+        m = AIManager(api_key=None)
+        trace = "\n".join(f"E   diff line {i}" for i in range(500))
+        error = TestError(
+            test_file=tmp_path / "test_foo.py",
+            test_function="test_foo",
+            error_details=ErrorDetails(
+                error_type="AssertionError", message="boom", stack_trace=trace
+            ),
+        )
+        text = m._embedding_input(error)
+        assert f"diff line {_EMBEDDING_TRACE_LINES - 1}" in text
+        assert f"diff line {_EMBEDDING_TRACE_LINES}\n" not in text + "\n"
+
+
+class TestFixStore:
+    def _error(self, tmp_path, line=8):
+        f = tmp_path / "test_foo.py"
+        if not f.exists():
+            f.write_text("def test_foo(): pass")
+        return TestError(
+            test_file=f,
+            test_function="test_foo",
+            error_details=ErrorDetails(
+                error_type="AssertionError",
+                message="assert 1 == 2",
+                stack_trace=f"test_foo.py:{line}: AssertionError",
+            ),
+        )
+
+    def test_verified_fix_is_reused_by_a_later_run(self, tmp_path):
+        from branch_fixer.services.ai.cache import FixStore
+
+        path = tmp_path / "cache" / "fixes.db"
+        first_run = AIManager(api_key=None, fix_store=FixStore(path))
+        error = self._error(tmp_path)
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.return_value = make_mock_response(VALID_RESPONSE)
+            first_run.generate_fix(error, temperature=0.4)
+            first_run.remember_successful_fix(error)
+
+        # A fresh manager (next process) on the same failure, shifted line
+        second_run = AIManager(api_key=None, fix_store=FixStore(path))
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            result = second_run.generate_fix(self._error(tmp_path, line=9), temperature=0.4)
+        mock_c.assert_not_called()
+        assert "def test_add" in result.modified_code
+        assert [msg["role"] for msg in second_run._messages] == ["system", "user", "assistant"]
+
+    def test_unverified_fix_is_not_stored(self, tmp_path):
+        from branch_fixer.services.ai.cache import FixStore
+
+        store = FixStore(tmp_path / "fixes.db")
+        m = AIManager(api_key=None, fix_store=store)
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.return_value = make_mock_response(VALID_RESPONSE)
+            m.generate_fix(self._error(tmp_path), temperature=0.4)
+        assert len(store) == 0
+
+    def test_changed_file_content_misses(self, tmp_path):
+        from branch_fixer.services.ai.cache import FixStore
+
+        store = FixStore(tmp_path / "fixes.db")
+        m = AIManager(api_key=None, fix_store=store)
+        error = self._error(tmp_path)
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.return_value = make_mock_response(VALID_RESPONSE)
+            m.generate_fix(error, temperature=0.4)
+            m.remember_successful_fix(error)
+            error.test_file.write_text("def test_foo(): assert 0")
+            calls_before = mock_c.call_count
+            m.generate_fix(self._error(tmp_path), temperature=0.4)
+        assert mock_c.call_count > calls_before
+
+    def test_later_run_skips_temperatures_that_failed(self, tmp_path):
+        from branch_fixer.services.ai.cache import FixStore
+
+        path = tmp_path / "fixes.db"
+        first_run = AIManager(api_key=None, fix_store=FixStore(path))
+        error = self._error(tmp_path)
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.return_value = make_mock_response(VALID_RESPONSE)
+            first_run.generate_fix(error, temperature=0.4)
+            first_run.record_failed_fix(error, first_run.fix_temperature)
+            first_run.generate_fix(error, temperature=0.5)
+            first_run.record_failed_fix(error, first_run.fix_temperature)
+
+        second_run = AIManager(api_key=None, fix_store=FixStore(path))
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.return_value = make_mock_response(VALID_RESPONSE)
+            second_run.generate_fix(self._error(tmp_path), temperature=0.4)
+        # Analysis stays at its own temperature; the fix starts above the failures
+        assert mock_c.call_args_list[-1].kwargs["temperature"] == pytest.approx(0.6)
+
+    async def test_first_valid_fix_escalates_and_keeps_winning_temperature(self, tmp_path):
+        from branch_fixer.services.ai.cache import FixStore
+
+        store = FixStore(tmp_path / "fixes.db")
+        first_run = AIManager(api_key=None, fix_store=store)
+        error = self._error(tmp_path)
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.return_value = make_mock_response(VALID_RESPONSE)
+            first_run.generate_fix(error, temperature=0.4)
+            first_run.record_failed_fix(error, first_run.fix_temperature)
+
+        second_run = AIManager(api_key=None, fix_store=store)
+        second_error = self._error(tmp_path)
+        with patch(
+            "branch_fixer.services.ai.manager.acompletion",
+            new_callable=AsyncMock,
+            return_value=make_mock_response(VALID_RESPONSE),
+        ) as mock_ac:
+            await second_run.agenerate_first_valid_fix(second_error, [0.4, 0.5])
+        # 0.4 failed before and escalates onto 0.5, which is only asked once
+        fix_temperatures = [
+            call.kwargs["temperature"] for call in mock_ac.call_args_list[1:]
+        ]
+        assert fix_temperatures == [pytest.approx(0.5)]
+
+        second_run.record_failed_fix(second_error, second_run.fix_temperature)
+        failed = store.failed_temperatures(second_run._fix_store_key, 60)
+        assert failed == {0.4, 0.5}
+
+
+# ---------------------------------------------------------------------------
+# Rule-based fixes
+# ---------------------------------------------------------------------------
+
+class TestRuleFixer:
+    def _error(self, tmp_path):
+        f = tmp_path / "test_foo.py"
+        f.write_text("def test_foo():\n    assert os.sep\n")
+        return TestError(
+            test_file=f,
+            test_function="test_foo",
+            error_details=ErrorDetails(
+                error_type="NameError", message="name 'os' is not defined"
+            ),
+        )
+
+    def test_rule_fix_skips_the_llm(self, tmp_path):
+        from branch_fixer.services.ai.rules import RuleFixer
+
+        m = AIManager(api_key=None, rule_fixer=RuleFixer())
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            changes = m.generate_fix(self._error(tmp_path), temperature=0.4)
+        mock_c.assert_not_called()
+        assert changes.modified_code.startswith("import os\n")
+
+    def test_retry_after_rule_fix_uses_the_llm(self, tmp_path):
+        from branch_fixer.services.ai.rules import RuleFixer
+
+        m = AIManager(api_key=None, rule_fixer=RuleFixer())
+        error = self._error(tmp_path)
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.return_value = make_mock_response(VALID_RESPONSE)
+            m.generate_fix(error, temperature=0.4)
+            m.generate_fix(error, temperature=0.5)
+        assert mock_c.called
+        assert [msg["role"] for msg in m._messages] == ["system", "user", "assistant"]
+
+    def test_verified_rename_is_reused_for_the_same_error(self, tmp_path):
+        from branch_fixer.services.ai.rules import RuleFixer
+
+        message = "module 'calc' has no attribute 'sumup'"
+
+        def error_in(name):
+            f = tmp_path / name
+            f.write_text("import calc\n\ndef test_it():\n    assert calc.sumup(1, 2)\n")
+            return TestError(
+                test_file=f,
+                test_function="test_it",
+                error_details=ErrorDetails(error_type="AttributeError", message=message),
+            )
+
+        fixed = "import calc\n\ndef test_it():\n    assert calc.add(1, 2)\n"
+        m = AIManager(api_key=None, rule_fixer=RuleFixer())
+        first = error_in("test_a.py")
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.return_value = make_mock_response(f"```python\n{fixed}```")
+            m.generate_fix(first, temperature=0.4)
+            m.remember_successful_fix(first)
+            calls = mock_c.call_count
+            changes = m.generate_fix(error_in("test_b.py"), temperature=0.4)
+        assert mock_c.call_count == calls
+        assert changes.modified_code == fixed
+
+
+# ---------------------------------------------------------------------------
+# generate_fixes — several errors in one request
+# ---------------------------------------------------------------------------
+
+class TestGenerateFixes:
+    def _errors(self, tmp_path, n):
+        errors = []
+        for i in range(n):
+            f = tmp_path / f"test_{i}.py"
+            f.write_text(f"def test_{i}(): assert False")
+            errors.append(
+                TestError(
+                    test_file=f,
+                    test_function=f"test_{i}",
+                    error_details=ErrorDetails(error_type="AssertionError", message="boom"),
+                )
+            )
+        return errors
+
+    def test_one_request_for_all_errors(self, tmp_path):
+        errors = self._errors(tmp_path, 2)
+        reply = (
+            "--- FIX 1 ---\n```python\ndef test_0(): pass\n```\n"
+            "--- FIX 2 ---\n```python\ndef test_1(): pass\n```\n"
+        )
+        m = AIManager(api_key=None)
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.return_value = make_mock_response(reply)
+            fixes = m.generate_fixes(errors, temperature=0.4)
+        assert mock_c.call_count == 1
+        prompt = mock_c.call_args.kwargs["messages"][-1]["content"]
+        assert "1) Test function: test_0" in prompt
+        assert "2) Test function: test_1" in prompt
+        assert [f.modified_code for f in fixes] == ["def test_0(): pass", "def test_1(): pass"]
+        # The per-error conversation thread is left alone
+        assert m._messages == []
+
+    def test_block_count_mismatch_raises(self, tmp_path):
+        errors = self._errors(tmp_path, 2)
+        m = AIManager(api_key=None)
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.return_value = make_mock_response("--- FIX 1 ---\nx = 1")
+            with pytest.raises(CompletionError):
+                m.generate_fixes(errors, temperature=0.4)
+
+    def test_empty_batch_makes_no_request(self):
+        m = AIManager(api_key=None)
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            assert m.generate_fixes([], temperature=0.4) == []
+        mock_c.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# Batch API — submit_batch / poll_batch
+# ---------------------------------------------------------------------------
+
+class TestBatchApi:
+    def test_submit_uploads_one_jsonl_line_per_error(self, error, tmp_path):
+        import json
+
+        (tmp_path / "test_math.py").write_text("def test_add(): pass")
+        error.test_file = tmp_path / "test_math.py"
+        m = AIManager(api_key="sk-test", model="openai/gpt-4o-mini")
+        with patch("litellm.create_file") as mock_f, patch(
+            "litellm.create_batch"
+        ) as mock_b:
+            mock_f.return_value = MagicMock(id="file-1")
+            mock_b.return_value = MagicMock(id="batch-1")
+            assert m.submit_batch([error], temperature=0.2) == "batch-1"
+
+        _, payload = mock_f.call_args.kwargs["file"]
+        (line,) = [json.loads(l) for l in payload.decode().splitlines()]
+        assert line["custom_id"] == str(error.id)
+        assert line["body"]["model"] == "gpt-4o-mini"
+        assert line["body"]["temperature"] == 0.2
+        assert mock_b.call_args.kwargs["input_file_id"] == "file-1"
+
+    def test_submit_rejects_non_openai_models(self, error):
+        m = AIManager(api_key=None, model="openrouter/openai/gpt-4o-mini")
+        with pytest.raises(CompletionError):
+            m.submit_batch([error], temperature=0.2)
+
+    def test_poll_returns_none_while_running(self):
+        m = AIManager(api_key=None, model="openai/gpt-4o-mini")
+        with patch(
+            "litellm.retrieve_batch",
+            return_value=MagicMock(status="in_progress"),
+        ):
+            assert m.poll_batch("batch-1") is None
+
+    def test_poll_raises_for_failed_batch(self):
+        m = AIManager(api_key=None, model="openai/gpt-4o-mini")
+        with patch(
+            "litellm.retrieve_batch",
+            return_value=MagicMock(status="expired"),
+        ):
+            with pytest.raises(CompletionError):
+                m.poll_batch("batch-1")
+
+    def test_poll_parses_completed_output(self):
+        import json
+
+        ok = {
+            "custom_id": "err-1",
+            "response": {
+                "status_code": 200,
+                "body": {"choices": [{"message": {"content": VALID_RESPONSE}}]},
+            },
+        }
+        failed = {"custom_id": "err-2", "response": {"status_code": 500}}
+        output = MagicMock(text="\n".join(json.dumps(r) for r in (ok, failed)))
+        m = AIManager(api_key=None, model="openai/gpt-4o-mini")
+        with patch(
+            "litellm.retrieve_batch",
+            return_value=MagicMock(status="completed", output_file_id="file-2"),
+        ), patch(
+            "litellm.file_content", return_value=output
+        ):
+            results = m.poll_batch("batch-1")
+        assert list(results) == ["err-1"]
+        assert "def test_add" in results["err-1"].modified_code
+
+    def test_poll_skips_error_and_malformed_records(self):
+        import json
+
+        ok = {
+            "custom_id": "err-1",
+            "response": {
+                "status_code": 200,
+                "body": {"choices": [{"message": {"content": VALID_RESPONSE}}]},
+            },
+        }
+        errored = {"custom_id": "err-2", "error": {"code": "server_error"}}
+        no_choices = {
+            "custom_id": "err-3",
+            "response": {"status_code": 200, "body": {"choices": []}},
+        }
+        lines = [json.dumps(r) for r in (errored, no_choices)]
+        lines += ["{not json", json.dumps(ok)]
+        m = AIManager(api_key=None, model="openai/gpt-4o-mini")
+        with patch(
+            "litellm.retrieve_batch",
+            return_value=MagicMock(status="completed", output_file_id="file-2"),
+        ), patch(
+            "litellm.file_content", return_value=MagicMock(text="\n".join(lines))
+        ):
+            results = m.poll_batch("batch-1")
+        assert list(results) == ["err-1"]
+
+
 # ---------------------------------------------------------------------------
 # Thread persistence — new error vs retry behaviour
 # ---------------------------------------------------------------------------
@@ -244,6 +1178,51 @@ class TestThreadPersistence:
             m.generate_fix(error, temperature=0.5)
         assert m._current_error_id == str(error.id)
 
+    def test_analysis_runs_once_across_retries(self, tmp_path):
+        from branch_fixer.services.ai.manager import _ANALYSIS_SYSTEM_MESSAGE
+
+        f = tmp_path / "test_foo.py"
+        f.write_text("def test_foo(): pass")
+        error = TestError(
+            test_file=f,
+            test_function="test_foo",
+            error_details=ErrorDetails(error_type="AssertionError", message="fail"),
+        )
+        m = AIManager(api_key=None)
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.return_value = make_mock_response(VALID_RESPONSE)
+            for temperature in (0.4, 0.5, 0.6):
+                m.generate_fix(error, temperature=temperature)
+        analysis_calls = [
+            c for c in mock_c.call_args_list
+            if c.kwargs["messages"][0] == _ANALYSIS_SYSTEM_MESSAGE
+        ]
+        assert len(analysis_calls) == 1
+        assert mock_c.call_count == 4
+
+
+    def test_retry_history_is_bounded(self, tmp_path):
+        f = tmp_path / "test_foo.py"
+        f.write_text("def test_foo(): pass")
+        error = TestError(
+            test_file=f,
+            test_function="test_foo",
+            error_details=ErrorDetails(error_type="AssertionError", message="fail"),
+        )
+        m = AIManager(api_key=None)
+        with patch("branch_fixer.services.ai.manager.completion") as mock_c:
+            mock_c.return_value = make_mock_response(VALID_RESPONSE)
+            m.generate_fix(error, temperature=0.4)
+            initial_prompt = m._messages[1]
+            sizes = []
+            for _ in range(5):
+                m.generate_fix(error, temperature=0.5)
+                sizes.append(len(m._messages))
+        assert sizes[-1] == sizes[-2] == 3 + 2 * (AIManager.RETRY_EXCHANGES_KEPT + 1)
+        # The stable prefix survives trimming
+        assert m._messages[1] is initial_prompt
+        assert [msg["role"] for msg in m._messages[:3]] == ["system", "user", "assistant"]
+
 
 # ---------------------------------------------------------------------------
 # _build_initial_prompt
@@ -275,6 +1254,46 @@ class TestBuildInitialPrompt:
         prompt = m._build_initial_prompt(error, "analysis", "def test_add(): assert 1==2")
         assert "def test_add(): assert 1==2" in prompt
 
+    def test_braces_in_code_are_kept_verbatim(self, error):
+        m = AIManager(api_key=None)
+        code = "d = {'a': 1}\nf'{d}'"
+        prompt = m._build_initial_prompt(error, "{analysis}", code)
+        assert code in prompt
+        assert "{analysis}" in prompt
+
+    def test_file_content_precedes_error_details(self, error):
+        m = AIManager(api_key=None)
+        code = "def test_add(): assert 1==2"
+        prompt = m._build_initial_prompt(error, "analysis", code)
+        assert prompt.index(code) < prompt.index(error.error_details.message)
+        assert prompt.index(code) < prompt.index("analysis")
+
+    def test_errors_in_the_same_file_share_a_prompt_prefix(self, error):
+        m = AIManager(api_key=None)
+        other = TestError(
+            test_file=error.test_file,
+            test_function="test_sub",
+            error_details=ErrorDetails(error_type="NameError", message="name 'x'"),
+        )
+        code = "def test_add(): pass\ndef test_sub(): pass"
+        first = m._build_initial_prompt(error, "a", code)
+        second = m._build_initial_prompt(other, "b", code)
+        shared = os.path.commonprefix([first, second])
+        assert shared.endswith(code + "\n```\n\nTest function: test_")
+
+    def test_analysis_instructions_are_in_the_system_message(self, error):
+        m = AIManager(api_key=None)
+        system, user = m._analysis_messages(error)
+        assert "root cause" in system["content"]
+        assert user["content"].startswith(f"Test: {error.test_function}")
+
+    def test_thread_starts_with_shared_system_prompt(self):
+        from branch_fixer.services.ai.manager import _SYSTEM_PROMPT
+
+        m = AIManager(api_key=None)
+        m._reset_thread()
+        assert m._messages == [{"role": "system", "content": _SYSTEM_PROMPT}]
+
     def test_stack_trace_none_handled(self):
         m = AIManager(api_key=None)
         error_no_trace = TestError(
@@ -286,6 +1305,81 @@ class TestBuildInitialPrompt:
         assert "None" in prompt
 
 
+# ---------------------------------------------------------------------------
+# Context-window guard
+# ---------------------------------------------------------------------------
+
+def count_chars(model, messages):
+    return sum(len(m["content"]) for m in messages)
+
+
+class TestFitToContext:
+    def _error(self, trace):
+        return TestError(
+            test_file=Path("test_foo.py"),
+            test_function="test_foo",
+            error_details=ErrorDetails(
+                error_type="AssertionError", message="fail", stack_trace=trace
+            ),
+        )
+
+    def test_short_prompt_skips_token_counting(self, error):
+        m = AIManager(api_key=None)
+        m._prompt_token_budget = 100_000
+        with patch("litellm.token_counter") as mock_tc:
+            prompt = m._fit_to_context(error, lambda trace: f"trace: {trace}")
+        mock_tc.assert_not_called()
+        assert error.error_details.stack_trace in prompt
+
+    def test_message_framing_is_not_assumed_free(self):
+        m = AIManager(api_key=None)
+        m._reset_thread()
+        trace = "E   AssertionError: boom"
+        # Content alone fits exactly; the per-message framing does not
+        m._prompt_token_budget = count_chars(None, m._messages) + len(trace)
+        with patch("litellm.token_counter", return_value=10**6) as mock_tc:
+            prompt = m._fit_to_context(self._error(trace), lambda t: t)
+        mock_tc.assert_called()
+        assert prompt != trace
+
+    def test_default_model_falls_back_to_a_conservative_window(self):
+        from branch_fixer.services.ai.manager import (
+            _FALLBACK_MAX_INPUT_TOKENS,
+            _OUTPUT_TOKEN_RESERVE,
+            _TRUNCATED_MARKER,
+        )
+
+        m = AIManager(api_key=None)  # the default OpenRouter model
+        with patch("litellm.get_model_info", side_effect=Exception("unknown model")):
+            budget = m._prompt_token_budget
+        assert budget == _FALLBACK_MAX_INPUT_TOKENS - _OUTPUT_TOKEN_RESERVE
+
+        m._reset_thread()
+        trace = "".join(f"frame {i}\n" for i in range(20_000)) + "E   AssertionError: boom"
+        with patch("litellm.token_counter", side_effect=count_chars):
+            prompt = m._fit_to_context(self._error(trace), lambda t: t)
+        assert prompt.startswith(_TRUNCATED_MARKER)
+        assert prompt.endswith("E   AssertionError: boom")
+        assert count_chars(None, m._messages) + len(prompt) <= budget
+
+    def test_long_trace_keeps_tail_within_budget(self):
+        from branch_fixer.services.ai.manager import _TRUNCATED_MARKER
+
+        m = AIManager(api_key=None)
+        m._reset_thread()
+        budget = count_chars(None, m._messages) + 200
+        m._prompt_token_budget = budget
+        trace = "".join(f"frame {i}\n" for i in range(500)) + "E   AssertionError: boom"
+        with patch("litellm.token_counter", side_effect=count_chars):
+            prompt = m._fit_to_context(self._error(trace), lambda t: f"Trace:\n{t}")
+
+        assert prompt.startswith(f"Trace:\n{_TRUNCATED_MARKER}")
+        assert prompt.endswith("E   AssertionError: boom")
+        assert count_chars(None, m._messages) + len(prompt) <= budget
+        # Binary search keeps as much of the tail as fits
+        assert count_chars(None, m._messages) + len(prompt) > budget - 2
+
+
 # ---------------------------------------------------------------------------
 # _parse_response
 # ---------------------------------------------------------------------------
@@ -308,6 +1402,20 @@ class TestParseResponse:
         result = m._parse_response("def test_foo(): pass")
         assert result.modified_code == "def test_foo(): pass"
 
+    def test_skips_fences_with_other_languages(self):
+        m = AIManager(api_key=None)
+        response = "```bash\npip install x\n```\nModified code:\n```python\nx = 1\n```"
+        assert m._parse_response(response).modified_code == "x = 1"
+
+    def test_bare_fence_is_accepted(self):
+        m = AIManager(api_key=None)
+        assert m._parse_response("```\ny = 2\n```").modified_code == "y = 2"
+
+    def test_unfenced_modified_code_header(self):
+        m = AIManager(api_key=None)
+        result = m._parse_response("Explanation: x\nmodified CODE :\nx = 1\n")
+        assert result.modified_code == "x = 1"
+
     def test_parses_multiline_modified_code(self):
         m = AIManager(api_key=None)
         response = "Modified code:\n```python\nx = 1\ny = 2\nz = 3\n```"
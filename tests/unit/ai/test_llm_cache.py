@@ -0,0 +1,116 @@
+"""Tests for LLMCache, SemanticCache and FixStore."""
+import sqlite3
+import time
+from unittest.mock import patch
+
+import pytest
+
+from branch_fixer.services.ai.cache import FixStore, LLMCache, SemanticCache
+
+
+MESSAGES = [{"role": "user", "content": "fix it"}]
+
+
+class TestMakeKey:
+    def test_same_request_same_key(self):
+        a = LLMCache.make_key("m", MESSAGES, 0.0)
+        b = LLMCache.make_key("m", [dict(MESSAGES[0])], 0.0)
+        assert a == b
+
+    def test_key_depends_on_model_messages_and_temperature(self):
+        base = LLMCache.make_key("m", MESSAGES, 0.0)
+        assert LLMCache.make_key("other", MESSAGES, 0.0) != base
+        assert LLMCache.make_key("m", MESSAGES + MESSAGES, 0.0) != base
+        assert LLMCache.make_key("m", MESSAGES, 0.5) != base
+
+
+class TestGetSet:
+    def test_miss_returns_none(self):
+        assert LLMCache().get("missing") is None
+
+    def test_round_trip(self):
+        cache = LLMCache()
+        cache.set("k", "reply")
+        assert cache.get("k") == "reply"
+
+    def test_expired_entry_is_dropped(self):
+        cache = LLMCache(ttl=10.0)
+        with patch("branch_fixer.services.ai.cache.time.monotonic", return_value=100.0):
+            cache.set("k", "reply")
+        with patch("branch_fixer.services.ai.cache.time.monotonic", return_value=110.0):
+            assert cache.get("k") is None
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self):
+        cache = LLMCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
+
+class TestSemanticCache:
+    def test_near_duplicate_in_same_context_hits(self):
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0, 0.1], "tests/test_a.py:abc", "fix")
+        assert cache.lookup([1.0, 0.0, 0.12], "tests/test_a.py:abc") == "fix"
+
+    def test_dissimilar_vector_misses(self):
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0], "ctx", "fix")
+        assert cache.lookup([0.0, 1.0], "ctx") is None
+
+    def test_other_context_never_matches(self):
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0], "tests/test_a.py:abc", "fix")
+        assert cache.lookup([1.0, 0.0], "tests/test_b.py:abc") is None
+
+    def test_returns_most_similar_entry(self):
+        cache = SemanticCache(threshold=0.5)
+        cache.add([1.0, 1.0], "ctx", "far")
+        cache.add([1.0, 0.1], "ctx", "near")
+        assert cache.lookup([1.0, 0.0], "ctx") == "near"
+
+    def test_drops_oldest_when_full(self):
+        cache = SemanticCache(max_entries=1)
+        cache.add([1.0], "ctx", "old")
+        cache.add([1.0], "ctx", "new")
+        assert len(cache) == 1
+        assert cache.lookup([1.0], "ctx") == "new"
+
+
+class TestFixStore:
+    def test_miss_returns_none(self, tmp_path):
+        assert FixStore(tmp_path / "fixes.db").get("missing") is None
+
+    def test_round_trip_and_replace(self, tmp_path):
+        store = FixStore(tmp_path / "fixes.db")
+        store.set("k", "first")
+        store.set("k", "second")
+        assert store.get("k") == "second"
+        assert len(store) == 1
+
+    def test_survives_reopening(self, tmp_path):
+        path = tmp_path / "nested" / "fixes.db"
+        store = FixStore(path)
+        store.set("k", "reply")
+        store.close()
+        assert FixStore(path).get("k") == "reply"
+
+    def test_context_manager_closes_connection(self, tmp_path):
+        with FixStore(tmp_path / "fixes.db") as store:
+            store.set("k", "reply")
+        with pytest.raises(sqlite3.ProgrammingError):
+            store.get("k")
+
+    def test_failed_temperatures_respect_max_age(self, tmp_path):
+        store = FixStore(tmp_path / "fixes.db")
+        store.record_failure("k", 0.4)
+        store.record_failure("k", 0.50000001)
+        store.record_failure("other", 0.7)
+        assert store.failed_temperatures("k", max_age=60) == {0.4, 0.5}
+        with patch("branch_fixer.services.ai.cache.time.time", return_value=time.time() + 120):
+            assert store.failed_temperatures("k", max_age=60) == set()
@@ -0,0 +1,120 @@
+"""Tests for RuleFixer — deterministic fixes that bypass the LLM."""
+import pytest
+from pathlib import Path
+
+from branch_fixer.core.models import ErrorDetails, TestError
+from branch_fixer.services.ai.rules import RuleFixer
+
+
+def make_error(test_file: Path, error_type: str, message: str) -> TestError:
+    return TestError(
+        test_file=test_file,
+        test_function="test_it",
+        error_details=ErrorDetails(error_type=error_type, message=message),
+    )
+
+
+@pytest.fixture
+def fixer():
+    return RuleFixer()
+
+
+class TestMissingImport:
+    def test_adds_stdlib_import_after_docstring_and_future(self, fixer, tmp_path):
+        f = tmp_path / "test_it.py"
+        f.write_text(
+            '"""Doc."""\nfrom __future__ import annotations\n\n'
+            "def test_it():\n    assert os.sep\n"
+        )
+        changes = fixer.try_fix(make_error(f, "NameError", "NameError: name 'os' is not defined"))
+        assert changes.modified_code.splitlines()[:3] == [
+            '"""Doc."""',
+            "from __future__ import annotations",
+            "import os",
+        ]
+
+    def test_ignores_non_stdlib_names(self, fixer, tmp_path):
+        f = tmp_path / "test_it.py"
+        f.write_text("def test_it():\n    assert helper()\n")
+        assert fixer.try_fix(make_error(f, "NameError", "name 'helper' is not defined")) is None
+
+    def test_ignores_stdlib_names_not_used_as_modules(self, fixer, tmp_path):
+        f = tmp_path / "test_it.py"
+        f.write_text("def test_it():\n    assert code == 200\n")
+        assert fixer.try_fix(make_error(f, "NameError", "name 'code' is not defined")) is None
+
+    def test_import_is_not_glued_to_a_last_line_without_newline(self, fixer, tmp_path):
+        f = tmp_path / "test_it.py"
+        f.write_text('"""Doc."""\nfrom __future__ import annotations; os.sep')
+        changes = fixer.try_fix(make_error(f, "NameError", "name 'os' is not defined"))
+        assert changes.modified_code.splitlines()[-1] == "import os"
+        compile(changes.modified_code, str(f), "exec")
+
+
+class TestAttributeTypo:
+    def test_replaces_closest_attribute(self, fixer, tmp_path):
+        f = tmp_path / "test_it.py"
+        f.write_text("import os\n\ndef test_it():\n    assert os.getcwdd()\n")
+        changes = fixer.try_fix(
+            make_error(f, "AttributeError", "module 'os' has no attribute 'getcwdd'")
+        )
+        assert "os.getcwd()" in changes.modified_code
+        assert "getcwdd" not in changes.modified_code
+
+    def test_no_close_match(self, fixer, tmp_path):
+        f = tmp_path / "test_it.py"
+        f.write_text("import os\n\ndef test_it():\n    assert os.zzzzzz\n")
+        error = make_error(f, "AttributeError", "module 'os' has no attribute 'zzzzzz'")
+        assert fixer.try_fix(error) is None
+
+    def test_never_imports_the_module(self, fixer, tmp_path, monkeypatch):
+        import sys
+
+        monkeypatch.delitem(sys.modules, "antigravity", raising=False)
+        f = tmp_path / "test_it.py"
+        f.write_text("import antigravity\n\ndef test_it():\n    antigravity.fly()\n")
+        error = make_error(f, "AttributeError", "module 'antigravity' has no attribute 'fly'")
+        assert fixer.try_fix(error) is None
+        assert "antigravity" not in sys.modules
+
+
+def test_unreadable_file_returns_none(fixer, tmp_path):
+    error = make_error(tmp_path / "missing.py", "NameError", "name 'os' is not defined")
+    assert fixer.try_fix(error) is None
+
+
+class TestLearnedRename:
+    def test_learned_rename_fixes_same_error_elsewhere(self, fixer, tmp_path):
+        message = "module 'calc' has no attribute 'sumup'"
+        first = make_error(tmp_path / "test_a.py", "AttributeError", message)
+        assert fixer.learn(
+            first,
+            "import calc\n\ndef test_it():\n    assert calc.sumup(1, 2) == 3\n",
+            "import calc\n\ndef test_it():\n    assert calc.add(1, 2) == 3\n",
+        )
+
+        f = tmp_path / "test_b.py"
+        f.write_text("import calc\n\ndef test_b():\n    assert calc.sumup(2, 2) == 4\n")
+        result = fixer.try_fix(make_error(f, "AttributeError", message))
+        assert result is not None
+        assert "calc.add(2, 2)" in result.modified_code
+        assert "sumup" not in result.modified_code
+
+    def test_other_message_is_not_matched(self, fixer, tmp_path):
+        fixer.learn(
+            make_error(tmp_path / "a.py", "NameError", "name 'fo' is not defined"),
+            "x = fo\n",
+            "x = foo\n",
+        )
+        f = tmp_path / "test_b.py"
+        f.write_text("x = fo\n")
+        error = make_error(f, "NameError", "name 'bar' is not defined")
+        assert fixer.try_fix(error) is None
+
+    def test_complex_fix_is_not_learned(self, fixer, tmp_path):
+        error = make_error(tmp_path / "a.py", "NameError", "name 'fo' is not defined")
+        assert not fixer.learn(error, "x = fo\n", "import foo\nx = foo.fo\n")
+
+    def test_rename_must_involve_the_error(self, fixer, tmp_path):
+        error = make_error(tmp_path / "a.py", "NameError", "name 'fo' is not defined")
+        assert not fixer.learn(error, "x = bar\n", "x = baz\n")
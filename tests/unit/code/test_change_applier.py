@@ -1,11 +1,16 @@
 """Tests for ChangeApplier — backup/restore transaction and syntax verification."""
+import os
+import sys
+import time
 import pytest
 from pathlib import Path
+from unittest.mock import patch
 
 from branch_fixer.core.models import CodeChanges
 from branch_fixer.services.code.change_applier import (
     BackupError,
     ChangeApplier,
+    _fast_copy,
 )
 
 
@@ -88,6 +93,23 @@ class TestApplyChangesHappyPath:
         assert "```" not in valid_py.read_text()
 
 
+    @pytest.mark.parametrize(
+        "raw, expected",
+        [
+            ("```python\nx = 1\n```", "x = 1"),
+            ("```\nx = 1\n```", "x = 1"),
+            ("x = 1\n", "x = 1"),
+            ("```", ""),
+            ("``````", ""),
+            ("  ```py\nx = 1\n```\n", "x = 1"),
+            ("```python\nx = 1\n", "x = 1"),
+            ("x = '```'\n", "x = '```'"),
+        ],
+    )
+    def test_strip_code_fences(self, raw, expected):
+        assert ChangeApplier._strip_code_fences(raw) == expected
+
+
 # ---------------------------------------------------------------------------
 # apply_changes_with_backup — syntax failure reverts automatically
 # ---------------------------------------------------------------------------
@@ -111,6 +133,19 @@ class TestApplyChangesSyntaxFailure:
         applier.apply_changes_with_backup(valid_py, bad_changes)
         assert valid_py.read_text() == original
 
+    def test_rejected_code_is_never_written(self, applier, valid_py):
+        changes = CodeChanges(
+            original_code=valid_py.read_text(),
+            modified_code="def test_foo(:\n    pass\n",
+        )
+        with patch.object(ChangeApplier, "_write_atomically") as write, patch.object(
+            ChangeApplier, "_restore_backup"
+        ) as restore:
+            success, _ = applier.apply_changes_with_backup(valid_py, changes)
+        assert success is False
+        write.assert_not_called()
+        restore.assert_not_called()
+
     def test_backup_still_returned_after_syntax_failure(self, applier, valid_py):
         bad_changes = CodeChanges(
             original_code=valid_py.read_text(),
@@ -167,6 +202,12 @@ class TestBackupFile:
         backup = applier._backup_file(valid_py)
         assert "test_sample" in backup.name
 
+    def test_back_to_back_backups_get_distinct_names(self, applier, valid_py):
+        first = applier._backup_file(valid_py)
+        second = applier._backup_file(valid_py)
+        assert first != second
+        assert first.exists() and second.exists()
+
 
 # ---------------------------------------------------------------------------
 # _verify_changes
@@ -187,3 +228,236 @@ class TestVerifyChanges:
         f = tmp_path / "empty.py"
         f.write_text("")
         assert applier._verify_changes(f) is True
+
+    def test_rejects_removing_every_assert(self, applier, tmp_path):
+        f = tmp_path / "test_x.py"
+        original = "def test_x():\n    assert 1\n"
+        assert applier._verify_changes(f, original, "def test_x():\n    pass\n") is False
+        assert applier._verify_changes(f, original, "def test_x():\n    assert 2\n") is True
+
+    def test_uses_in_memory_source_without_reading_file(self, applier, tmp_path):
+        f = tmp_path / "unread.py"
+        assert applier._verify_changes(f, updated_source="x = 1\n") is True
+        assert applier._verify_changes(f, updated_source="x = )\n") is False
+
+
+# ---------------------------------------------------------------------------
+# async variants
+# ---------------------------------------------------------------------------
+
+class TestAsyncVariants:
+    async def test_aapply_changes_with_backup_applies_changes(self, applier, valid_py, valid_changes):
+        success, backup_path = await applier.aapply_changes_with_backup(valid_py, valid_changes)
+        assert success is True
+        assert "assert True" in valid_py.read_text()
+        assert backup_path.exists()
+
+    async def test_arestore_backup_restores_original(self, applier, valid_py, valid_changes):
+        original = valid_py.read_text()
+        _, backup_path = await applier.aapply_changes_with_backup(valid_py, valid_changes)
+        assert await applier.arestore_backup(valid_py, backup_path) is True
+        assert valid_py.read_text() == original
+
+    async def test_aapply_many_with_backup_applies_every_file(self, applier, tmp_path):
+        files = {}
+        for name in ("a.py", "b.py"):
+            path = tmp_path / name
+            path.write_text("x = 1\n")
+            files[path] = CodeChanges(original_code="x = 1\n", modified_code="x = 2\n")
+
+        success, backup_path = await applier.aapply_many_with_backup(files)
+
+        assert success is True
+        assert backup_path.suffix == ".tar"
+        assert backup_path.parent.name == ".backups"
+        assert all(path.read_text() == "x = 2" for path in files)
+
+    async def test_batch_archive_restores_a_single_file(self, applier, tmp_path):
+        sub = tmp_path / "pkg"
+        sub.mkdir()
+        files = {}
+        for path in (tmp_path / "a.py", sub / "b.py"):
+            path.write_text("x = 1\n")
+            files[path] = CodeChanges(original_code="x = 1\n", modified_code="x = 2\n")
+
+        _, backup_path = await applier.aapply_many_with_backup(files)
+        applier.restore_backup(sub / "b.py", backup_path)
+
+        assert (sub / "b.py").read_text() == "x = 1\n"
+        assert (tmp_path / "a.py").read_text() == "x = 2"
+
+    async def test_aapply_many_with_backup_rolls_back_on_any_failure(self, applier, tmp_path):
+        good, bad = tmp_path / "good.py", tmp_path / "bad.py"
+        good.write_text("x = 1\n")
+        bad.write_text("y = 1\n")
+        files = {
+            good: CodeChanges(original_code="x = 1\n", modified_code="x = 2\n"),
+            bad: CodeChanges(original_code="y = 1\n", modified_code="y = )\n"),
+        }
+
+        success, _ = await applier.aapply_many_with_backup(files)
+
+        assert success is False
+        assert good.read_text() == "x = 1\n"
+        assert bad.read_text() == "y = 1\n"
+
+
+# ---------------------------------------------------------------------------
+# _prune_backups
+# ---------------------------------------------------------------------------
+
+class TestPruneBackups:
+    def test_keeps_everything_below_the_limit(self, applier, valid_py):
+        backups = [applier._backup_file(valid_py) for _ in range(3)]
+        assert all(b.exists() for b in backups)
+
+    def test_removes_oldest_beyond_the_limit(self, applier, valid_py):
+        backups = []
+        for i in range(ChangeApplier.MAX_BACKUPS_PER_FILE + 2):
+            backup = applier._backup_file(valid_py)
+            os.utime(backup, (i, i))
+            backups.append(backup)
+        assert [b.exists() for b in backups[:2]] == [False, False]
+        assert all(b.exists() for b in backups[2:])
+
+
+class TestBackupDedup:
+    def test_unchanged_file_backups_share_one_copy(self, applier, valid_py):
+        first = applier._backup_file(valid_py)
+        second = applier._backup_file(valid_py)
+        assert first != second
+        assert first.stat().st_ino == second.stat().st_ino
+        assert second.read_text() == valid_py.read_text()
+
+    def test_changed_file_gets_a_fresh_copy(self, applier, valid_py):
+        first = applier._backup_file(valid_py)
+        valid_py.write_text("def test_foo():\n    assert 2 == 2\n")
+        second = applier._backup_file(valid_py)
+        assert first.stat().st_ino != second.stat().st_ino
+        assert "assert 2 == 2" in second.read_text()
+        assert "assert 1 == 1" in first.read_text()
+
+    def test_restore_leaves_linked_backups_intact(self, applier, valid_py):
+        original = valid_py.read_text()
+        first = applier._backup_file(valid_py)
+        second = applier._backup_file(valid_py)
+        valid_py.write_text("broken(")
+        applier.restore_backup(valid_py, second)
+        assert valid_py.read_text() == original
+        assert first.read_text() == original
+
+    def test_pruning_keeps_the_newest_linked_backup(self, applier, valid_py):
+        backups = [
+            applier._backup_file(valid_py)
+            for _ in range(ChangeApplier.MAX_BACKUPS_PER_FILE + 2)
+        ]
+        assert backups[-1].exists()
+        assert sum(b.exists() for b in backups) == ChangeApplier.MAX_BACKUPS_PER_FILE
+
+
+class TestExternalBackupDir:
+    def test_backups_stay_out_of_the_source_tree(self, tmp_path, valid_py, valid_changes):
+        store = tmp_path / "cache"
+        applier = ChangeApplier(backup_dir=store)
+        success, backup_path = applier.apply_changes_with_backup(valid_py, valid_changes)
+        assert success is True
+        assert store in backup_path.parents
+        assert not (valid_py.parent / ".backups").exists()
+        applier.restore_backup(valid_py, backup_path)
+        assert "assert 1 == 1" in valid_py.read_text()
+
+    async def test_batch_archive_restores_from_external_dir(self, tmp_path):
+        src = tmp_path / "src"
+        src.mkdir()
+        paths = [src / "a.py", src / "b.py"]
+        for path in paths:
+            path.write_text("x = 1\n")
+        applier = ChangeApplier(backup_dir=tmp_path / "cache")
+        changes = {p: CodeChanges(original_code="x = 1\n", modified_code="x = 2\n") for p in paths}
+        ok, backup_path = await applier.aapply_many_with_backup(changes)
+        assert ok is True
+        applier.restore_backup(paths[1], backup_path)
+        assert paths[1].read_text() == "x = 1\n"
+        assert paths[0].read_text() == "x = 2"
+
+    def test_stale_backups_are_swept(self, tmp_path):
+        store = tmp_path / "cache"
+        stale = store / "0123456789abcdef" / "old.py-1-0.bak"
+        fresh = store / "0123456789abcdef" / "new.py-2-0.bak"
+        stale.parent.mkdir(parents=True)
+        stale.write_text("old")
+        fresh.write_text("new")
+        old = time.time() - (ChangeApplier.MAX_BACKUP_AGE_DAYS + 1) * 86400
+        os.utime(stale, (old, old))
+        applier = ChangeApplier(backup_dir=store)
+        applier.close()
+        assert not stale.exists()
+        assert fresh.exists()
+
+
+class TestClose:
+    def test_pool_is_created_only_by_the_batch_path(self, tmp_path, valid_py, valid_changes):
+        with ChangeApplier() as applier:
+            applier.apply_changes_with_backup(valid_py, valid_changes)
+            assert applier._io_pool is None
+
+    async def test_close_shuts_down_the_pool(self, tmp_path):
+        path = tmp_path / "a.py"
+        path.write_text("x = 1\n")
+        applier = ChangeApplier()
+        change = CodeChanges(original_code="x = 1\n", modified_code="x = 2\n")
+        ok, _ = await applier.aapply_many_with_backup({path: change})
+        assert ok is True
+        pool = applier._io_pool
+        assert pool is not None
+        applier.close()
+        assert applier._io_pool is None
+        with pytest.raises(RuntimeError):
+            pool.submit(print)
+
+
+class TestWriteAtomically:
+    def test_replaces_content_and_keeps_mode(self, applier, valid_py):
+        valid_py.chmod(0o640)
+        applier._write_atomically(valid_py, "x = 2\n")
+        assert valid_py.read_text() == "x = 2\n"
+        assert valid_py.stat().st_mode & 0o777 == 0o640
+        assert [p.name for p in valid_py.parent.iterdir()] == [valid_py.name]
+
+    def test_failed_write_leaves_original_and_no_temp_file(self, applier, valid_py):
+        original = valid_py.read_text()
+        with patch("os.replace", side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                applier._write_atomically(valid_py, "x = 2\n")
+        assert valid_py.read_text() == original
+        assert [p.name for p in valid_py.parent.iterdir()] == [valid_py.name]
+
+
+class TestFastCopy:
+    def test_large_file_copy_matches_source(self, tmp_path):
+        src = tmp_path / "big.py"
+        src.write_bytes(b"x = 1\n" * 20000)
+        dst = tmp_path / "big.bak"
+        _fast_copy(src, dst)
+        assert dst.read_bytes() == src.read_bytes()
+        # Independent of the source afterwards, whether cloned or copied
+        src.write_text("y = 2\n")
+        assert dst.read_bytes().startswith(b"x = 1\n")
+
+    @pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Linux-only path")
+    def test_reflink_skips_the_byte_copy(self, tmp_path):
+        src = tmp_path / "big.py"
+        src.write_bytes(b"x" * (1 << 20))
+        with patch("branch_fixer.services.code.change_applier.fcntl.ioctl") as ioctl, patch(
+            "branch_fixer.services.code.change_applier.shutil.copy2"
+        ) as copy2:
+            _fast_copy(src, tmp_path / "big.bak")
+        ioctl.assert_called_once()
+        copy2.assert_not_called()
+
+    def test_small_files_use_a_plain_copy(self, tmp_path):
+        src = tmp_path / "small.py"
+        src.write_text("x = 1\n")
+        with patch("branch_fixer.services.code.change_applier.shutil.copy2") as copy2:
+            _fast_copy(src, tmp_path / "small.bak")
+        copy2.assert_called_once()
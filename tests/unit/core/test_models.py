@@ -59,6 +59,27 @@ class TestErrorDomainModel(unittest.TestCase):
         
         self.assertEqual(attempt.status, "failed")
         self.assertEqual(self.error.status, "unfixed")
+        self.assertIsNone(attempt.failure_kind)
+
+    def test_mark_attempt_failed_records_kind(self):
+        """Test that the failure kind is stored and survives serialization."""
+        attempt = self.error.start_fix_attempt(temperature=0.4)
+        self.error.mark_attempt_failed(attempt, "verify")
+
+        self.assertEqual(attempt.failure_kind, "verify")
+        from src.branch_fixer.core.models import FixAttempt
+        restored = FixAttempt.from_dict(attempt.to_dict())
+        self.assertEqual(restored.failure_kind, "verify")
+
+    def test_fix_attempt_from_dict_without_kind(self):
+        """Test that attempts serialized before failure_kind existed still load."""
+        from src.branch_fixer.core.models import FixAttempt
+        data = {
+            "temperature": 0.4,
+            "status": "failed",
+            "id": "12345678-1234-5678-1234-567812345678",
+        }
+        self.assertIsNone(FixAttempt.from_dict(data).failure_kind)
 
     def test_cannot_start_attempt_when_fixed(self):
         """Test that we cannot start new fix attempts on a fixed error."""
@@ -76,6 +97,15 @@ class TestErrorDomainModel(unittest.TestCase):
         with self.assertRaises(Exception):
             details.error_type = "ValueError"
 
+    def test_code_changes_immutability(self):
+        """Test that CodeChanges is immutable and slotted."""
+        from src.branch_fixer.core.models import CodeChanges
+        changes = CodeChanges(original_code="", modified_code="x = 1")
+
+        with self.assertRaises(Exception):
+            changes.modified_code = "x = 2"
+        self.assertFalse(hasattr(changes, "__dict__"))
+
     def test_mark_fixed_with_foreign_attempt(self):
         """Test that marking fixed with an attempt from another error raises ValueError."""
         from src.branch_fixer.core.models import TestError, ErrorDetails
@@ -5,10 +5,15 @@ from unittest.mock import patch
 
 import pytest
 
-from branch_fixer.services.git.branch_manager import BranchManager
+from branch_fixer.services.git.branch_manager import (
+    BranchManager,
+    _split_status,
+    _worktree_changes,
+)
 from branch_fixer.services.git.exceptions import (
     BranchCreationError,
     BranchNameError,
+    BranchNotFoundError,
     GitError,
 )
 
@@ -96,11 +101,23 @@ class FakeRepo:
     def branch_exists(self, branch_name: str) -> bool:
         return branch_name in self.existing_branches
 
+    def branch_state(self, branch_name: str):
+        exists = branch_name in self.existing_branches
+        return exists, exists and self.get_current_branch() == branch_name
+
     def run_command(self, args: List[str]) -> FakeCommandResult:
         # record the call
         self.calls.append(list(args))
         if self._run_command_side_effect:
             raise self._run_command_side_effect
+        if "status" in args:
+            return FakeCommandResult(stdout=self._porcelain_status(), command=list(args))
+        if args[:2] == ["checkout", "-b"] and args[2] in self.existing_branches:
+            return FakeCommandResult(
+                returncode=128,
+                stderr=f"fatal: a branch named '{args[2]}' already exists",
+                command=list(args),
+            )
         # return a copy (so tests can mutate if needed separately)
         return FakeCommandResult(
             returncode=self._run_command_result.returncode,
@@ -109,6 +126,26 @@ class FakeRepo:
             command=list(args),
         )
 
+    def delete_branch(self, branch_name: str, force: bool = False) -> FakeCommandResult:
+        # Mirrors GitRepository.delete_branch
+        try:
+            return self.run_command(["branch", "-D" if force else "-d", branch_name])
+        except GitError as e:
+            if not self.branch_exists(branch_name):
+                raise BranchNotFoundError(f"Branch {branch_name} not found") from e
+            raise
+
+    def _porcelain_status(self) -> str:
+        """``git status --porcelain=v2 -z --branch`` output for the configured state."""
+        entries = [f"# branch.oid {'0' * 40}", f"# branch.head {self.get_current_branch()}"]
+        entries += [
+            f"1 .M N... 100644 100644 100644 {'0' * 40} {'0' * 40} {item.a_path}"
+            for item in self.repo.index._items
+        ]
+        if not self._is_clean and len(entries) == 2:
+            entries.append("? untracked.txt")
+        return "".join(f"{entry}\0" for entry in entries)
+
     # Helpers to mutate state in tests
     def set_current_branch(self, name: str):
         self._current_branch = name
@@ -172,6 +209,8 @@ class TestBranchManager:
         # The implementation does not raise for None repository (despite docstring)
         mgr_none = BranchManager(None)
         assert mgr_none.repository is None
+        # Every manager shares the one immutable set
+        assert mgr_none.forbidden_names is mgr.forbidden_names
 
     def test_get_status_clean_repo_no_changes(self, make_repo):
         repo = make_repo(current_branch="feature/one", is_clean=True, diff_items=[])
@@ -256,7 +295,7 @@ class TestBranchManager:
             mgr.validate_branch_name("")
         assert "cannot be empty" in str(excinfo.value).lower()
 
-    @pytest.mark.parametrize("bad_name", ["bad name", "name!", "weird*name"])
+    @pytest.mark.parametrize("bad_name", ["bad name", "name!", "weird*name", "fix/1\n", "caf\u00e9"])
     def test_validate_branch_name_rejects_invalid_characters(self, manager_factory, bad_name):
         mgr = manager_factory()
         with pytest.raises(BranchNameError) as excinfo:
@@ -292,6 +331,8 @@ class TestBranchManager:
         with pytest.raises(BranchCreationError) as excinfo:
             mgr.create_fix_branch("fix/3")
         assert "already exists" in str(excinfo.value).lower()
+        # No separate existence check before the checkout
+        assert repo.calls == [["checkout", "-b", "fix/3", "main"]]
 
     def test_create_fix_branch_run_command_failure_raises_BranchCreationError(self, make_repo):
         repo = make_repo(existing_branches=set(), run_command_result=FakeCommandResult(returncode=1, stderr="git error"))
@@ -316,15 +357,30 @@ class TestBranchManager:
         assert result is False
         assert repo.calls == [["branch", "-d", "fix/8"]]
 
-    def test_cleanup_fix_branch_repo_raises_not_found_message_suppressed(self, make_repo):
-        # Simulate run_command raising an exception with "not found" message
+    def test_cleanup_fix_branch_repo_raises_not_found_suppressed(self, make_repo):
+        # Simulate run_command raising a typed "branch not found" error
         repo = make_repo(existing_branches={"fix/9"})
-        repo.set_run_command_side_effect(Exception("Branch not found in repository"))
+        repo.set_run_command_side_effect(BranchNotFoundError("Branch fix/9 not found"))
         mgr = BranchManager(repo)
         # The code should catch this and return True (suppress)
         result = mgr.cleanup_fix_branch("fix/9", force=False)
         assert result is True
 
+    def test_cleanup_fix_branch_deleted_concurrently_returns_true(self, make_repo):
+        # branch_state still sees the branch, but it is gone by the delete
+        repo = make_repo(existing_branches={"fix/9"}, current_branch="other")
+        repo.set_run_command_side_effect(GitError("error: branch 'fix/9' not found."))
+        repo.branch_exists = lambda name: False
+        mgr = BranchManager(repo)
+        assert mgr.cleanup_fix_branch("fix/9") is True
+
+    def test_cleanup_fix_branch_not_found_text_alone_is_not_suppressed(self, make_repo):
+        repo = make_repo(existing_branches={"fix/9"}, current_branch="other")
+        repo.set_run_command_side_effect(GitError("error: branch 'fix/9' not found."))
+        mgr = BranchManager(repo)
+        with pytest.raises(GitError, match="Failed to clean up branch fix/9"):
+            mgr.cleanup_fix_branch("fix/9")
+
     def test_cleanup_fix_branch_unexpected_exception_wrapped_in_GitError(self, make_repo):
         repo = make_repo(existing_branches={"fix/10"})
         repo.set_run_command_side_effect(ValueError("boom"))
@@ -332,11 +388,36 @@ class TestBranchManager:
         with pytest.raises(GitError) as excinfo:
             mgr.cleanup_fix_branch("fix/10")
         assert "Failed to clean up branch fix/10" in str(excinfo.value)
-
-    def test_get_branch_metadata_raises_not_implemented(self, manager_factory):
-        mgr = manager_factory()
-        with pytest.raises(NotImplementedError):
-            mgr.get_branch_metadata("any")
+        assert isinstance(excinfo.value.__cause__, ValueError)
+
+    def test_get_branch_metadata_batch_uses_one_for_each_ref(self, make_repo):
+        sha = "a" * 40
+        stdout = (
+            f"fix/1\0{sha}\0origin/fix/1\0 \n"
+            f"fix/1/nested\0{sha}\0\0 \n"
+            f"fix/2\0{sha}\0\0*\n"
+        )
+        repo = make_repo(
+            current_branch="fix/2",
+            diff_items=[SimpleNamespace(a_path="tests/test_a.py")],
+            run_command_result=FakeCommandResult(stdout=stdout),
+        )
+        mgr = BranchManager(repo)
+        metadata = mgr.get_branch_metadata_batch(["fix/1", "fix/2", "gone"])
+        assert [call[0] for call in repo.calls] == ["for-each-ref", "-c"]
+        assert sorted(metadata) == ["fix/1", "fix/2"]
+        assert metadata["fix/1"].upstream == "origin/fix/1"
+        assert metadata["fix/1"].current is False
+        assert metadata["fix/1"].modified_files == []
+        assert metadata["fix/2"].current is True
+        assert metadata["fix/2"].upstream is None
+        assert metadata["fix/2"].last_commit == sha
+        assert [str(p) for p in metadata["fix/2"].modified_files] == ["tests/test_a.py"]
+
+    def test_get_branch_metadata_missing_branch_raises(self, make_repo):
+        mgr = BranchManager(make_repo())
+        with pytest.raises(BranchNotFoundError):
+            mgr.get_branch_metadata("gone")
 
     def test_is_branch_merged_raises_not_implemented(self, manager_factory):
         mgr = manager_factory()
@@ -351,4 +432,21 @@ class TestBranchManager:
                 mgr.validate_branch_name("some-name")
             assert "Failed to validate branch name" in str(excinfo.value)
             # __cause__ should be the original ValueError due to "from e" used in code
-            assert isinstance(excinfo.value.__cause__, ValueError)
\ No newline at end of file
+            assert isinstance(excinfo.value.__cause__, ValueError)
+
+def test_worktree_changes_parses_porcelain_v2_records():
+    sha = "0" * 40
+    entries = [
+        f"1 .M N... 100644 100644 100644 {sha} {sha} dir/a file.py",
+        f"1 M. N... 100644 100644 100644 {sha} {sha} staged.py",
+        f"u UU N... 100644 100644 100644 100644 {sha} {sha} {sha} conflict.py",
+        "? untracked.py",
+        "! ignored.py",
+    ]
+    assert _worktree_changes(entries) == ["dir/a file.py", "conflict.py"]
+
+
+def test_split_status_reads_branch_header():
+    entries = ["# branch.oid " + "0" * 40, "# branch.head fix/1", "? new.py"]
+    assert _split_status(entries) == ("fix/1", ["? new.py"])
+    assert _split_status(["# branch.head (detached)"]) == ("", [])
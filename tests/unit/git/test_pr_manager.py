@@ -136,6 +136,16 @@ class TestPRManager:
         assert manager.prs[1] is d1
         assert manager.prs[2] is d2
 
+    def test_create_pr_does_not_reuse_ids_of_dropped_prs(self, patched_types, fake_repo):
+        manager = PRManager(repository=fake_repo)
+        manager.create_pr("T1", "D1", "b1", [], None)
+        d2 = manager.create_pr("T2", "D2", "b2", [], None)
+        del manager.prs[1]
+        d3 = manager.create_pr("T3", "D3", "b3", [], None)
+
+        assert d3.id == 3
+        assert manager.prs[2] is d2
+
     def test_create_pr_accepts_modified_files_and_metadata_without_using_them(self, patched_types, fake_repo):
         manager = PRManager(repository=fake_repo)
         # Create some actual Path objects to pass in
@@ -147,43 +157,38 @@ class TestPRManager:
         assert details.id == 1
         assert manager.prs[1] is details
 
-    # update_pr (async) happy path and error
-    @pytest.mark.asyncio
-    async def test_update_pr_returns_existing_pr(self, patched_types, fake_repo):
+    # update_pr happy path and error
+    def test_update_pr_returns_existing_pr(self, patched_types, fake_repo):
         manager = PRManager(repository=fake_repo)
         created = manager.create_pr("T", "D", "b", [], None)
-        # Await the async update_pr and expect the same object back
-        result = await manager.update_pr(created.id, status=pr_manager_module.PRStatus.MERGED, metadata={"k": "v"}, reason="done")
+        # update_pr is a plain call and returns the same object
+        result = manager.update_pr(created.id, status=pr_manager_module.PRStatus.MERGED, metadata={"k": "v"}, reason="done")
         assert result is created
 
-    @pytest.mark.asyncio
-    async def test_update_pr_missing_pr_raises_PRUpdateError(self, patched_types, fake_repo):
+    def test_update_pr_missing_pr_raises_PRUpdateError(self, patched_types, fake_repo):
         manager = PRManager(repository=fake_repo)
         # Attempting to update a non-existent PR should raise the module's PRUpdateError
         with pytest.raises(pr_manager_module.PRUpdateError) as exc:
-            await manager.update_pr(999, status=None, metadata=None, reason=None)
+            manager.update_pr(999, status=None, metadata=None, reason=None)
         assert "PR not found" in str(exc.value)
 
-    # validate_pr (async) behavior
-    @pytest.mark.asyncio
-    async def test_validate_pr_returns_true_for_existing_pr(self, patched_types, fake_repo):
+    # validate_pr behavior
+    def test_validate_pr_returns_true_for_existing_pr(self, patched_types, fake_repo):
         manager = PRManager(repository=fake_repo)
         created = manager.create_pr("T", "D", "b", [], None)
-        is_valid = await manager.validate_pr(created.id)
+        is_valid = manager.validate_pr(created.id)
         assert is_valid is True
 
-    @pytest.mark.asyncio
-    async def test_validate_pr_returns_false_for_missing_pr(self, patched_types, fake_repo):
+    def test_validate_pr_returns_false_for_missing_pr(self, patched_types, fake_repo):
         manager = PRManager(repository=fake_repo)
-        result = await manager.validate_pr(1)
+        result = manager.validate_pr(1)
         assert result is False
 
     # get_pr_history should raise NotImplementedError
-    @pytest.mark.asyncio
-    async def test_get_pr_history_raises_not_implemented(self, patched_types, fake_repo):
+    def test_get_pr_history_raises_not_implemented(self, patched_types, fake_repo):
         manager = PRManager(repository=fake_repo)
         with pytest.raises(NotImplementedError):
-            await manager.get_pr_history(1)
+            manager.get_pr_history(1)
 
     # close_pr should raise NotImplementedError
     @pytest.mark.asyncio
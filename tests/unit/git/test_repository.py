@@ -7,6 +7,7 @@ from unittest.mock import MagicMock, patch
 from branch_fixer.services.git.exceptions import (
     BranchCreationError,
     BranchNameError,
+    BranchNotFoundError,
     GitError,
     NotAGitRepositoryError,
 )
@@ -102,12 +103,180 @@ class TestBranchExists:
     def test_missing_branch_returns_false(self, git_repo):
         assert git_repo.branch_exists("no-such-branch") is False
 
+    def test_lookups_share_one_process_and_see_new_refs(self, git_repo):
+        assert git_repo.branch_exists("fix/new") is False
+        reader = git_repo._ref_reader
+        subprocess.run(["git", "branch", "fix/new"], cwd=git_repo.root, check=True, capture_output=True)
+        assert git_repo.branch_exists("fix/new") is True
+        subprocess.run(["git", "pack-refs", "--all"], cwd=git_repo.root, check=True, capture_output=True)
+        assert git_repo.branch_exists("fix/new") is True
+        subprocess.run(["git", "branch", "-D", "fix/new"], cwd=git_repo.root, check=True, capture_output=True)
+        assert git_repo.branch_exists("fix/new") is False
+        assert git_repo._ref_reader is reader
+
+    def test_resolve_ref_returns_object_name(self, git_repo):
+        head = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=git_repo.root, check=True, capture_output=True, text=True
+        ).stdout.strip()
+        assert git_repo.resolve_ref("refs/heads/main") == head
+        assert git_repo.resolve_ref("refs/heads/missing") is None
+
+    def test_close_stops_the_process_and_lookups_restart_it(self, git_repo):
+        git_repo.branch_exists("main")
+        reader = git_repo._ref_reader
+        git_repo.close()
+        assert reader.poll() is not None
+        assert git_repo.branch_exists("main") is True
+
+    def test_falls_back_to_rev_parse(self, git_repo):
+        with patch.object(git_repo, "_start_ref_reader", side_effect=GitError("no cat-file")):
+            assert git_repo.branch_exists("main") is True
+            assert git_repo.branch_exists("no-such-branch") is False
+
+    def test_name_is_not_matched_as_a_pattern(self, git_repo):
+        assert git_repo.branch_exists("ma*") is False
+
+    def test_git_failure_raises(self, git_repo):
+        failed = CommandResult(returncode=128, stdout="", stderr="fatal", command=[])
+        with (
+            patch.object(git_repo, "_start_ref_reader", side_effect=GitError("no cat-file")),
+            patch.object(git_repo, "_execute_subprocess", return_value=failed),
+        ):
+            with pytest.raises(GitError):
+                git_repo.branch_exists("main")
+
     def test_sync_existing_returns_true(self, git_repo):
         assert git_repo.branch_exists_sync("main") is True
 
     def test_sync_missing_returns_false(self, git_repo):
         assert git_repo.branch_exists_sync("no-such-branch") is False
 
+    def test_branch_state_marks_current_branch(self, git_repo):
+        subprocess.run(["git", "branch", "other"], cwd=git_repo.root, check=True, capture_output=True)
+        assert git_repo.branch_state("main") == (True, True)
+        assert git_repo.branch_state("other") == (True, False)
+        assert git_repo.branch_state("no-such-branch") == (False, False)
+
+    def test_branch_state_without_running_git(self, git_repo):
+        subprocess.run(["git", "branch", "other"], cwd=git_repo.root, check=True, capture_output=True)
+        git_repo.resolve_ref("HEAD")  # start the shared ref reader
+        with patch.object(git_repo, "run_command", side_effect=AssertionError("spawned git")):
+            assert git_repo.branch_state("other") == (True, False)
+            assert git_repo.branch_state("main") == (True, True)
+
+    def test_branch_state_detached_head_lists_branches(self, git_repo):
+        subprocess.run(["git", "checkout", "--detach"], cwd=git_repo.root, check=True, capture_output=True)
+        assert git_repo.branch_state("main") == (True, False)
+
+
+class TestCurrentBranch:
+    def test_read_from_head_without_running_git(self, git_repo):
+        subprocess.run(["git", "checkout", "-b", "fix/head"], cwd=git_repo.root, check=True, capture_output=True)
+        with patch.object(git_repo, "run_command", side_effect=AssertionError("spawned git")):
+            assert git_repo.get_current_branch() == "fix/head"
+
+    def test_detached_head_falls_back_to_git(self, git_repo):
+        subprocess.run(["git", "checkout", "--detach"], cwd=git_repo.root, check=True, capture_output=True)
+        assert git_repo.get_current_branch() == ""
+
+
+class TestBranchStatus:
+    def test_reports_unstaged_tracked_changes_only(self, git_repo, tmp_path):
+        (tmp_path / "with space.md").write_text("a")
+        (tmp_path / "staged.md").write_text("b")
+        subprocess.run(["git", "add", "."], cwd=tmp_path, check=True, capture_output=True)
+        subprocess.run(["git", "commit", "-m", "more"], cwd=tmp_path, check=True, capture_output=True)
+        (tmp_path / "with space.md").write_text("changed")
+        (tmp_path / "staged.md").write_text("changed")
+        subprocess.run(["git", "add", "staged.md"], cwd=tmp_path, check=True, capture_output=True)
+        (tmp_path / "untracked.md").write_text("new")
+
+        status = git_repo.branch_manager.get_status()
+        assert status.current_branch == "main"
+        assert status.has_changes is True
+        assert status.changes == ["with space.md"]
+
+    def test_status_uses_untracked_cache_without_changing_config(self, git_repo, tmp_path):
+        git_repo.branch_manager.get_status()
+        config = (tmp_path / ".git" / "config").read_text()
+        assert "untrackedCache" not in config
+        index = (tmp_path / ".git" / "index").read_bytes()
+        assert b"UNTR" in index
+
+    def test_untracked_file_alone_counts_as_changes(self, git_repo, tmp_path):
+        (tmp_path / "untracked.md").write_text("new")
+        status = git_repo.branch_manager.get_status()
+        assert status.has_changes is True
+        assert status.changes == []
+
+    def test_branch_comes_from_the_status_run(self, git_repo):
+        with patch.object(git_repo, "get_current_branch", side_effect=AssertionError("extra lookup")):
+            status = git_repo.branch_manager.get_status()
+        assert status.current_branch == "main"
+        assert status.has_changes is False
+
+    def test_detached_head_reports_empty_branch(self, git_repo):
+        subprocess.run(["git", "checkout", "--detach"], cwd=git_repo.root, check=True, capture_output=True)
+        assert git_repo.branch_manager.get_status().current_branch == ""
+
+
+class TestBranchMetadata:
+    def test_metadata_for_current_and_other_branch(self, git_repo, tmp_path):
+        subprocess.run(["git", "branch", "fix/other"], cwd=tmp_path, check=True, capture_output=True)
+        (tmp_path / "README.md").write_text("changed")
+        head = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=tmp_path, check=True, capture_output=True, text=True
+        ).stdout.strip()
+
+        metadata = git_repo.branch_manager.get_branch_metadata_batch(["main", "fix/other"])
+        assert metadata["main"].current is True
+        assert metadata["main"].last_commit == head
+        assert metadata["main"].modified_files == [Path("README.md")]
+        assert metadata["fix/other"].current is False
+        assert metadata["fix/other"].upstream is None
+        assert git_repo.branch_manager.get_branch_metadata("fix/other") == metadata["fix/other"]
+
+
+class TestBranchStatus:
+    def test_unstaged_edit_is_reported_immediately(self, git_repo, tmp_path):
+        assert git_repo.branch_manager.get_status().has_changes is False
+        # What ChangeApplier does between fix attempts: edit, do not stage
+        (tmp_path / "README.md").write_text("changed")
+        status = git_repo.branch_manager.get_status()
+        assert status.has_changes is True
+        assert status.changes == ["README.md"]
+
+    def test_status_cannot_be_mutated(self, git_repo):
+        status = git_repo.branch_manager.get_status()
+        with pytest.raises(AttributeError):
+            status.has_changes = True
+
+
+class TestDeleteBranch:
+    def test_deletes_an_existing_branch(self, git_repo, tmp_path):
+        subprocess.run(["git", "branch", "fix/old"], cwd=tmp_path, check=True, capture_output=True)
+        assert git_repo.delete_branch("fix/old").returncode == 0
+        assert git_repo.branch_exists("fix/old") is False
+
+    def test_missing_branch_raises_BranchNotFoundError(self, git_repo):
+        with pytest.raises(BranchNotFoundError, match="fix/none"):
+            git_repo.delete_branch("fix/none")
+
+    def test_cleanup_of_a_missing_branch_succeeds(self, git_repo):
+        assert git_repo.branch_manager.cleanup_fix_branch("fix/none") is True
+
+
+class TestBranchManagerCreate:
+    def test_existing_branch_is_reported_by_checkout(self, git_repo, tmp_path):
+        subprocess.run(["git", "branch", "fix/dup"], cwd=tmp_path, check=True, capture_output=True)
+        with pytest.raises(BranchCreationError, match="already exists"):
+            git_repo.branch_manager.create_fix_branch("fix/dup")
+        assert git_repo.get_current_branch() == "main"
+
+    def test_bad_base_branch_raises_BranchCreationError(self, git_repo):
+        with pytest.raises(BranchCreationError, match="Failed to create branch fix/new"):
+            git_repo.branch_manager.create_fix_branch("fix/new", "no-such-base")
+
 
 # ---------------------------------------------------------------------------
 # run_command
@@ -122,6 +291,13 @@ class TestRunCommand:
         result = git_repo.run_command(["status"])
         assert result.returncode == 0
 
+    def test_result_is_an_immutable_value(self, git_repo):
+        result = git_repo.run_command(["status"])
+        assert result.command == ("git", "status")
+        assert {result: True}[result] is True
+        with pytest.raises(AttributeError):
+            result.returncode = 1
+
     def test_git_prefix_stripped(self, git_repo):
         # Passing ["git", "status"] should work the same as ["status"]
         result = git_repo.run_command(["git", "status"])
@@ -102,6 +102,20 @@ class TestFixService:
         assert svc.temp_increment == pytest.approx(0.1)
         assert svc.dev_force_success is False
 
+    def test_close_releases_every_collaborator(self, fake_ai_manager, fake_test_runner, fake_change_applier):
+        git_repo = Mock()
+        svc = FixService(
+            ai_manager=fake_ai_manager,
+            test_runner=fake_test_runner,
+            change_applier=fake_change_applier,
+            git_repo=git_repo,
+        )
+        svc.close()
+        fake_change_applier.close.assert_called_once()
+        fake_ai_manager.close.assert_called_once()
+        fake_test_runner.close.assert_called_once()
+        git_repo.close.assert_called_once()
+
     # Edge cases: invalid constructor parameters
     @pytest.mark.parametrize(
         "max_retries,initial_temp,temp_increment,err_msg",
@@ -210,6 +224,7 @@ class TestFixService:
         # latest attempt should be present and marked failed
         assert error.fix_attempts, "No attempt recorded"
         assert error.fix_attempts[-1].status == "failed"
+        assert error.fix_attempts[-1].failure_kind == "apply"
         # restore_backup should not have been called since backup_path is None
         fake_change_applier.restore_backup.assert_not_called()
         # session store should have been called via _update_session_if_present
@@ -244,6 +259,8 @@ class TestFixService:
 
         # test_runner.verify_fix returns False (functional tests still fail)
         svc.test_runner.verify_fix = Mock(return_value=False)
+        # the manager escalated past a temperature that failed before
+        fake_ai_manager.fix_temperature = 0.6
 
         result = svc.attempt_fix(error, temperature=0.5)
         assert result is False
@@ -253,6 +270,40 @@ class TestFixService:
         assert tmp_file.read_text(encoding="utf-8") == original
         # attempt should be marked failed
         assert error.fix_attempts[-1].status == "failed"
+        assert error.fix_attempts[-1].failure_kind == "verify"
+        # an unverified fix must not be offered for reuse
+        fake_ai_manager.remember_successful_fix.assert_not_called()
+        fake_ai_manager.record_failed_fix.assert_called_once_with(error, 0.6)
+
+    def test_failed_verification_stores_the_temperature_that_produced_the_fix(
+        self, tmp_file, fake_change_applier, fake_test_runner, workspace_validator_ok, tmp_path
+    ):
+        from branch_fixer.services.ai.cache import FixStore
+        from branch_fixer.services.ai.manager import AIManager
+
+        store = FixStore(tmp_path / "fixes.db")
+        manager = AIManager(api_key=None, fix_store=store)
+        error_details = ErrorDetails(error_type="AssertionError", message="fail")
+        error = TestError(test_file=tmp_file, test_function="test_example", error_details=error_details)
+        svc = FixService(
+            ai_manager=manager,
+            test_runner=fake_test_runner,
+            change_applier=fake_change_applier,
+            git_repo=Mock(),
+        )
+        svc.validator = workspace_validator_ok
+        svc.test_runner.verify_fix = Mock(return_value=False)
+
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = "Modified code:\n```python\nassert True\n```"
+        with patch("branch_fixer.services.ai.manager.completion", return_value=response):
+            assert svc.attempt_fix(error, temperature=0.5) is False
+            # 0.5 failed, so the retry at 0.5 is escalated and stored as 0.6
+            assert svc.attempt_fix(error, temperature=0.5) is False
+
+        failed = store.failed_temperatures(manager._fix_store_key, 60)
+        assert sorted(failed) == pytest.approx([0.5, 0.6])
 
     # attempt_fix where apply and verify succeed: marks fixed and updates session/state
     def test_attempt_fix_apply_and_verify_success_marks_fixed_and_updates_session_and_state_manager(
@@ -282,6 +333,7 @@ class TestFixService:
         result = svc.attempt_fix(error, temperature=0.2)
         assert result is True
         assert error.status == "fixed"
+        fake_ai_manager.remember_successful_fix.assert_called_once_with(error)
         assert any(attempt.status == "success" for attempt in error.fix_attempts)
         # session updated
         assert error in session.completed_errors
@@ -122,6 +122,50 @@ test_example.py:15: AssertionError"""
         self.assertEqual(errors[1].error_type, "AssertionError")
         self.assertEqual(errors[1].line_number, "15")
 
+    def test_lines_after_recorded_error_are_skipped_until_next_header(self):
+        """Should record one error per block and resume at the next header"""
+        pytest_output = """=================================== FAILURES ===================================
+_______________________________ test_first __________________________________
+
+    def test_first():
+>       raise ValueError("Invalid value")
+E       ValueError: Invalid value
+
+test_example.py:10: ValueError
+----------------------------- Captured stdout call -----------------------------
+other.py:3: RuntimeError
+_______________________________ test_second _________________________________
+
+    def test_second():
+>       assert False
+E       AssertionError
+
+test_example.py:15: AssertionError"""
+
+        errors = self.parser.parse_test_failures(pytest_output)
+        self.assertEqual([e.line_number for e in errors], ["10", "15"])
+        self.assertNotIn("Captured stdout", errors[1].code_snippet)
+
+    def test_stops_at_short_test_summary(self):
+        """Should ignore everything after the short test summary footer"""
+        pytest_output = """=================================== FAILURES ===================================
+_______________________________ test_first __________________________________
+
+    def test_first():
+>       raise ValueError("Invalid value")
+E       ValueError: Invalid value
+
+test_example.py:10: ValueError
+=========================== short test summary info ============================
+_______________________________ test_ghost __________________________________
+E       KeyError: 'x'
+ghost.py:1: KeyError
+========================= 1 failed, 2 passed in 0.12s =========================="""
+
+        errors = self.parser.parse_test_failures(pytest_output)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].function, "test_first")
+
     def test_parse_nested_failure(self):
         """Should parse failures with nested function calls"""
         pytest_output = """=================================== FAILURES ===================================
@@ -44,4 +44,16 @@ class TestErrorInfo(unittest.TestCase):
         """update_snippet should update the code snippet with proper formatting"""
         new_snippet = "    def test_something():\n        assert True"
         self.error_info.update_snippet(new_snippet)
-        self.assertEqual(self.error_info.code_snippet, new_snippet)
\ No newline at end of file
+        self.assertEqual(self.error_info.code_snippet, new_snippet)
+
+    def test_split_nodeid(self):
+        """split_nodeid should separate file, optional class and function"""
+        from branch_fixer.services.pytest.error_info import ErrorInfo
+        self.assertEqual(
+            ErrorInfo.split_nodeid("tests/test_x.py::TestX::test_y"),
+            ("tests/test_x.py", "TestX", "test_y"),
+        )
+        self.assertEqual(
+            ErrorInfo.split_nodeid("tests/test_x.py::test_y"),
+            ("tests/test_x.py", None, "test_y"),
+        )
@@ -0,0 +1,18 @@
+# tests/unit/pytest/test_repeat.py
+import pytest
+
+from branch_fixer.services.pytest.repeat import base_nodeid
+
+
+@pytest.mark.parametrize(
+    "nodeid, expected",
+    [
+        ("test_a.py::test_x[run3]", "test_a.py::test_x"),
+        ("test_a.py::test_x[1-run2]", "test_a.py::test_x[1]"),
+        ("test_a.py::TestC::test_x[run12]", "test_a.py::TestC::test_x"),
+        ("test_a.py::test_x[rerun]", "test_a.py::test_x[rerun]"),
+        ("test_a.py::test_x", "test_a.py::test_x"),
+    ],
+)
+def test_base_nodeid_strips_repetition_id(nodeid, expected):
+    assert base_nodeid(nodeid) == expected
@@ -1,15 +1,20 @@
 """Tests for PytestRunner — argument building, result formatting, verify_fix subprocess."""
+import asyncio
+import contextlib
+import logging
+import os
 import subprocess
 import sys
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from _pytest.main import ExitCode
 
 from branch_fixer.services.pytest.models import SessionResult, TestResult
-from branch_fixer.services.pytest.runner import PytestRunner
+from branch_fixer.services.pytest.runner import _VERIFY_OUTPUT_TAIL_BYTES, PytestRunner
 
 
 # ---------------------------------------------------------------------------
@@ -96,6 +101,13 @@ class TestFinalizeSession:
         # Should not raise
         runner.finalize_session(datetime.now(), 0)
 
+    def test_duration_uses_perf_counter_start_when_given(self, runner):
+        runner._current_session = make_session()
+        # Wall-clock start far in the past must not leak into the duration
+        start = datetime.now() - timedelta(hours=1)
+        runner.finalize_session(start, 0, start_ns=time.perf_counter_ns())
+        assert 0.0 <= runner._current_session.duration < 60.0
+
 
 # ---------------------------------------------------------------------------
 # update_session_counts
@@ -268,6 +280,324 @@ class TestVerifyFix:
         args_passed = mock_run.call_args[0][0]
         assert any("test_bar" in a for a in args_passed)
 
+    def test_logs_only_the_tail_of_failed_output(self, runner, tmp_path, caplog):
+        mock_result = MagicMock()
+        mock_result.returncode = 1
+        mock_result.stdout = b"x" * (_VERIFY_OUTPUT_TAIL_BYTES + 10) + b"\xffend"
+        with patch("subprocess.run", return_value=mock_result) as mock_run:
+            with caplog.at_level(logging.DEBUG, logger="branch_fixer.services.pytest.runner"):
+                assert runner.verify_fix(tmp_path / "test_foo.py", "test_foo") is False
+        assert mock_run.call_args.kwargs["stderr"] == subprocess.STDOUT
+        logged = next(r.message for r in caplog.records if "Verification output" in r.message)
+        assert logged.endswith("\ufffdend")
+        assert len(logged) < _VERIFY_OUTPUT_TAIL_BYTES + 100
+
+    def test_inherits_environment_by_default(self, runner, tmp_path):
+        mock_result = MagicMock()
+        mock_result.returncode = 0
+        with patch("subprocess.run", return_value=mock_result) as mock_run:
+            runner.verify_fix(tmp_path / "test_foo.py", "test_foo")
+        assert mock_run.call_args.kwargs["env"] is None
+
+    def test_env_vars_are_layered_over_environment(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("PATH", "/usr/bin")
+        runner = PytestRunner(working_dir=tmp_path, env_vars={"MY_FLAG": "1"})
+        mock_result = MagicMock()
+        mock_result.returncode = 0
+        with patch("subprocess.run", return_value=mock_result) as mock_run:
+            runner.verify_fix(tmp_path / "test_foo.py", "test_foo")
+        env = mock_run.call_args.kwargs["env"]
+        assert env["MY_FLAG"] == "1"
+        assert env["PATH"] == "/usr/bin"
+
+
+class TestWarmPool:
+    def test_verifies_in_warm_worker_processes(self, tmp_path):
+        test_file = tmp_path / "test_target.py"
+        test_file.write_text("def test_ok():\n    pass\n\ndef test_bad():\n    assert False\n")
+        runner = PytestRunner(working_dir=tmp_path, warm_workers=1)
+        try:
+            with patch("subprocess.run") as mock_run:
+                assert runner.verify_fix(test_file, "test_ok") is True
+                assert runner.verify_fix(test_file, "test_bad") is False
+            mock_run.assert_not_called()
+        finally:
+            runner.close()
+        assert runner._warm_pool is None
+
+    async def test_async_verification_uses_warm_pool(self, tmp_path):
+        test_file = tmp_path / "test_target.py"
+        test_file.write_text("def test_ok():\n    pass\n\ndef test_bad():\n    assert False\n")
+        runner = PytestRunner(working_dir=tmp_path, warm_workers=2)
+        try:
+            with patch("asyncio.create_subprocess_exec") as mock_exec:
+                results = await runner.averify_fixes(
+                    [(test_file, "test_ok"), (test_file, "test_bad")]
+                )
+            assert results == [True, False]
+            mock_exec.assert_not_called()
+        finally:
+            runner.close()
+
+
+class TestVerifyFixes:
+    def test_returns_results_in_target_order(self, runner, tmp_path):
+        def fake_run(args, **kwargs):
+            result = MagicMock()
+            result.returncode = 0 if args[-1].endswith("::test_ok") else 1
+            result.stdout = b""
+            return result
+
+        targets = [
+            (tmp_path / "test_a.py", "test_ok"),
+            (tmp_path / "test_b.py", "test_bad"),
+            (tmp_path / "test_c.py", "test_ok"),
+        ]
+        with patch("subprocess.run", side_effect=fake_run):
+            assert runner.verify_fixes(targets) == [True, False, True]
+
+    def test_empty_targets(self, runner):
+        assert runner.verify_fixes([]) == []
+
+    def test_shared_session_runs_one_subprocess(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("PYTHONPATH", os.pathsep.join(sys.path))
+        test_a = tmp_path / "test_a.py"
+        test_a.write_text("def test_ok():\n    pass\n\ndef test_bad():\n    assert False\n")
+        test_b = tmp_path / "test_b.py"
+        test_b.write_text("class TestC:\n    def test_ok(self):\n        pass\n")
+        runner = PytestRunner(working_dir=tmp_path)
+        targets = [
+            (test_a, "test_bad"),
+            (test_b, "TestC::test_ok"),
+            (test_a, "test_ok"),
+        ]
+        with patch("subprocess.run", wraps=subprocess.run) as mock_run:
+            results = runner.verify_fixes(targets, isolated=False)
+        assert results == [False, True, True]
+        assert mock_run.call_count == 1
+
+    def test_shared_session_falls_back_when_a_target_is_missing(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("PYTHONPATH", os.pathsep.join(sys.path))
+        test_a = tmp_path / "test_a.py"
+        test_a.write_text("def test_ok():\n    pass\n")
+        runner = PytestRunner(working_dir=tmp_path)
+        targets = [(test_a, "test_ok"), (test_a, "test_missing")]
+        assert runner.verify_fixes(targets, isolated=False) == [True, False]
+
+
+class TestAsyncVerify:
+    def write_test(self, tmp_path):
+        test_file = tmp_path / "test_target.py"
+        test_file.write_text(
+            "import time\n"
+            "def test_ok():\n    pass\n"
+            "def test_bad():\n    assert False\n"
+            "def test_slow():\n    time.sleep(30)\n"
+        )
+        return test_file
+
+    async def test_averify_fixes_returns_results_in_target_order(self, tmp_path):
+        test_file = self.write_test(tmp_path)
+        runner = PytestRunner(working_dir=tmp_path)
+        targets = [(test_file, "test_ok"), (test_file, "test_bad"), (test_file, "test_ok")]
+        assert await runner.averify_fixes(targets, max_concurrency=2) == [True, False, True]
+
+    async def test_timeout_kills_the_run(self, tmp_path):
+        test_file = self.write_test(tmp_path)
+        runner = PytestRunner(working_dir=tmp_path)
+        started = time.perf_counter()
+        assert await runner.averify_fix(test_file, "test_slow", timeout=3) is False
+        assert time.perf_counter() - started < 20
+
+    @pytest.mark.skipif(os.name != "posix", reason="process groups are POSIX-only")
+    async def test_timeout_kills_processes_spawned_by_the_test(self, tmp_path):
+        pid_file = tmp_path / "child.pid"
+        test_file = tmp_path / "test_spawns.py"
+        test_file.write_text(
+            "import subprocess, sys, time\n"
+            "def test_spawns():\n"
+            "    child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+            f"    open({str(pid_file)!r}, 'w').write(str(child.pid))\n"
+            "    time.sleep(60)\n"
+        )
+        runner = PytestRunner(working_dir=tmp_path)
+        assert await runner.averify_fix(test_file, "test_spawns", timeout=5) is False
+        child_pid = int(pid_file.read_text())
+        for _ in range(50):
+            try:
+                os.kill(child_pid, 0)
+            except ProcessLookupError:
+                break
+            # Reap it if it was reparented to us as a zombie
+            with contextlib.suppress(ChildProcessError):
+                os.waitpid(child_pid, os.WNOHANG)
+            await asyncio.sleep(0.1)
+        else:
+            pytest.fail("grandchild process survived the timeout")
+
+    async def test_keeps_only_the_tail_of_streamed_output(self, runner, tmp_path, caplog):
+        stdout = asyncio.StreamReader()
+        stdout.feed_data(b"".join(f"line {i}\n".encode() for i in range(5000)))
+        stdout.feed_eof()
+        proc = MagicMock(stdout=stdout, returncode=1)
+        proc.wait = AsyncMock(return_value=1)
+        caplog.set_level(logging.DEBUG, logger="branch_fixer.services.pytest.runner")
+        with (
+            patch("asyncio.create_subprocess_exec", AsyncMock(return_value=proc)),
+            # The last 50 lines, all "line NNNN\n"
+            patch("branch_fixer.services.pytest.runner._VERIFY_OUTPUT_TAIL_BYTES", 500),
+        ):
+            assert await runner.averify_fix(tmp_path / "t.py", "test_x") is False
+        assert "line 4999" in caplog.text
+        assert "line 4950" in caplog.text
+        assert "line 4949" not in caplog.text
+
+    async def test_one_very_long_output_line_is_read(self, runner, tmp_path):
+        stdout = asyncio.StreamReader()
+        # Far past StreamReader's 64 KiB line limit, with no newline at all
+        stdout.feed_data(b"x" * (1024 * 1024))
+        stdout.feed_eof()
+        proc = MagicMock(stdout=stdout, returncode=0)
+        proc.wait = AsyncMock(return_value=0)
+        with patch("asyncio.create_subprocess_exec", AsyncMock(return_value=proc)):
+            assert await runner.averify_fix(tmp_path / "t.py", "test_x") is True
+
+    @pytest.mark.skipif(os.name != "posix", reason="process groups are POSIX-only")
+    async def test_background_process_holding_output_does_not_hang(self, tmp_path):
+        pid_file = tmp_path / "child.pid"
+        # Exits at once, leaving a grandchild that inherited its stdout
+        script = (
+            "import subprocess, sys\n"
+            "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+            f"open({str(pid_file)!r}, 'w').write(str(child.pid))\n"
+        )
+        runner = PytestRunner(working_dir=tmp_path)
+        started = time.perf_counter()
+        with patch.object(
+            runner, "_subprocess_args", return_value=[sys.executable, "-c", script]
+        ):
+            assert await runner.averify_fix(tmp_path / "t.py", "test_x") is True
+        assert time.perf_counter() - started < 20
+        child_pid = int(pid_file.read_text())
+        for _ in range(50):
+            try:
+                os.kill(child_pid, 0)
+            except ProcessLookupError:
+                break
+            with contextlib.suppress(ChildProcessError):
+                os.waitpid(child_pid, os.WNOHANG)
+            await asyncio.sleep(0.1)
+        else:
+            pytest.fail("background process survived the verification")
+
+    async def test_output_read_failure_counts_as_failure(self, runner, tmp_path):
+        stdout = MagicMock()
+        stdout.read = AsyncMock(side_effect=OSError("pipe broke"))
+        proc = MagicMock(stdout=stdout, returncode=None)
+
+        async def still_running():
+            await asyncio.sleep(60)
+
+        proc.wait = still_running
+        kill = AsyncMock()
+        with (
+            patch("asyncio.create_subprocess_exec", AsyncMock(return_value=proc)),
+            patch("branch_fixer.services.pytest.runner._kill_process_tree", kill),
+        ):
+            assert await runner.averify_fix(tmp_path / "t.py", "test_x") is False
+        kill.assert_awaited_once_with(proc)
+
+    async def test_remaining_time_is_passed_to_pytest_timeout(self, runner, tmp_path):
+        proc = MagicMock(stdout=asyncio.StreamReader(), returncode=0)
+        proc.stdout.feed_eof()
+        proc.wait = AsyncMock(return_value=0)
+        spawn = AsyncMock(return_value=proc)
+        with (
+            patch("asyncio.create_subprocess_exec", spawn),
+            patch("branch_fixer.services.pytest.runner._HAS_PYTEST_TIMEOUT", True),
+        ):
+            assert await runner.averify_fix(tmp_path / "t.py", "test_x", timeout=30)
+            assert await runner.averify_fix(tmp_path / "t.py", "test_x")
+        timed, untimed = (call.args for call in spawn.call_args_list)
+        assert timed[-1] in ("--timeout=29", "--timeout=30")
+        assert not any(arg.startswith("--timeout") for arg in untimed)
+
+    async def test_no_timeout_arg_without_the_plugin(self, runner, tmp_path):
+        proc = MagicMock(stdout=asyncio.StreamReader(), returncode=0)
+        proc.stdout.feed_eof()
+        proc.wait = AsyncMock(return_value=0)
+        spawn = AsyncMock(return_value=proc)
+        with (
+            patch("asyncio.create_subprocess_exec", spawn),
+            patch("branch_fixer.services.pytest.runner._HAS_PYTEST_TIMEOUT", False),
+        ):
+            assert await runner.averify_fix(tmp_path / "t.py", "test_x", timeout=30)
+        assert not any(arg.startswith("--timeout") for arg in spawn.call_args.args)
+
+    async def test_spawn_failure_counts_as_failure(self, runner, tmp_path):
+        with patch("asyncio.create_subprocess_exec", side_effect=OSError("boom")):
+            assert await runner.averify_fixes([(tmp_path / "t.py", "test_x")]) == [False]
+
+    async def test_empty_targets(self, runner):
+        assert await runner.averify_fixes([]) == []
+
+
+class TestDetectFlaky:
+    @pytest.fixture(autouse=True)
+    def importable_package(self, monkeypatch):
+        # The subprocess loads the repeat plugin from this package
+        monkeypatch.setenv("PYTHONPATH", os.pathsep.join(sys.path))
+
+    def write_test(self, tmp_path, body):
+        test_file = tmp_path / "test_target.py"
+        test_file.write_text(body)
+        return test_file
+
+    def test_detects_alternating_outcomes(self, tmp_path):
+        counter = tmp_path / "count"
+        test_file = self.write_test(
+            tmp_path,
+            "from pathlib import Path\n"
+            f"COUNTER = Path({str(counter)!r})\n"
+            "def test_flaky():\n"
+            "    n = int(COUNTER.read_text()) if COUNTER.exists() else 0\n"
+            "    COUNTER.write_text(str(n + 1))\n"
+            "    assert n % 2 == 0\n",
+        )
+        runner = PytestRunner(working_dir=tmp_path)
+        assert runner.detect_flaky(test_file, "test_flaky", runs=4) is True
+        # Every repetition ran
+        assert counter.read_text() == "4"
+
+    def test_consistent_failure_is_not_flaky(self, tmp_path):
+        test_file = self.write_test(tmp_path, "def test_broken():\n    assert False\n")
+        runner = PytestRunner(working_dir=tmp_path)
+        assert runner.detect_flaky(test_file, "test_broken", runs=3) is False
+
+    def test_checks_several_targets_in_one_session(self, tmp_path):
+        counter = tmp_path / "count"
+        test_file = self.write_test(
+            tmp_path,
+            "from pathlib import Path\n"
+            f"COUNTER = Path({str(counter)!r})\n"
+            "def test_flaky():\n"
+            "    n = int(COUNTER.read_text()) if COUNTER.exists() else 0\n"
+            "    COUNTER.write_text(str(n + 1))\n"
+            "    assert n % 2 == 0\n"
+            "def test_stable():\n"
+            "    pass\n",
+        )
+        runner = PytestRunner(working_dir=tmp_path)
+        with patch("subprocess.run", wraps=subprocess.run) as mock_run:
+            flaky = runner.detect_flaky_tests(
+                [(test_file, "test_flaky"), (test_file, "test_stable")], runs=2
+            )
+        assert flaky == {"test_target.py::test_flaky"}
+        assert mock_run.call_count == 1
+
+    def test_no_targets(self, runner):
+        assert runner.detect_flaky_tests([]) == set()
+
 
 # ---------------------------------------------------------------------------
 # format_report
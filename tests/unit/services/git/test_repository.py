@@ -199,7 +199,7 @@ class TestRunCommandAndHelpers:
             assert result.returncode == 0
             assert result.stdout == "OK"
             assert result.stderr == ""
-            assert result.command == ["git", "status"]
+            assert result.command == ("git", "status")
 
     def test_execute_subprocess_propagates_exceptions(self, tmp_repo_path):
         gr = repository_module.GitRepository.__new__(GitRepository)
@@ -294,15 +294,16 @@ class TestRepoStateHelpers:
 
     def test_branch_exists_true_and_false(self):
         gr = repository_module.GitRepository.__new__(GitRepository)
-        with patch.object(GitRepository, "run_command", return_value=CommandResult(returncode=0, stdout="  feature\n", stderr="", command=["git", "branch", "--list"])):
+        with patch.object(GitRepository, "_execute_subprocess", return_value=CommandResult(returncode=0, stdout="abc123\n", stderr="", command=["git", "rev-parse"])) as run:
             assert gr.branch_exists("feature") is True
+        assert run.call_args.args[0] == ["git", "rev-parse", "--verify", "--quiet", "refs/heads/feature"]
 
-        with patch.object(GitRepository, "run_command", return_value=CommandResult(returncode=0, stdout="", stderr="", command=["git", "branch", "--list"])):
+        with patch.object(GitRepository, "_execute_subprocess", return_value=CommandResult(returncode=1, stdout="", stderr="", command=["git", "rev-parse"])):
             assert gr.branch_exists("nope") is False
 
     def test_branch_exists_raises_wrapped(self):
         gr = repository_module.GitRepository.__new__(GitRepository)
-        with patch.object(GitRepository, "run_command", side_effect=RuntimeError("err")):
+        with patch.object(GitRepository, "_execute_subprocess", side_effect=RuntimeError("err")):
             with pytest.raises(GitError) as excinfo:
                 gr.branch_exists("x")
             assert "Unable to check branch existence" in str(excinfo.value)
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from branch_fixer.services.pytest.models import TestResult
+
+
+class TestTestResultDefaults:
+    def test_timestamp_is_taken_per_instance(self):
+        first = TestResult(nodeid="a.py::test_a")
+        second = TestResult(nodeid="b.py::test_b")
+        assert isinstance(first.timestamp, datetime)
+        assert first.timestamp <= second.timestamp
+        assert not isinstance(vars(TestResult)["timestamp"], datetime)
+
+    def test_mutable_defaults_are_not_shared(self):
+        first = TestResult(nodeid="a.py::test_a")
+        second = TestResult(nodeid="b.py::test_b")
+        first.markers.append("slow")
+        first.parameters["x"] = 1
+        assert second.markers == []
+        assert second.parameters == {}
+
+    def test_uses_slots(self):
+        result = TestResult(nodeid="a.py::test_a")
+        assert not hasattr(result, "__dict__")
@@ -418,7 +418,7 @@ class TestPytestRunner:
                 self.stdout = b"ok"
                 self.stderr = b""
 
-        def fake_run(args, stdout=None, stderr=None):
+        def fake_run(args, stdout=None, stderr=None, env=None, check=True):
             called["args"] = args
             return FakeProc()
 
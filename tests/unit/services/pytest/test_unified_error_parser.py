@@ -281,14 +281,6 @@ class TestFailureParser:
         assert tb[-1] == line
         assert details[-1] == "AssertionError: expected 1"
 
-    def test__is_checks(self, failure_parser):
-        assert failure_parser._is_test_header("_a_")
-        assert not failure_parser._is_test_header("a")
-        assert failure_parser._is_error_detail("E something")
-        assert not failure_parser._is_error_detail("something")
-        assert failure_parser._is_failing_line_indicator("> code")
-        assert not failure_parser._is_failing_line_indicator(" code")
-
     def test_process_failure_line_matches_and_returns_errorinfo(self, failure_parser):
         line = "tests/test_x.py:10: AssertionError"
         res = failure_parser.process_failure_line(line)
@@ -508,6 +508,7 @@ class TestCLI:
         out = capsys.readouterr().out
         assert "Cleaning up resources..." in out
         assert "Cleanup completed successfully." in out or "Encountered errors during cleanup:" not in out
+        mock_service.close.assert_called_once()
 
     # ensure _prompt_for_fix propagates exceptions from getchar
     def test__prompt_for_fix_getchar_raises_propagates(self, cli, sample_error):